@@ -13,13 +13,39 @@ import ctypes
 import webbrowser
 import os
 import sys
+from functools import partial
 
 # Importing functions and classes
-from src.load_measurements import load_measurements, FileExtensionError
-from src.aggregate_measurements import aggregate_measurements
+from src.load_measurements import load_dataset, FileExtensionError
+from src.sniff_measurements import sniff_measurements, SchemaError
+from src.open_measurements import check_file
+from src.aggregate_measurements import aggregate_dataset
 from src.print_statistics import print_statistics
+from src.compute_statistics import (parse_statistics, scale_statistics,
+                                    STATISTICS)
+from src.load_profile import load_profile, SPLITS
+from src.export_data import export_data, export_statistics
+from src.data_quality import quality_summary
+from src.time_index import TimeIndex
+from src.range_index import RangeIndex
+from src.lazy_dataset import LazyDataset
+from src.parallel_aggregate import ParallelAggregator
+from src.timestamps import minutes_to_datetime, datetime_to_minutes
+from src.timezones import localize_minutes, to_local, check_zone
+from src.dataset import Dataset
+from src.tail_measurements import TailReader, LiveBuffer
 from src.myFrame import myFrame
 from src.dragAndDrop import DragAndDrop
+from src.workerThread import WorkerThread
+from src.result_cache import (ResultCache, cache_results, file_key,
+                              quick_key)
+from src.workspace import Workspace
+from src.detect_anomalies import detect_anomalies, DETECTORS
+from src.peak_demand import peak_demand, load_duration
+from src.render_plot import render_plot
+from src.plot_levels import PlotLevels
+from src.dataset_manager import DatasetManager
+from src.tariff_engine import TariffEngine, load_tariff
 
 # Import plot and make them look pretty
 import matplotlib
@@ -28,6 +54,8 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.figure import Figure
+from matplotlib.widgets import SpanSelector
 matplotlib.style.use('ggplot')  # Set plotting layout
 
 
@@ -44,6 +72,23 @@ class App():
         self.aggId = 1  # Identifies current aggregation
         self.period = "minute"
         self.periodCheck = None
+        self.dateRange = None  # (start, end) of the selected date range
+        self.rangeBounds = (None, None)  # Same range as given to TimeIndex
+        self.cache = ResultCache()  # Results of earlier sessions
+        self.cached = None  # Cached results of the loaded file
+        self.cachedStats = None  # Cached statistics of the loaded file
+        self.statList = list(STATISTICS)  # Statistics in the table
+        self.timeZone = None  # Time zone of the files, None for naive time
+        self.previewing = False  # A preview is shown while loading
+        self.workspace = Workspace()  # Datasets to compare
+        self.anomalies = None  # Flagged intervals from detect_anomalies
+        self.levels = None  # PlotLevels of the source for the focused plot
+        self.detailRange = (None, None)  # Range of the focused plot
+        self.datasets = DatasetManager()  # Aggregations within the budget
+        self.tariff = None  # Tariff of the costs, see load_tariff
+        self.tariffEngine = None  # TariffEngine of the source
+        self.schema = None  # Layout of the loaded file, see sniff_measurements
+        self.aggregator = None  # ParallelAggregator of the source
 
         # Configure UI
         self.setupUi(MainWindow)
@@ -62,10 +107,21 @@ class App():
         self.agg_day_btn.clicked.connect(self.aggData)
         self.agg_month_btn.clicked.connect(self.aggData)
         self.agg_hDay_btn.clicked.connect(self.aggData)
+        # Date range buttons
+        self.range_apply_btn.clicked.connect(self.rangeApply)
+        self.range_reset_btn.clicked.connect(self.rangeReset)
         # Command buttons
         self.stat_btn.clicked.connect(self.statToggle)
         self.plot_btn.clicked.connect(self.plotToggle)
         self.showdata_btn.clicked.connect(self.showData)
+        self.export_btn.clicked.connect(self.exportData)
+        self.export_stat_btn.clicked.connect(self.exportStat)
+        self.profile_btn.clicked.connect(self.showProfile)
+        self.workspace_add_btn.clicked.connect(self.addWorkspace)
+        self.workspace_clear_btn.clicked.connect(self.clearWorkspace)
+        self.compare_btn.clicked.connect(self.compareWorkspace)
+        self.anomaly_btn.clicked.connect(self.detectAnomalies)
+        self.demand_btn.clicked.connect(self.showDemand)
         self.plot_focus_btn.clicked.connect(self.plotFocus)
         # Dropdown menus
         self.plotMenu.currentIndexChanged.connect(self.menuChange)
@@ -74,6 +130,13 @@ class App():
         self.aggcurrent_line.textChanged.connect(self.printStat)
         self.plotMenu.currentIndexChanged.connect(self.dataPlot)
         self.plotFrame.resized.connect(self.plotResize)
+        # Show the memory use in the status bar
+        self.memoryTimer = QtCore.QTimer()
+        self.memoryTimer.timeout.connect(self.updateMemory)
+        self.memoryTimer.start(2000)
+        # Free the shared memory of the process pool
+        QtWidgets.QApplication.instance().aboutToQuit.connect(
+            self.closeAggregator)
 
 # On change of dropdown menu
     def menuChange(self):
@@ -90,12 +153,54 @@ class App():
         """
         pd.set_option('display.max_rows', 500)  # Set amount of rows
         # Print data based on current aggregation
+        # Only the printed rows are joined with their time vectors
         if self.aggId != 5:
-            self.print_(str(self.tvec.join(self.data)) +
+            self.print_(str(self.current.frame(500)) +
                         "\nData printed \nCurrent unit: {}".format(self.unit))
         else:
-            self.data.index.name = 'Hour of the day'
-            self.print_(str(self.data))
+            self.print_(str(self.current.frame()))
+
+# Export data
+    def exportData(self):
+        """
+        Export the currently aggregated data to a .csv or .npz file.
+        The export runs in a background thread so the UI does not freeze
+        """
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(
+            MainWindow, "Export data", "",
+            "CSV file (*.csv);;NumPy binary file (*.npz)")
+        if not filename:
+            return
+        self.startExport(export_data, filename, self.current.tvec,
+                         self.current.data)
+
+    def exportStat(self):
+        """
+        Export the statistics of the currently aggregated data to a .csv file
+        """
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(
+            MainWindow, "Export statistics", "", "CSV file (*.csv)")
+        if not filename:
+            return
+        self.startExport(export_statistics, filename,
+                         self.currentStatistics())
+
+    def startExport(self, func, filename, *args):
+        """
+        Runs an export function in a WorkerThread and reports back when done
+        """
+        if getattr(self, "exportWorker", None) and self.exportWorker.isRunning():
+            self.showWarning("Please wait for the current export to finish")
+            return
+        self.print_("Exporting to {}".format(filename))
+        self.statusbar.showMessage("Exporting...")
+        self.exportWorker = WorkerThread(func, filename, *args)
+        self.exportWorker.done.connect(
+            lambda result: self.statusbar.showMessage(
+                "Exported to {}".format(filename), 5000))
+        self.exportWorker.failed.connect(
+            lambda msg: self.showCritical("Error! Export failed:\n{}".format(msg)))
+        self.exportWorker.start()
 
 # Show/hide plot
     def plotToggle(self):
@@ -124,18 +229,22 @@ class App():
         if self.plot_focus_btn.text() == "Focus plot":
             self.infocurrent_box.hide()
             self.agg_box.hide()
+            self.range_box.hide()
             self.cmd_box.hide()
             self.display_window.hide()
             self.line_2.hide()
             self.plot_focus_btn.setText("Unfocus plot")
+            self.showOverview()
 
         else:
             self.infocurrent_box.show()
             self.agg_box.show()
+            self.range_box.show()
             self.cmd_box.show()
             self.display_window.show()
             self.line_2.show()
             self.plot_focus_btn.setText("Focus plot")
+            self.hideOverview()
 
 # Adjust plot to new size
     def plotResize(self):
@@ -161,8 +270,13 @@ class App():
         elif self.period == self.periodCheck or not self.canvas.isVisible():
             return
 
+        # The focused plot shows the range selected in the overview
+        if self.plot_focus_btn.text() == "Unfocus plot" and len(self.source):
+            self.showOverview()
+            return
+
         # Warn user about large loading time
-        if len(self.data) > 300000:
+        if len(self.current) > 300000:
             # Warn user about large plotting data that can make the program lag
             choice = self.showQuestion("Attention! Large amount of data",
                                        "You are about to generate plot from a large amount of data which will make the program slow on most computers\nAre you sure you want to continue?")
@@ -173,83 +287,12 @@ class App():
         self.print_("Data changed, generating new plot")  # Msg plot new data
         self.figure.clf()  # Clear current plot
 
-        # Get current plotting option from plotMenu
-        pltChoice = self.plotMenu.currentText()
-
-        # Define the plotting data type
-        if pltChoice == "All zones":
-            pltData = self.data.sum(axis=1).copy()
-            legends = ["Sum of all zones"]  # Define legend from string
-        elif pltChoice == "Each zone":
-            pltData = self.data.copy()
-            legends = pltData.columns  # Get legends as columns
-
-        # ===========================
-        # Defining data to plot
-        # ===========================
-        # Define x-axis
-        if self.aggId != 5:  # If aggregation is not hour of the day
-            xLabel = "Date"
-            # Create a datetime series
-            xAxis = pd.to_datetime(self.tvec)
-        else:
-            xLabel = "Hour of the day"
-            xAxis = pd.to_datetime(self.tvec, format='%H')
-
-        # Check for dataFrame or Series type and rename index
-        if isinstance(pltData, pd.DataFrame):
-            pltData = pltData.set_index([xAxis])
-        else:
-            pltData.set_axis(0, xAxis)
-
-        # ===========================
-        # Plotting starts here
-        # ===========================
+        # Plot the current data, see render_plot. The anomalies are shaded
+        # on line plots
         ax = self.figure.add_subplot(1, 1, 1)  # Create axis to plot on
-
-        # Plot either line or bar plot depending on length of data
-        if len(pltData) < 25:
-            # Plot a bar graph. xAxis cannot be implemented in the same way
-            # as a line graph, so worked around it by plotting through pandas
-            # and assigning index in a separate command
-            pltData.plot(kind='bar', ax=ax,
-                         use_index=False)  # Pandas plot
-            # Seperate xTicks for hour of the day and month
-            if xLabel == "Date":  # Month
-                plt.xticks(range(len(pltData.index)),
-                           pltData.index.strftime("%b %Y"))  # Assign index
-            else:  # Hour of the day
-                plt.xticks(range(len(pltData.index)),
-                           pltData.index.strftime("%H:00"))  # Assign index
-        else:
-            # Plot a line graph
-            ax.plot(pltData.index, pltData.values)
-
-            # Define datetime locations and formatting. Using AutoDateXXXXX to
-            # make it adaptable to zooming
-            locator = mdates.AutoDateLocator()
-            formatter = mdates.AutoDateFormatter(locator)
-
-            # Create custom datetime formats from the self.scaled dictionary inside
-            # the AutoDateFormatter class
-            formatter.scaled[365] = '%b\n%Y'  # Years
-            formatter.scaled[30] = '%b\n%Y'  # Months
-            formatter.scaled[1.0] = '%d. %b\n%Y'  # Days
-            formatter.scaled[1. / 24.] = '%H:00\n%d. %b %y'  # Hours
-            formatter.scaled[1. / (60. * 24.)] = '%H:%M\n%d. %b'  # Minutes
-            formatter.scaled[1. / (60 * 60 * 24)] = '%H:%M:%S\n%d. %b'  # Sec
-
-            # Assign the locator and formatter to the xAxis
-            ax.xaxis.set_minor_locator(locator)
-            ax.xaxis.set_major_formatter(formatter)
-
-        self.figure.autofmt_xdate()  # Set proper rotations for xAxis
-        # Add additional options to plot (self explanatory)
-        ax.legend(legends, loc=0)
-        ax.grid(True)
-        ax.set_title("Electricity consumption per {}".format(self.period))
-        ax.set_xlabel(xLabel)
-        ax.set_ylabel(self.unit)
+        shade = self.plotAnomalies if self.anomalies is not None else None
+        render_plot(ax, self.current, self.plotMenu.currentText(), self.unit,
+                    shade=shade)
 
         # Set subplot size if plot is displayable. If it is below
         # 500 px width, then it is impossible to see anything anyways
@@ -261,6 +304,346 @@ class App():
         # Define variable to check if data has already been generated
         self.periodCheck = self.period
 
+# Overview and detail
+    def showOverview(self):
+        """
+        Shows the whole dataset in the overview strip beneath the plot, from
+        a coarse aggregation level. The range selected in it by dragging is
+        plotted at the resolution it needs, see detailPlot
+        """
+        if len(self.source) == 0:  # Nothing loaded yet
+            return
+        first = int(self.source.minutes[0])
+        last = int(self.source.minutes[-1]) + 1
+        if self.levels is None or self.levels.dataset is not self.source:
+            self.levels = PlotLevels(self.source, cache=self.pipeline.cache)
+            start, end = self.rangeBounds
+            self.detailRange = (first if start is None else start,
+                                last if end is None else end)
+
+        # Sum of all zones, a few thousand buckets at most
+        overview = self.levels.view(max_points=5000)
+        self.overviewFigure.clf()
+        ax = self.overviewFigure.add_subplot(1, 1, 1)
+        ax.plot(overview.datetimes(), overview.values.sum(axis=1), lw=0.8)
+        locator = mdates.AutoDateLocator(tz=overview.tz)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(
+            locator, tz=overview.tz))
+        ax.set_xlim(mdates.date2num(minutes_to_datetime(first)),
+                    mdates.date2num(minutes_to_datetime(last)))
+        ax.set_yticks([])
+        ax.tick_params(labelsize=7)
+        self.overviewFigure.subplots_adjust(left=0.02, right=0.98,
+                                            bottom=0.25, top=0.95)
+
+        # Draggable selection window, kept on self so it is not collected
+        self.span = SpanSelector(ax, self.selectDetail, "horizontal",
+                                 useblit=True, interactive=True,
+                                 drag_from_anywhere=True,
+                                 props=dict(alpha=0.3, facecolor="blue"))
+        self.span.extents = tuple(mdates.date2num(minutes_to_datetime(m))
+                                  for m in self.detailRange)
+        self.overviewCanvas.show()
+        self.overviewCanvas.draw()
+        self.detailPlot(*self.detailRange)
+
+    def hideOverview(self):
+        """
+        Hides the overview strip and plots the current data again
+        """
+        self.overviewCanvas.hide()
+        self.span = None
+        self.periodCheck = None
+        self.dataPlot()
+
+    def selectDetail(self, xmin, xmax):
+        """
+        Plots the range selected in the overview
+        """
+        start = datetime_to_minutes(mdates.num2date(xmin).replace(tzinfo=None))
+        end = datetime_to_minutes(mdates.num2date(xmax).replace(tzinfo=None))
+        if end > start:
+            self.detailPlot(start, end + 1)
+
+    def detailPlot(self, start, end):
+        """
+        Plots the range [start, end) of the source from the finest
+        aggregation level with at most a few thousand points in it, see
+        PlotLevels. The levels are aggregated once and then cached, so
+        moving the selection only plots what is on the screen
+        """
+        self.detailRange = (start, end)
+        view = self.levels.view(start, end)
+        self.updateMemory()  # Levels are aggregated on first use
+
+        self.figure.clf()
+        ax = self.figure.add_subplot(1, 1, 1)
+        render_plot(ax, view, self.plotMenu.currentText(),
+                    "Watt-hour per minute", bars=False,
+                    title="Average consumption per minute, {} level".format(
+                        view.period))
+        ax.set_xlim(mdates.date2num(minutes_to_datetime(start)),
+                    mdates.date2num(minutes_to_datetime(end)))
+        if int(self.canvas.width()) > 400:
+            plt.tight_layout()
+        self.canvas.draw()
+
+        # The plot of the current data has to be drawn again after focus
+        self.periodCheck = None
+
+# Load profile
+    def showProfile(self):
+        """
+        Plots and prints the average load profile of all zones in the date
+        range, split as selected in profileMenu. All splits come from a
+        single pass over the data in load_profile
+        """
+        choice = self.profileMenu.currentIndex()
+        resolution = 60 if choice < 4 else 15
+        split = ["all", "weekday", "month", "season"][choice % 4]
+
+        # Sum of all zones of every group
+        selected = self.source.take(*self.index.positions(*self.rangeBounds))
+        profile = load_profile(None, selected.data, resolution,
+                               minutes=selected.local())[split]
+        profile = profile.T.groupby(level=0, sort=False).sum(min_count=1).T
+        profile = profile[SPLITS[split]].dropna(axis=1, how="all")
+        profile.index = ["{:02d}:{:02d}".format(m // 60, m % 60)
+                         for m in profile.index]
+        profile.index.name = "Time of day"
+
+        pd.set_option('display.max_rows', 500)  # Set amount of rows
+        self.print_("Average load profile (Wh per minute)\n{}".format(
+            profile.round(2)))
+
+        # Show the plot if it is hidden
+        if not self.plotFrame.isVisible():
+            self.plotFrame.show()
+            self.plot_btn.setText("Hide plot")
+
+        self.figure.clf()
+        ax = self.figure.add_subplot(1, 1, 1)
+        ax.plot(range(len(profile)), profile.values)
+        step = len(profile) // 12
+        ax.set_xticks(range(0, len(profile), step))
+        ax.set_xticklabels(profile.index[::step])
+        ax.legend(profile.columns, loc=0)
+        ax.grid(True)
+        ax.set_title("Average load profile of all zones")
+        ax.set_xlabel("Time of day")
+        ax.set_ylabel("Watt-hour per minute")
+        if int(self.canvas.width()) > 400:
+            plt.tight_layout()
+        self.canvas.draw()
+
+        # The aggregated data has to be plotted again next time
+        self.periodCheck = None
+
+# Peak demand
+    def showDemand(self):
+        """
+        Plots and prints the monthly peak demand, the load-duration curves
+        or the monthly costs of all zones in the date range, as selected in
+        demandMenu
+        """
+        choice = self.demandMenu.currentIndex()
+        selected = self.source.take(*self.index.positions(*self.rangeBounds))
+        if len(selected) == 0:
+            self.showWarning("There are no measurements in the date range")
+            return
+
+        # Show the plot if it is hidden
+        if not self.plotFrame.isVisible():
+            self.plotFrame.show()
+            self.plot_btn.setText("Hide plot")
+
+        self.figure.clf()
+        ax = self.figure.add_subplot(1, 1, 1)
+        pd.set_option('display.max_rows', 500)  # Set amount of rows
+        if choice == 0:
+            peaks = peak_demand(None, selected.data, 3,
+                                minutes=selected.minutes, tz=selected.tz)
+            self.print_("Top 3 peaks of every month (Wh per minute)\n{}"
+                        .format(peaks.to_string(index=False)))
+            highest = peaks[peaks["rank"] == 1].pivot(
+                index="month", columns="zone", values="demand")
+            highest[selected.zones + ["All"]].plot.bar(ax=ax, rot=0)
+            ax.set_title("Monthly peak demand")
+            ax.set_xlabel("Month")
+            ax.set_ylabel("Watt-hour per minute")
+        elif choice == 1:
+            curves = load_duration(None, selected.data)
+            self.print_("Load-duration curves (Wh per minute)\n{}".format(
+                curves.iloc[::5].round(2)))
+            curves.plot(ax=ax)
+            ax.set_title("Load-duration curves")
+            ax.set_xlabel("Time exceeded (%)")
+            ax.set_ylabel("Watt-hour per minute")
+        else:
+            if self.tariff is None:
+                self.showWarning("Please load a tariff first, see Options")
+                return
+            # The hourly energy is found once, then every tariff is priced
+            # from it
+            if self.tariffEngine is None:
+                self.tariffEngine = TariffEngine(self.source,
+                                                 cache=self.datasets)
+            costs = self.tariffEngine.costs(self.tariff, *self.rangeBounds)
+            self.updateMemory()  # The hourly level may have been added
+            if len(costs) == 0:
+                self.showWarning("There are no whole hours in the date range")
+                return
+            currency = self.tariff["currency"] or "cost"
+            self.print_("Monthly costs (kWh, kW and {})\n{}".format(
+                currency, costs.round(2).to_string(index=False)))
+            totals = costs.pivot(index="period", columns="zone",
+                                 values="total")
+            totals[selected.zones + ["All"]].plot.bar(ax=ax, rot=0)
+            ax.set_title("Monthly costs")
+            ax.set_xlabel("Month")
+            ax.set_ylabel(currency.capitalize())
+        ax.grid(True)
+        if int(self.canvas.width()) > 400:
+            plt.tight_layout()
+        self.canvas.draw()
+
+        # The aggregated data has to be plotted again next time
+        self.periodCheck = None
+
+# Anomalies
+    def detectAnomalies(self):
+        """
+        Finds abnormal consumption in the minute data of the date range with
+        detect_anomalies in a WorkerThread, then lists the flagged intervals
+        and shades them in the plot
+        """
+        worker = getattr(self, "anomalyWorker", None)
+        if worker is not None and worker.isRunning():
+            self.showWarning("Please wait for the current detection to finish")
+            return
+        selected = self.source.take(*self.index.positions(*self.rangeBounds))
+        self.print_("Looking for anomalies in {} measurements...".format(
+            len(selected)))
+        self.statusbar.showMessage("Looking for anomalies...")
+        self.anomalyWorker = WorkerThread(
+            partial(detect_anomalies, tz=selected.tz), None, selected.data,
+            60, 6.0, 120, 30, selected.minutes)
+        self.anomalyWorker.done.connect(self.showAnomalies)
+        self.anomalyWorker.failed.connect(
+            lambda msg: self.showCritical(
+                "Error! Anomaly detection failed:\n{}".format(msg)))
+        self.anomalyWorker.start()
+
+    def showAnomalies(self, anomalies):
+        """
+        Lists the anomalies found by detectAnomalies and plots them again
+        """
+        self.anomalies = anomalies
+        self.statusbar.showMessage(
+            "Found {} anomalies".format(len(anomalies)), 5000)
+        if len(anomalies) == 0:
+            self.print_("No anomalies found")
+            return
+
+        pd.set_option('display.max_rows', 500)  # Set amount of rows
+        counts = anomalies.groupby("detector").size()
+        self.print_("Anomalies\n" + "\n".join(
+            "{}: {} intervals ({})".format(name, counts.get(name, 0), text)
+            for name, text in DETECTORS.items()))
+        listed = anomalies.nlargest(200, "score").sort_values("start")
+        self.print_("{} intervals with the highest scores\n{}".format(
+            len(listed), listed.round(2).to_string(index=False)))
+
+        self.periodCheck = None
+        self.dataPlot()
+
+    def plotAnomalies(self, ax):
+        """
+        Shades the anomalies with the highest scores in the plot, colored
+        by detector
+        """
+        colors = dict(zip(DETECTORS, ["red", "orange", "purple", "grey",
+                                      "brown"]))
+        shown = self.anomalies.nlargest(500, "score")
+        for detector, group in shown.groupby("detector"):
+            for start, end in zip(group.start, group.end):
+                ax.axvspan(start, end + pd.Timedelta(minutes=1),
+                           color=colors[detector], alpha=0.3, lw=0)
+
+# Workspace
+    def addWorkspace(self):
+        """
+        Adds the loaded file to the workspace, so it can be compared with
+        other files
+        """
+        try:
+            self.workspace.add(self.fileName, self.source)
+        except ValueError as e:
+            self.showWarning(str(e))
+            return
+        self.print_("Added {} to the workspace, which has {} datasets: "
+                    "{}".format(self.fileName, len(self.workspace),
+                                ", ".join(self.workspace.names)))
+
+    def clearWorkspace(self):
+        """
+        Removes all datasets from the workspace
+        """
+        self.workspace.clear()
+        self.print_("Workspace cleared")
+
+    def compareWorkspace(self):
+        """
+        Plots the sum of all zones of every dataset in the workspace on top
+        of each other, or the difference to the first dataset, with the
+        current aggregation and prints the comparative statistics. All
+        datasets are aggregated together by the Workspace
+        """
+        if len(self.workspace) < 2:
+            self.showWarning("Add at least two datasets to the workspace")
+            return
+        choice = self.compareMenu.currentIndex()
+        self.workspace.set_week_alignment(choice % 2 == 1)
+        names = self.workspace.names
+        if choice < 2:
+            results = self.workspace.aggregate(self.period)
+            title = "Electricity consumption per {}".format(self.period)
+        else:
+            results = {"{} - {}".format(name, names[0]):
+                       self.workspace.difference(self.period, names[0], name)
+                       for name in names[1:]}
+            title = "Difference to {} per {}".format(names[0], self.period)
+
+        pd.set_option('display.max_rows', 500)  # Set amount of rows
+        self.print_("Comparison per {} (Watt-hour)\n{}".format(
+            self.period, self.workspace.statistics(self.period).round(2)))
+
+        # Show the plot if it is hidden
+        if not self.plotFrame.isVisible():
+            self.plotFrame.show()
+            self.plot_btn.setText("Hide plot")
+
+        self.figure.clf()
+        ax = self.figure.add_subplot(1, 1, 1)
+        for result in results.values():
+            ax.plot(result.datetimes(), result.values.sum(axis=1))
+        if self.period == "hour of the day":
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:00'))
+        self.figure.autofmt_xdate()
+        ax.legend(list(results), loc=0)
+        ax.grid(True)
+        ax.set_title(title)
+        ax.set_xlabel("Date" if choice % 2 == 0 else
+                      "Date of {}".format(names[0]))
+        ax.set_ylabel("Watt-hour")
+        if int(self.canvas.width()) > 400:
+            plt.tight_layout()
+        self.canvas.draw()
+
+        # The aggregated data has to be plotted again next time
+        self.periodCheck = None
+
 # Show/hide stats
     def statToggle(self):
         """
@@ -288,7 +671,7 @@ class App():
         if not self.statistics.isVisible():
             return
         # Get statistics dataframe
-        df_stat = print_statistics(self.tvec, self.data)
+        df_stat = self.currentStatistics()
 
         # Set statistics widget to same size of df_stat
         self.statistics.setColumnCount(
@@ -304,9 +687,10 @@ class App():
 
         # Set layout for horizontal and vertical headers
         self.statistics.setHorizontalHeaderLabels(
-            ["Min", "25%", "50%", "75%", "Max"])
+            [str(stat).capitalize() for stat in df_stat.columns])
         self.statistics.setVerticalHeaderLabels(
-            ["Zone 1", "Zone 2", "Zone 3", "Zone 4", "All"])
+            ["Zone {}".format(zone) if zone != "All" else zone
+             for zone in df_stat.index])
         # Dynamically adjust widget size
         self.statistics.setSizeAdjustPolicy(
             QtWidgets.QAbstractScrollArea.AdjustToContents)
@@ -314,6 +698,43 @@ class App():
         for column in range(len(df_stat.columns)):
             self.statistics.setColumnWidth(column, 75)
 
+    def currentStatistics(self):
+        """
+        Statistics of the current aggregation from print_statistics. The
+        cached statistics are used when the full date range is selected
+        """
+        if (self.cachedStats is not None and self.dateRange is None and
+                self.period in self.cachedStats and
+                list(self.cachedStats[self.period].columns) == self.statList):
+            stat = self.cachedStats[self.period]
+            if self.unit == "Kilowatt-hour":
+                return stat * scale_statistics(self.statList, 1 / 1000)
+            return stat
+        # print_statistics does not use tvec
+        return print_statistics(None, self.current.data, self.statList)
+
+    def chooseStatistics(self):
+        """
+        Asks for the statistics shown in the statistics table, as a comma
+        separated list, see compute_statistics
+        """
+        text, ok = QtWidgets.QInputDialog.getText(
+            MainWindow, "Choose statistics",
+            "Statistics separated by commas, i.e. count, sum, mean, std, "
+            "min, max, load factor\nand percentiles such as 25% or 99.5%:",
+            text=", ".join(self.statList))
+        if not ok:
+            return
+        try:
+            stats = parse_statistics(
+                [stat for stat in text.split(",") if stat.strip()])
+        except ValueError as e:
+            self.showWarning(str(e))
+            return
+        self.statList = stats or list(STATISTICS)
+        self.print_("Statistics: {}".format(", ".join(self.statList)))
+        self.printStat()
+
 # Print function
     def print_(self, text):
         """
@@ -337,123 +758,763 @@ class App():
         Aggregate data based on the button clicked, change units
         if neccesary and display new aggregation
 
-        Uses aggregate_measurements function to aggregate the data
+        Uses aggregate_dataset function to aggregate the data
         """
-        periodStr = ["minute", "hour", "day", "month",
-                     "hour of the day"]  # String of periods
-
         # Get the sender (which button is pressed) and it's id
         sender = MainWindow.sender()
         self.aggId = sender.property("AggId")
 
+        self.updateAggregation()
+
+    def updateAggregation(self, show=True):
+        """
+        Aggregate the data inside the current date range with the current
+        aggregation id and display the new aggregation
+
+        INPUT:
+            show: Boolean, if False nothing is printed
+        """
+        periodStr = ["minute", "hour", "day", "month",
+                     "hour of the day"]  # String of periods
+        aggStr = ["Minutely", "Hourly", "Daily", "Monthly",
+                  "Hour-of-day"]  # Names of the aggregate buttons
+
         # Define period
         self.period = periodStr[(self.aggId) - 1]
 
         # Aggregate data, but always from raw data to go from higher
         # aggregates to lower aggregates. I.e Month -> Hour
-        self.tvec, self.data = aggregate_measurements(
-            self.tvecOld, self.dataOld, self.period)
-
-        # Change unit if any value of data is above 5000
-        if (self.data > 5000).any().any():
-            self.data = self.data / 1000
-            self.unit = "Kilowatt-hour"
-        else:
-            self.unit = "Watt-hour"
+        # Change unit if any value of data is above 5000. Range selection,
+        # aggregation and unit change are done in one pass by LazyDataset
+        self.current, self.unit = self.pipeline.select(
+            *self.rangeBounds).aggregate(self.period).auto_unit(5000).collect()
+        self.datasets.pin("current", self.current)
+        self.updateMemory()
+
+        # Data has changed, so make sure the plot is regenerated
+        self.periodCheck = None
 
         # Display the changes made
-        self.aggcurrent_line.setText("{} aggregation | Unit: {}".format(
-            sender.text(), self.unit))
-        self.print_("Aggregated for the {}".format(
-            periodStr[self.aggId - 1]))
+        text = "{} aggregation | Unit: {}".format(
+            aggStr[self.aggId - 1], self.unit)
+        if self.dateRange is not None:
+            text += " | {:%Y-%m-%d %H:%M} to {:%Y-%m-%d %H:%M}".format(
+                *self.dateRange)
+        self.aggcurrent_line.setText(text)
+        if show:
+            self.print_("Aggregated for the {}".format(
+                periodStr[self.aggId - 1]))
+
+# Select date range
+    def rangeApply(self):
+        """
+        Only analyze the data between the two dates in the date range box.
+        The rows are found by binary search in the time index, so the
+        aggregation, statistics and plot only cost the size of the range
+        """
+        start = self.range_start.dateTime().toPyDateTime()
+        end = self.range_end.dateTime().toPyDateTime()
+        if start >= end:
+            self.showWarning("The start of the range must be before the end")
+            return
+
+        # Slice out the range. End is included in the range box, so add
+        # a minute to get an exclusive end
+        startMinute = self.utcMinute(start)
+        endMinute = self.utcMinute(end) + 1
+        i, j = self.index.positions(startMinute, endMinute)
+        if j == i:
+            self.showWarning("No measurements in the selected date range")
+            self.rangeReset()
+            return
+
+        self.rangeBounds = (startMinute, endMinute)
+        self.dateRange = (start, end)
+        self.print_("Selected {} measurements from {:%Y-%m-%d %H:%M} to "
+                    "{:%Y-%m-%d %H:%M}".format(j - i, start, end))
+        self.rangeStat(i, j)
+        self.updateAggregation()
+
+    def rangeReset(self):
+        """
+        Analyze the full dataset again
+        """
+        self.rangeBounds = (None, None)
+        self.dateRange = None
+        self.range_start.setDateTime(
+            self.localDatetime(self.index.first()))
+        self.range_end.setDateTime(self.localDatetime(self.index.last()))
+        self.rangeStat(0, len(self.index))
+        self.updateAggregation()
+
+    def localDatetime(self, minute):
+        """
+        Datetime shown in the range box of a minute of the loaded dataset,
+        which is local time if the dataset has a time zone
+        """
+        if self.source.tz is not None:
+            minute = to_local([minute], self.source.tz)[0]
+        return minutes_to_datetime(minute)
+
+    def utcMinute(self, dt):
+        """
+        Minute of the loaded dataset of a datetime from the range box, the
+        inverse of localDatetime
+        """
+        minute = datetime_to_minutes(dt)
+        if self.source.tz is not None:
+            minute = int(localize_minutes([minute], self.source.tz,
+                                          "dst")[0][0])
+        return minute
+
+# Range statistics
+    def rangeStat(self, i, j, show=True):
+        """
+        Displays total, mean, minimum and maximum consumption of the rows
+        i to j-1 from the range index, which needs no aggregation
+
+        INPUT:
+            i, j: row positions of the range, i.e. from TimeIndex.positions
+            show: Boolean, if False only the readout in the range box is
+                updated and nothing is printed
+        """
+        stats = self.rangeIndex.range_stats(i, j)
+
+        # Short readout of all zones in the range box
+        self.range_stat_line.setText(
+            "All zones | Total: {:.3f} kWh | Mean: {:.1f} Wh | "
+            "Min: {:.1f} Wh | Max: {:.1f} Wh".format(
+                stats['sum'][-1] / 1000, stats['mean'][-1],
+                stats['min'][-1], stats['max'][-1]))
+
+        if not show:
+            return
+
+        # Zone-wise table in the display window
+        df_stat = pd.DataFrame(stats, index=["Zone 1", "Zone 2", "Zone 3",
+                                             "Zone 4", "All"])
+        df_stat['sum'] = df_stat['sum'] / 1000
+        df_stat.columns = ["Total (kWh)", "Mean (Wh)", "Min (Wh)", "Max (Wh)"]
+        self.print_("Range statistics\n{}".format(df_stat.round(3)))
 
 # Load data
     def dataLoad(self):
         """
         Load data from the filename specified in the loadfile_input QLineEdit
         or from the location of the dropped file into the drop_input box
-        If user's screen is small, then open in fullscreen and warn user
 
-        Also resets the second tab and all relating data, in case the user
-        loads data a second time
+        The file is loaded in a WorkerThread. If the file has been loaded
+        with the same errorhandling before, the cached aggregations and
+        statistics are shown while the measurements are loading
 
-        Uses load_measurements function to aggregate the data
+        Uses load_dataset function to load the data
         """
         sender = MainWindow.sender()  # Get sender (by drag n drop or filename)
+        for name in ("keyWorker", "loadWorker"):
+            worker = getattr(self, name, None)
+            if worker is not None and worker.isRunning():
+                self.showWarning("Please wait for the current file to load")
+                return
         try:
             # Define filename dependent on sender
             if sender == (self.drop_input):
                 filename = self.drop_input.floc  # Get file from drop
             else:
                 filename = self.loadfile_input.text()  # Get file from text
+            localFile = QtCore.QUrl(filename).toLocalFile() or filename
 
             # Define fmode from current dropdown menu
             fmode = str(self.error_dropmenu.currentText())
 
             fmode = fmode[0:fmode.find("(") - 1]  # Only get relevant text
+            # Longest gap to fill, None if there is no limit
+            maxGap = self.maxgap_spin.value() or None
+
+            # Check the file type from its name and first bytes, so a wrong
+            # file fails before it is read
+            compression = check_file(localFile)
+            # Check the layout from the first and last lines, so a malformed
+            # file also fails at once. The layout is used to parse the file,
+            # so it is only found once
+            schema = sniff_measurements(localFile)
+
+            # Stop following any previous file and remember how much of
+            # the file is loaded, so live mode can continue from there.
+            # Compressed files cannot be followed
+            self.stopLive()
+            liveOffset = None
+            if self.live_check.isChecked() and self.timeZone is not None:
+                self.showWarning("Live mode only works without a time zone, "
+                                 "loading without live mode")
+            elif self.live_check.isChecked() and compression is None:
+                liveOffset = os.path.getsize(localFile)
+            elif self.live_check.isChecked():
+                self.showWarning("Live mode only works with uncompressed "
+                                 ".csv files, loading without live mode")
+
+            self.schema = schema
+            self.cacheKey = None
+            self.cached = None
+            self.cachedStats = None
+            self.previewing = False
 
-            # Call load data function
-            self.tvec, self.data, warning = load_measurements(
-                filename, fmode)
-
-            # Check if warning needs to be printed
-            if type(warning) == str:
-                self.showWarning(warning)  # display warning
-                self.error_dropmenu.setCurrentIndex(2)  # set to drop mode
-
-            # Save data for later use
-            self.tvecOld, self.dataOld = self.tvec, self.data
-
-            # Send information to user
-            self.showInfo(
-                "File succesfully loaded, with the following errorhandling: \n{}".format(fmode))
+        # Print message if any of given errors are raised
+        except FileNotFoundError:
+            self.showCritical(
+                "Error! No such file exists, please try again \nIs the file in the same directory as the .exe file? (Does not matter for drag and drop)")
+            return
+        except SchemaError as e:
+            self.showCritical("Error! The file is not a measurement file "
+                              "that can be read\n{}".format(e.msg))
+            return
+        except FileExtensionError as e:
+            self.showCritical("Error! Wrong file type, please try again\n"
+                              "{}".format(e.msg))
+            return
+        except OSError:
+            self.showCritical(
+                "Error! Can only load one file at a time, please try again")
+            return
 
-            # Ask if user wants to open maximized
-            choice = self.showQuestion("Recommended view",
-                                       "It is recommended to run this program in maximized mode\n"
-                                       "Do you want to maximize the window?")
-            # If yes, open as maximized
-            if choice == 1:
-                MainWindow.showMaximized()
+        self.statusbar.showMessage("Loading {}...".format(localFile))
+        self.load_progress.setValue(0)
+        self.load_progress.show()
 
-            # Set second tab as enabled
-            self.tabWidget.setTabEnabled(1, True)
+        # Look for results of an earlier session before loading. Only the
+        # start and end of the file are hashed, the whole file is checked
+        # after it has been loaded, see storeResults. Files in live mode
+        # keep changing, so they are not cached
+        if liveOffset is not None:
+            self.startLoad(localFile, fmode, maxGap, liveOffset)
+            return
+        self.keyWorker = WorkerThread(self.findCached, localFile, fmode,
+                                      maxGap, self.timeZone)
+        self.keyWorker.done.connect(
+            lambda result: self.keyDone(result, localFile, fmode, maxGap))
+        self.keyWorker.error.connect(self.loadFailed)
+        self.keyWorker.start()
+
+    def findCached(self, filename, fmode, maxGap, tz):
+        """
+        Cache key of the file and the results cached under it, or None.
+        Runs in keyWorker
+        """
+        key = quick_key(filename, fmode, maxGap, tz=tz)
+        return key, self.cache.get(key)
 
-            # Reset analysis tab in case the user loaded new data
-            self.aggcurrent_line.setText(
-                "Minutely aggregation | Unit: Watt-hour")  # Set aggregation text
-            self.display_window.setPlainText("")  # Clear display window
-            self.tabWidget.setCurrentIndex(1)  # Change to second tab
-            self.periodCheck = None  # reset previous plot
+    def keyDone(self, result, filename, fmode, maxGap):
+        """
+        Shows the cached results found by findCached, if any, while the file
+        is loading
+        """
+        self.cacheKey, self.cached = result
+        if self.cached is not None:
+            self.showCached()
+        self.startLoad(filename, fmode, maxGap, None)
 
-            # Check if any windows are open in display_box and close them
-            if self.statistics.isVisible():
-                self.stat_btn.click()
+    def startLoad(self, localFile, fmode, maxGap, liveOffset):
+        """
+        Loads the file in the background. The file is parsed in chunks, and
+        every chunk updates the progress bar and the preview
+        """
+        self.loadWorker = WorkerThread(
+            partial(load_dataset, tz=self.timeZone, schema=self.schema),
+            localFile, fmode, maxGap, progress=True)
+        self.loadWorker.progress.connect(self.loadProgress)
+        self.loadWorker.done.connect(
+            lambda result: self.loadDone(result, localFile, fmode, maxGap,
+                                         liveOffset))
+        self.loadWorker.error.connect(self.loadFailed)
+        self.loadWorker.start()
+
+    def showCached(self):
+        """
+        Shows the cached aggregations and statistics of the file while its
+        measurements are loading
+        """
+        self.cachedStats = self.cached["stats"]
+        self.summary = self.cached["summary"]
+        self.showPartial(self.cached["periods"], self.cached["zones"])
+        self.print_("Showing results from an earlier session while {} "
+                    "measurements are loading".format(self.cached["rows"]))
 
-            if self.canvas.isVisible():
+    def loadProgress(self, fraction, preview):
+        """
+        Shows the progress of dataLoad. Unless cached results are shown,
+        the daily and monthly sums of the rows parsed so far are shown
+        and plotted as a preview
+        """
+        self.load_progress.setValue(int(100 * fraction))
+        if self.cached is not None or len(preview) == 0:
+            return
+        periods = {"day": preview,
+                   "month": aggregate_dataset(preview, "month")}
+
+        if not self.previewing:
+            self.previewing = True
+            self.summary = ("The data quality report is made when the file "
+                            "has been loaded")
+            self.showPartial(periods, preview.zones)
+            self.print_("Showing a preview while the file is loading. "
+                        "Corrupted measurements are not included yet")
+            if not self.canvas.isVisible():
                 self.plot_btn.click()
-                self.figure.clf()
+            return
 
-            if self.plot_focus_btn.text() == "Unfocus plot":
-                self.plot_focus_btn.click()
+        # Update the preview of the current aggregation and plot
+        self.pipeline.cache.update(periods)
+        self.updateAggregation(show=False)
+        self.dataPlot()
+        self.printStat()
+
+    def showPartial(self, periods, zones):
+        """
+        Shows aggregations of the file while its measurements are loading,
+        i.e. cached results or a preview. Only the aggregations in periods
+        can be selected until the measurements have been loaded
+        """
+        self.source = Dataset.empty(zones)
+        self.index = TimeIndex(minutes=self.source.minutes)
+        self.newPipeline(periods)
+        self.rangeBounds = (None, None)
+        self.dateRange = None
+        self.setLoading(True, periods)
+
+        self.askMaximized()
+        self.showAnalysis()
+        self.aggId = 3  # Daily
+        self.updateAggregation()
+
+    def loadDone(self, result, filename, fmode, maxGap, liveOffset):
+        """
+        Sets up the analysis of the measurements loaded by dataLoad
+        """
+        self.source, warning, self.quality = result
+        self.summary = quality_summary(self.quality)
+        self.fileName = os.path.basename(filename)
+        self.anomalies = None
+        self.statusbar.showMessage("Loaded {}".format(filename), 5000)
+        self.load_progress.hide()
+
+        # Check if warning needs to be printed
+        if type(warning) == str:
+            self.showWarning(warning)  # display warning
+            self.error_dropmenu.setCurrentIndex(2)  # set to drop mode
+
+        # Build the time index on the minutes of the dataset
+        self.index = TimeIndex(minutes=self.source.minutes)
+
+        # Start with the full date range selected
+        self.rangeBounds = (None, None)
+        self.dateRange = None
+        for dateEdit in (self.range_start, self.range_end):
+            dateEdit.setDateTimeRange(
+                self.localDatetime(self.index.first()),
+                self.localDatetime(self.index.last()))
+        self.range_start.setDateTime(
+            self.localDatetime(self.index.first()))
+        self.range_end.setDateTime(self.localDatetime(self.index.last()))
+
+        # Build the range statistics index. The index, the pipeline and
+        # the current aggregation all share the values of the dataset
+        self.rangeIndex = RangeIndex(self.source.values)
+        # The dataset manager holds the cached aggregations from now on, so
+        # they can be spilled to disk
+        self.newPipeline(None if self.cached is None else
+                         self.cached.pop("periods"))
+        self.setLoading(False)
+
+        # Follow the file if live mode is selected. If forward or
+        # backward fill failed, the rest is also loaded in drop mode
+        if liveOffset is not None:
+            self.startLive(filename, "drop" if warning else fmode,
+                           liveOffset, maxGap)
+
+        # The cached results or a preview are already shown, so only the
+        # preview has to be replaced with the exact aggregation
+        if self.cached is not None or self.previewing:
+            self.print_("File succesfully loaded, with the following "
+                        "errorhandling: {}".format(fmode))
+            self.print_(self.summary)  # Data quality
+            if self.cached is None:
+                self.updateAggregation(show=False)
+                self.dataPlot()
+                self.printStat()
+            self.rangeStat(0, len(self.index))
+        else:
+            self.current = self.source
+            self.aggId = 1
+            self.period = "minute"
+            self.unit = "Watt-hour"
 
-            screen_res = QtWidgets.QDesktopWidget().availableGeometry()
+            # Send information to user
+            self.showInfo(
+                "File succesfully loaded, with the following errorhandling: \n{}".format(fmode))
+            self.askMaximized()
+            self.showAnalysis()
+            self.aggcurrent_line.setText(
+                "Minutely aggregation | Unit: Watt-hour")  # Set aggregation text
+            self.rangeStat(0, len(self.index))  # Statistics of all data
+
+        # Check the cached results against the whole file, or compute them,
+        # in the background
+        if self.cacheKey is not None:
+            key = self.cacheKey
+            content = None if self.cached is None else self.cached["content"]
+            self.cacheWorker = WorkerThread(
+                self.storeResults, self.source, filename, fmode, maxGap,
+                self.source.tz, warning, self.summary, content)
+            self.cacheWorker.done.connect(
+                lambda results: self.cacheDone(key, results))
+            self.cacheWorker.start()
+
+    def storeResults(self, source, filename, fmode, maxGap, tz, warning,
+                     summary, content):
+        """
+        Results of the loaded file for the cache, or None if the cached
+        results, which were made from a file with the file_key content, are
+        of the same file. Runs in cacheWorker
+        """
+        key = file_key(filename, fmode, maxGap, tz=tz)
+        if key == content:
+            return None
+        return dict(cache_results(source, warning, summary), content=key)
 
-            if int(screen_res.width()) < 1300 or int(screen_res.height()) < 700:
-                self.showWarning(
-                    "You have a very small screen!\nProgram might crash when plotting. \nUsing fullscreen mode to minimize chances of a crash")
-                MainWindow.showFullScreen()
+    def loadFailed(self, error):
+        """
+        Shows why loading a file in dataLoad failed
+        """
+        self.statusbar.clearMessage()
+        self.load_progress.hide()
+        self.setLoading(False)
+        if self.cached is not None or self.previewing:
+            # Do not keep showing results of a broken file
+            self.cached = self.cachedStats = None
+            self.previewing = False
+            self.tabWidget.setCurrentIndex(0)
+            self.tabWidget.setTabEnabled(1, False)
 
         # Print message if any of given errors are raised
-        except FileNotFoundError:
+        if isinstance(error, FileNotFoundError):
             self.showCritical(
                 "Error! No such file exists, please try again \nIs the file in the same directory as the .exe file? (Does not matter for drag and drop)")
-        except FileExtensionError:
+        elif isinstance(error, SchemaError):
+            self.showCritical("Error! The file is not a measurement file "
+                              "that can be read\n{}".format(error.msg))
+        elif isinstance(error, FileExtensionError):
             self.showCritical(
                 "Error! Wrong file extension, please try again")
-        except OSError:
+        elif isinstance(error, OSError):
             self.showCritical(
                 "Error! Can only load one file at a time, please try again")
+        else:
+            self.showCritical("Error! Could not load the file:\n{}".format(
+                error))
+
+    def cacheDone(self, key, results):
+        """
+        Stores the results from storeResults and uses them for the rest of
+        the session, unless another file has been loaded since. Cached
+        results that turned out to be of another file are replaced on the
+        screen too
+        """
+        if results is None:
+            return
+        try:
+            self.cache.put(key, results)
+        except OSError:
+            self.statusbar.showMessage("Could not save the results cache", 5000)
+        if key == self.cacheKey and getattr(self, "liveReader", None) is None:
+            self.newPipeline(results["periods"])
+            self.cachedStats = results["stats"]
+            if self.cached is not None:
+                self.cached = None
+                self.print_("The file has changed since the results of the "
+                            "earlier session, they have been computed again")
+                self.updateAggregation(show=False)
+                self.dataPlot()
+                self.printStat()
+
+    def newPipeline(self, periods=None):
+        """
+        Starts a LazyDataset on the source. Its aggregations, and those of
+        the focused plot, are held by the dataset manager, which spills them
+        to disk when the memory budget is exceeded, see DatasetManager.
+        Large aggregations are run in a process pool that keeps the source
+        in shared memory until the next file is loaded, see
+        ParallelAggregator. The source grows in live mode, so it is
+        aggregated serially then
+
+        INPUT:
+            periods: dictionary with an aggregated Dataset of all rows for
+                some periods, i.e. cached results
+        """
+        self.datasets.clear()
+        self.datasets.pin("source", self.source)
+        self.datasets.update(periods or {})
+        self.closeAggregator()
+        if getattr(self, "liveReader", None) is None:
+            self.aggregator = ParallelAggregator(self.source)
+        self.pipeline = LazyDataset(self.source, self.index,
+                                    cache=self.datasets,
+                                    aggregator=self.aggregator)
+        self.tariffEngine = None
+        self.updateMemory()
+
+    def closeAggregator(self):
+        """
+        Stops the process pool of the source and frees its shared memory
+        """
+        if self.aggregator is not None:
+            self.aggregator.close()
+            self.aggregator = None
+
+    def setLoading(self, loading, periods=()):
+        """
+        Disables the parts of the analysis tab that need the measurements
+        while they are loading. Only the aggregations in periods can be
+        selected
+        """
+        buttons = {"minute": self.agg_min_btn, "hour": self.agg_hour_btn,
+                   "day": self.agg_day_btn, "month": self.agg_month_btn,
+                   "hour of the day": self.agg_hDay_btn}
+        for period, button in buttons.items():
+            button.setEnabled(not loading or period in periods)
+        for widget in (self.range_box, self.profile_btn,
+                       self.workspace_add_btn, self.anomaly_btn,
+                       self.demand_btn):
+            widget.setEnabled(not loading)
+
+    def askMaximized(self):
+        """
+        Asks if the user wants to open the window maximized
+        """
+        # Ask if user wants to open maximized
+        choice = self.showQuestion("Recommended view",
+                                   "It is recommended to run this program in maximized mode\n"
+                                   "Do you want to maximize the window?")
+        # If yes, open as maximized
+        if choice == 1:
+            MainWindow.showMaximized()
+
+    def showAnalysis(self):
+        """
+        Resets and shows the second tab after a file has been loaded
+        If user's screen is small, then open in fullscreen and warn user
+        """
+        # Set second tab as enabled
+        self.tabWidget.setTabEnabled(1, True)
+
+        # Reset analysis tab in case the user loaded new data
+        self.display_window.setPlainText("")  # Clear display window
+        self.print_(self.summary)  # Data quality
+        self.tabWidget.setCurrentIndex(1)  # Change to second tab
+        self.periodCheck = None  # reset previous plot
+
+        # Check if any windows are open in display_box and close them
+        if self.statistics.isVisible():
+            self.stat_btn.click()
+
+        if self.canvas.isVisible():
+            self.plot_btn.click()
+            self.figure.clf()
+
+        if self.plot_focus_btn.text() == "Unfocus plot":
+            self.plot_focus_btn.click()
+
+        screen_res = QtWidgets.QDesktopWidget().availableGeometry()
+
+        if int(screen_res.width()) < 1300 or int(screen_res.height()) < 700:
+            self.showWarning(
+                "You have a very small screen!\nProgram might crash when plotting. \nUsing fullscreen mode to minimize chances of a crash")
+            MainWindow.showFullScreen()
+
+# Live mode
+    def startLive(self, filename, fmode, offset, maxGap):
+        """
+        Follows the loaded file and adds measurements as they are appended.
+        The file is watched with a QFileSystemWatcher, and polled every few
+        seconds in case the file system does not report changes
+        """
+        last = self.source.take(len(self.source) - 1, len(self.source))
+        self.liveReader = TailReader(filename, fmode, last.tvec, last.data,
+                                     offset, maxGap, self.schema)
+        # Store the data in growable buffers so new rows are cheap to add
+        self.liveBuffer = LiveBuffer(self.source)
+        self.source = self.current = self.liveBuffer.dataset()
+        self.index = TimeIndex(minutes=self.source.minutes)
+        self.rangeIndex = RangeIndex(self.source.values)
+        self.newPipeline()
+
+        self.liveWatcher = QtCore.QFileSystemWatcher([filename])
+        self.liveWatcher.fileChanged.connect(self.liveUpdate)
+        self.liveTimer = QtCore.QTimer()
+        self.liveTimer.timeout.connect(self.liveUpdate)
+        self.liveTimer.start(5000)
+        self.statusbar.showMessage("Live mode: following {}".format(filename))
+
+    def stopLive(self):
+        """
+        Stops following the file in live mode
+        """
+        if getattr(self, "liveReader", None) is None:
+            return
+        self.liveTimer.stop()
+        self.liveWatcher.fileChanged.disconnect(self.liveUpdate)
+        self.liveReader = None
+        self.statusbar.showMessage("Live mode stopped", 5000)
+
+    def liveUpdate(self):
+        """
+        Reads the measurements appended to the file in live mode and extends
+        the data, indexes, current aggregation and plot with them
+        """
+        if getattr(self, "liveReader", None) is None:
+            return
+        # Some programs replace the file when saving, then watch it again
+        if not self.liveWatcher.files():
+            self.liveWatcher.addPath(self.liveReader.filename)
+        try:
+            new = self.liveReader.read()
+        except OSError as e:
+            self.stopLive()
+            self.showWarning("Live mode stopped:\n{}".format(e))
+            return
+        if new is None:
+            return
+        new = Dataset.from_frames(*new)
+
+        # Extend the data, the indexes and the cached aggregations, which
+        # refer to the buffers. Only the new rows are indexed and only the
+        # last bucket of every aggregation is aggregated again
+        self.liveBuffer.append(new)
+        self.source = self.liveBuffer.dataset()
+        self.index.extend(minutes=self.source.minutes)
+        self.rangeIndex.extend(self.source.values)
+        self.datasets.pin("source", self.source)
+        self.pipeline = self.pipeline.extend(self.source, self.index)
+        self.tariffEngine = None
+        self.statusbar.showMessage("Live mode: {} new measurements".format(
+            len(new)))
+
+        # A selected date range does not change when new data arrives
+        if self.dateRange is not None:
+            return
+        self.range_end.setMaximumDateTime(
+            self.localDatetime(self.index.last()))
+        self.range_end.setDateTime(self.localDatetime(self.index.last()))
+        self.rangeStat(0, len(self.index), show=False)
+        self.liveAggregate()
+
+    def liveAggregate(self):
+        """
+        Updates the current aggregation with new measurements. Only the
+        last bucket and the new rows are aggregated again
+        """
+        # Keep the current unit
+        factor = 1 / 1000 if self.unit == "Kilowatt-hour" else 1
+        if self.period in ["minute", "hour of the day"]:
+            # Minutes are a view of the buffers and every hour of the day
+            # can change, so collect everything again
+            self.current, _ = self.pipeline.aggregate(self.period).scale(
+                factor, self.unit).collect()
+        else:
+            # The first row of the last bucket is where the bucket starts
+            i = self.index.positions(int(self.current.minutes[-1]))[0]
+            tail = aggregate_dataset(
+                self.source.take(i, len(self.source)), self.period)
+            tail.values *= factor
+            self.current = Dataset.concat(
+                self.current.take(0, len(self.current) - 1), tail)
+        self.datasets.pin("current", self.current)
+        self.updateMemory()
+
+        # Redraw the plot and statistics. Large plots are only redrawn
+        # when the user asks for it, so live mode does not keep asking
+        self.periodCheck = None
+        if len(self.current) <= 300000:
+            self.dataPlot()
+        self.printStat()
+
+# Memory
+    def updateMemory(self):
+        """
+        Shows the memory used by the loaded data and its aggregations in the
+        status bar, and what has been spilled to disk
+        """
+        resident, spilled = self.datasets.usage()
+        text = "Memory: {:.0f} of {:.0f} MB".format(
+            resident / 1024 ** 2, self.datasets.budget / 1024 ** 2)
+        if spilled:
+            text += ", {:.0f} MB on disk".format(spilled / 1024 ** 2)
+        self.memory_label.setText(text)
+
+    def setBudget(self):
+        """
+        Asks for the memory budget of the aggregations, see DatasetManager
+        """
+        budget, ok = QtWidgets.QInputDialog.getInt(
+            MainWindow, "Set memory budget",
+            "Memory for the loaded data and its aggregations in MB. "
+            "Aggregations above it are moved to disk:",
+            self.datasets.budget // 1024 ** 2, 16, 1024 ** 2, 64)
+        if not ok:
+            return
+        self.datasets.set_budget(budget * 1024 ** 2)
+        self.updateMemory()
+        self.print_("Memory budget: {} MB".format(budget))
+
+# Tariff
+    def loadTariff(self):
+        """
+        Asks for a tariff file, which prices the consumption when "Costs" is
+        shown, see load_tariff
+        """
+        filename, _ = QtWidgets.QFileDialog.getOpenFileName(
+            MainWindow, "Load tariff", "", "Tariff (*.json)")
+        if not filename:
+            return
+        try:
+            self.tariff = load_tariff(filename)
+        except (OSError, ValueError, KeyError) as e:
+            self.showWarning("Could not load the tariff\n{}".format(e))
+            return
+        self.print_("Loaded tariff {} with {} time-of-use periods{}".format(
+            os.path.basename(filename), len(self.tariff["periods"]),
+            " and spot prices" if self.tariff["spot"] is not None else ""))
+        if self.demandMenu.currentIndex() == 2 and hasattr(self, "source"):
+            self.showDemand()
+
+# Time zone
+    def setTimeZone(self):
+        """
+        Asks for the time zone of the files that are loaded, so daylight
+        saving time is handled when aggregating, see load_dataset
+        """
+        text, ok = QtWidgets.QInputDialog.getText(
+            MainWindow, "Set time zone",
+            "Time zone of the time stamps in the files, i.e. "
+            "Europe/Copenhagen.\nLeave empty to use the time stamps as "
+            "they are:", text=self.timeZone or "")
+        if not ok:
+            return
+        try:
+            self.timeZone = check_zone(text.strip()) if text.strip() else None
+        except ValueError as e:
+            self.showWarning(str(e))
+            return
+        self.print_("Time zone: {}, used for files loaded from now on".format(
+            self.timeZone or "none"))
+
+# Data quality report
+    def qualityReport(self):
+        """
+        Shows the data quality report made when the file was loaded
+        """
+        if not hasattr(self, "summary"):
+            self.showWarning("No data has been loaded yet")
+            return
+        self.showInfo(self.summary)
 
     def showCritical(self, text):
         """
@@ -621,8 +1682,18 @@ class App():
         self.error_dropmenu.addItem("")
         self.error_dropmenu.addItem("")
         self.error_dropmenu.addItem("")
+        self.error_dropmenu.addItem("")
+        self.error_dropmenu.addItem("")
         self.horizontalLayout_3.addWidget(
             self.error_dropmenu)
+        # Longest gap to fill, 0 means no limit
+        self.maxgap_label = QtWidgets.QLabel(self.error_box)
+        self.horizontalLayout_3.addWidget(self.maxgap_label)
+        self.maxgap_spin = QtWidgets.QSpinBox(self.error_box)
+        self.maxgap_spin.setRange(0, 1000000)
+        self.maxgap_spin.setSpecialValueText("No limit")
+        self.maxgap_spin.setObjectName("maxgap_spin")
+        self.horizontalLayout_3.addWidget(self.maxgap_spin)
         self.verticalLayout_2.addWidget(self.error_box)
         # Load file by filename
         self.loadfile_box = QtWidgets.QGroupBox(self.tab_1)
@@ -639,6 +1710,9 @@ class App():
             self.loadfile_box)
         self.loadfile_btn.setObjectName("loadfile_btn")
         self.horizontalLayout.addWidget(self.loadfile_btn)
+        self.live_check = QtWidgets.QCheckBox(self.loadfile_box)
+        self.live_check.setObjectName("live_check")
+        self.horizontalLayout.addWidget(self.live_check)
         self.verticalLayout_2.addWidget(self.loadfile_box)
         # Load file by drag and drop
         self.drop_box = QtWidgets.QGroupBox(self.tab_1)
@@ -718,6 +1792,36 @@ class App():
         self.agg_hDay_btn.setProperty("AggId", 5)
         self.horizontalLayout_4.addWidget(self.agg_hDay_btn)
         self.verticalLayout_3.addWidget(self.agg_box)
+        # Date range box
+        self.range_box = QtWidgets.QGroupBox(self.tab_2)
+        self.range_box.setObjectName("range_box")
+        self.range_box.setMaximumSize(314159, 70)
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout(
+            self.range_box)
+        self.horizontalLayout_6.setObjectName(
+            "horizontalLayout_6")
+        self.range_start = QtWidgets.QDateTimeEdit(self.range_box)
+        self.range_start.setCalendarPopup(True)
+        self.range_start.setDisplayFormat("yyyy-MM-dd HH:mm")
+        self.range_start.setObjectName("range_start")
+        self.horizontalLayout_6.addWidget(self.range_start)
+        self.range_end = QtWidgets.QDateTimeEdit(self.range_box)
+        self.range_end.setCalendarPopup(True)
+        self.range_end.setDisplayFormat("yyyy-MM-dd HH:mm")
+        self.range_end.setObjectName("range_end")
+        self.horizontalLayout_6.addWidget(self.range_end)
+        self.range_apply_btn = QtWidgets.QPushButton(self.range_box)
+        self.range_apply_btn.setObjectName("range_apply_btn")
+        self.horizontalLayout_6.addWidget(self.range_apply_btn)
+        self.range_reset_btn = QtWidgets.QPushButton(self.range_box)
+        self.range_reset_btn.setObjectName("range_reset_btn")
+        self.horizontalLayout_6.addWidget(self.range_reset_btn)
+        self.range_stat_line = QtWidgets.QLineEdit(self.range_box)
+        self.range_stat_line.setReadOnly(True)
+        self.range_stat_line.setMinimumSize(300, 25)
+        self.range_stat_line.setObjectName("range_stat_line")
+        self.horizontalLayout_6.addWidget(self.range_stat_line)
+        self.verticalLayout_3.addWidget(self.range_box)
         self.line_2 = QtWidgets.QFrame(self.tab_2)
         self.line_2.setFrameShape(QtWidgets.QFrame.HLine)
         self.line_2.setFrameShadow(QtWidgets.QFrame.Sunken)
@@ -726,7 +1830,7 @@ class App():
         # Command box
         self.cmd_box = QtWidgets.QGroupBox(self.tab_2)
         self.cmd_box.setObjectName("cmd_box")
-        self.cmd_box.setMaximumSize(314159, 155)
+        self.cmd_box.setMaximumSize(314159, 360)
         self.gridLayout = QtWidgets.QGridLayout(
             self.cmd_box)
         self.gridLayout.setObjectName("gridLayout")
@@ -757,6 +1861,59 @@ class App():
         self.showdata_btn.setObjectName("showdata_btn")
         self.gridLayout.addWidget(
             self.showdata_btn, 2, 1, 1, 1)
+        # Export buttons
+        self.export_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.export_btn.setObjectName("export_btn")
+        self.gridLayout.addWidget(self.export_btn, 3, 0, 1, 1)
+        self.export_stat_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.export_stat_btn.setObjectName("export_stat_btn")
+        self.gridLayout.addWidget(self.export_stat_btn, 3, 1, 1, 1)
+        # Load profile menu and button
+        self.profileMenu = QtWidgets.QComboBox(self.cmd_box)
+        self.profileMenu.setObjectName("profileMenu")
+        self.profileMenu.addItem("")
+        self.profileMenu.addItem("")
+        self.profileMenu.addItem("")
+        self.profileMenu.addItem("")
+        self.profileMenu.addItem("")
+        self.profileMenu.addItem("")
+        self.profileMenu.addItem("")
+        self.profileMenu.addItem("")
+        self.gridLayout.addWidget(self.profileMenu, 4, 0, 1, 1)
+        self.profile_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.profile_btn.setObjectName("profile_btn")
+        self.gridLayout.addWidget(self.profile_btn, 4, 1, 1, 1)
+        # Workspace menu and buttons
+        self.compareMenu = QtWidgets.QComboBox(self.cmd_box)
+        self.compareMenu.setObjectName("compareMenu")
+        self.compareMenu.addItem("")
+        self.compareMenu.addItem("")
+        self.compareMenu.addItem("")
+        self.compareMenu.addItem("")
+        self.gridLayout.addWidget(self.compareMenu, 5, 0, 1, 1)
+        self.compare_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.compare_btn.setObjectName("compare_btn")
+        self.gridLayout.addWidget(self.compare_btn, 5, 1, 1, 1)
+        self.workspace_add_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.workspace_add_btn.setObjectName("workspace_add_btn")
+        self.gridLayout.addWidget(self.workspace_add_btn, 6, 0, 1, 1)
+        self.workspace_clear_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.workspace_clear_btn.setObjectName("workspace_clear_btn")
+        self.gridLayout.addWidget(self.workspace_clear_btn, 6, 1, 1, 1)
+        # Anomaly button
+        self.anomaly_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.anomaly_btn.setObjectName("anomaly_btn")
+        self.gridLayout.addWidget(self.anomaly_btn, 7, 0, 1, 2)
+        # Peak demand menu and button
+        self.demandMenu = QtWidgets.QComboBox(self.cmd_box)
+        self.demandMenu.setObjectName("demandMenu")
+        self.demandMenu.addItem("")
+        self.demandMenu.addItem("")
+        self.demandMenu.addItem("")
+        self.gridLayout.addWidget(self.demandMenu, 8, 0, 1, 1)
+        self.demand_btn = QtWidgets.QPushButton(self.cmd_box)
+        self.demand_btn.setObjectName("demand_btn")
+        self.gridLayout.addWidget(self.demand_btn, 8, 1, 1, 1)
         self.verticalLayout_3.addWidget(self.cmd_box)
         # Display box
         self.display_box = QtWidgets.QGroupBox(self.tab_2)
@@ -785,6 +1942,12 @@ class App():
         self.horizontalLayout_5.addWidget(self.plotFrame)  # Add to layout
         self.verticalLayout_5.addWidget(self.toolbar)  # Add toolbar to layout
         self.verticalLayout_5.addWidget(self.canvas)  # Add canvas to layout
+        # Overview strip of the whole dataset, shown when the plot is focused
+        self.overviewFigure = Figure(figsize=(5, 1))
+        self.overviewCanvas = FigureCanvas(self.overviewFigure)
+        self.overviewCanvas.setFixedHeight(110)
+        self.verticalLayout_5.addWidget(self.overviewCanvas)
+        self.overviewCanvas.hide()
         # Hide plot to begin with
         self.plotFrame.hide()
 
@@ -830,6 +1993,40 @@ class App():
         fsAction.setShortcut("F11")
         options.addAction(fsAction)  # Add to menu
 
+        # Set parameters for qualityAction
+        qualityAction = QtWidgets.QAction('Show data quality report',
+                                          MainWindow)
+        qualityAction.setStatusTip(
+            "Show the data quality report of the loaded file")
+        qualityAction.triggered.connect(self.qualityReport)
+        options.addAction(qualityAction)  # Add to menu
+
+        # Set parameters for budgetAction
+        budgetAction = QtWidgets.QAction('Set memory budget', MainWindow)
+        budgetAction.setStatusTip("Set the memory used for aggregations")
+        budgetAction.triggered.connect(self.setBudget)
+        options.addAction(budgetAction)  # Add to menu
+
+        # Set parameters for tariffAction
+        tariffAction = QtWidgets.QAction('Load tariff', MainWindow)
+        tariffAction.setStatusTip(
+            "Load the tariff that prices the consumption")
+        tariffAction.triggered.connect(self.loadTariff)
+        options.addAction(tariffAction)  # Add to menu
+
+        # Set parameters for tzAction
+        tzAction = QtWidgets.QAction('Set time zone', MainWindow)
+        tzAction.setStatusTip("Set the time zone of the loaded files")
+        tzAction.triggered.connect(self.setTimeZone)
+        options.addAction(tzAction)  # Add to menu
+
+        # Set parameters for statAction
+        statAction = QtWidgets.QAction('Choose statistics', MainWindow)
+        statAction.setStatusTip(
+            "Choose the statistics shown in the statistics table")
+        statAction.triggered.connect(self.chooseStatistics)
+        options.addAction(statAction)  # Add to menu
+
         # Mac OS has built-in quit menu (Cmd+Q)
         # Set parameters for exitAction
         exitAction = QtWidgets.QAction('Exit', MainWindow)
@@ -853,26 +2050,54 @@ class App():
         self.statusbar = QtWidgets.QStatusBar(MainWindow)
         self.statusbar.setObjectName("statusbar")
         MainWindow.setStatusBar(self.statusbar)
+        # Progress bar for loading files
+        self.load_progress = QtWidgets.QProgressBar(self.statusbar)
+        self.load_progress.setObjectName("load_progress")
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.hide()
+        self.statusbar.addPermanentWidget(self.load_progress)
+        # Memory use of the datasets
+        self.memory_label = QtWidgets.QLabel(self.statusbar)
+        self.memory_label.setObjectName("memory_label")
+        self.statusbar.addPermanentWidget(self.memory_label)
 
         # Retranslate the UI
         self.naming(MainWindow)
         # Set tab order
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
         MainWindow.setTabOrder(self.tabWidget, self.error_dropmenu)
-        MainWindow.setTabOrder(self.error_dropmenu, self.loadfile_input)
+        MainWindow.setTabOrder(self.error_dropmenu, self.maxgap_spin)
+        MainWindow.setTabOrder(self.maxgap_spin, self.loadfile_input)
         MainWindow.setTabOrder(self.loadfile_input, self.loadfile_btn)
-        MainWindow.setTabOrder(self.loadfile_btn, self.drop_input)
+        MainWindow.setTabOrder(self.loadfile_btn, self.live_check)
+        MainWindow.setTabOrder(self.live_check, self.drop_input)
         MainWindow.setTabOrder(self.drop_input, self.aggcurrent_line)
         MainWindow.setTabOrder(self.aggcurrent_line, self.agg_min_btn)
         MainWindow.setTabOrder(self.agg_min_btn, self.agg_hour_btn)
         MainWindow.setTabOrder(self.agg_hour_btn, self.agg_day_btn)
         MainWindow.setTabOrder(self.agg_day_btn, self.agg_month_btn)
         MainWindow.setTabOrder(self.agg_month_btn, self.agg_hDay_btn)
-        MainWindow.setTabOrder(self.agg_hDay_btn, self.plotMenu)
+        MainWindow.setTabOrder(self.agg_hDay_btn, self.range_start)
+        MainWindow.setTabOrder(self.range_start, self.range_end)
+        MainWindow.setTabOrder(self.range_end, self.range_apply_btn)
+        MainWindow.setTabOrder(self.range_apply_btn, self.range_reset_btn)
+        MainWindow.setTabOrder(self.range_reset_btn, self.plotMenu)
         MainWindow.setTabOrder(self.plotMenu, self.plot_btn)
         MainWindow.setTabOrder(self.plot_btn, self.stat_btn)
         MainWindow.setTabOrder(self.stat_btn, self.showdata_btn)
-        MainWindow.setTabOrder(self.showdata_btn, self.display_window)
+        MainWindow.setTabOrder(self.showdata_btn, self.export_btn)
+        MainWindow.setTabOrder(self.export_btn, self.export_stat_btn)
+        MainWindow.setTabOrder(self.export_stat_btn, self.profileMenu)
+        MainWindow.setTabOrder(self.profileMenu, self.profile_btn)
+        MainWindow.setTabOrder(self.profile_btn, self.compareMenu)
+        MainWindow.setTabOrder(self.compareMenu, self.compare_btn)
+        MainWindow.setTabOrder(self.compare_btn, self.workspace_add_btn)
+        MainWindow.setTabOrder(self.workspace_add_btn,
+                               self.workspace_clear_btn)
+        MainWindow.setTabOrder(self.workspace_clear_btn, self.anomaly_btn)
+        MainWindow.setTabOrder(self.anomaly_btn, self.demandMenu)
+        MainWindow.setTabOrder(self.demandMenu, self.demand_btn)
+        MainWindow.setTabOrder(self.demand_btn, self.display_window)
 
     # So hidden, much wow
     def dank_app(self):
@@ -907,14 +2132,27 @@ class App():
             1, "Backward fill (replace corrupt measurement with next valid measurement)")
         self.error_dropmenu.setItemText(
             2, "Drop (delete corrupted measurements)")
+        self.error_dropmenu.setItemText(
+            3, "Linear interpolation (replace corrupt measurement with a line between the valid measurements around it)")
+        self.error_dropmenu.setItemText(
+            4, "Time interpolation (same as linear interpolation, but weighted by the time between measurements)")
+        self.maxgap_label.setText("Max gap (rows):")
+        self.maxgap_spin.setToolTip(
+            "Longest run of consecutive corrupt rows to fill")
+        self.maxgap_spin.setStatusTip(
+            "Runs of more consecutive corrupt rows than this are dropped instead of filled")
         self.loadfile_box.setTitle("Filename")
         self.loadfile_input.setToolTip("Please enter a filename")
         self.loadfile_input.setStatusTip("Please enter a filename in this box")
         self.loadfile_input.setPlaceholderText(
-            "Please enter the name of the datafile. Ex: 2008.csv")
+            "Please enter the name of the datafile. Ex: 2008.csv or 2008.csv.gz")
         self.loadfile_btn.setToolTip("Click to load data")
         self.loadfile_btn.setStatusTip("Click to load data from filename")
         self.loadfile_btn.setText("Load data")
+        self.live_check.setText("Live mode")
+        self.live_check.setToolTip("Follow the file as it grows")
+        self.live_check.setStatusTip(
+            "Keep adding measurements as they are appended to the file")
         self.drop_box.setTitle("Drag and Drop")
         self.drop_input.setToolTip("Drag a file into this box to load it")
         self.drop_input.setStatusTip("Drag a file into this box to load it")
@@ -950,6 +2188,25 @@ class App():
         self.agg_hDay_btn.setStatusTip(
             "Click to aggregate for the hourly average")
         self.agg_hDay_btn.setText("Hour-of-day")
+        self.range_box.setTitle("Date range")
+        self.range_start.setToolTip("Start of the date range")
+        self.range_start.setStatusTip(
+            "Select the first date and time to analyze")
+        self.range_end.setToolTip("End of the date range")
+        self.range_end.setStatusTip(
+            "Select the last date and time to analyze")
+        self.range_apply_btn.setToolTip("Click to select date range")
+        self.range_apply_btn.setStatusTip(
+            "Click to only analyze the data inside the date range")
+        self.range_apply_btn.setText("Apply range")
+        self.range_reset_btn.setToolTip("Click to reset date range")
+        self.range_reset_btn.setStatusTip(
+            "Click to analyze the full dataset again")
+        self.range_reset_btn.setText("Reset range")
+        self.range_stat_line.setToolTip("Statistics of the date range")
+        self.range_stat_line.setStatusTip(
+            "This box shows the total, mean, minimum and maximum consumption of all zones in the date range")
+        self.range_stat_line.setPlaceholderText("No range selected")
         self.cmd_box.setTitle("Commands")
         self.stat_btn.setToolTip("Click to hide/show statistics")
         self.stat_btn.setStatusTip(
@@ -961,6 +2218,65 @@ class App():
         self.showdata_btn.setToolTip("Click to show data")
         self.showdata_btn.setStatusTip("Click to show data")
         self.showdata_btn.setText("Print data")
+        self.export_btn.setToolTip("Click to export data")
+        self.export_btn.setStatusTip(
+            "Click to export the currently aggregated data to .csv or .npz")
+        self.export_btn.setText("Export data")
+        self.export_stat_btn.setToolTip("Click to export statistics")
+        self.export_stat_btn.setStatusTip(
+            "Click to export the statistics of the currently aggregated data to .csv")
+        self.export_stat_btn.setText("Export statistics")
+        self.profileMenu.setItemText(0, "Hourly profile of all days")
+        self.profileMenu.setItemText(1, "Hourly profile of weekdays/weekends")
+        self.profileMenu.setItemText(2, "Hourly profile of every month")
+        self.profileMenu.setItemText(3, "Hourly profile of every season")
+        self.profileMenu.setItemText(4, "15 minute profile of all days")
+        self.profileMenu.setItemText(
+            5, "15 minute profile of weekdays/weekends")
+        self.profileMenu.setItemText(6, "15 minute profile of every month")
+        self.profileMenu.setItemText(7, "15 minute profile of every season")
+        self.profileMenu.setToolTip("Select the load profile to show")
+        self.profileMenu.setStatusTip(
+            "This dropdown menu defines how the load profile is split")
+        self.profile_btn.setToolTip("Click to show load profile")
+        self.profile_btn.setStatusTip(
+            "Click to plot and print the average load profile of the date range")
+        self.profile_btn.setText("Show profile")
+        self.compareMenu.setItemText(0, "Compare datasets")
+        self.compareMenu.setItemText(1, "Compare datasets, weeks aligned")
+        self.compareMenu.setItemText(2, "Difference to first dataset")
+        self.compareMenu.setItemText(
+            3, "Difference to first dataset, weeks aligned")
+        self.compareMenu.setToolTip("Select how the workspace is compared")
+        self.compareMenu.setStatusTip(
+            "Weeks aligned shifts every dataset by whole 52-week periods onto the first dataset, so the weekdays line up")
+        self.compare_btn.setToolTip("Click to compare the workspace")
+        self.compare_btn.setStatusTip(
+            "Click to plot and print the datasets in the workspace with the current aggregation")
+        self.compare_btn.setText("Compare")
+        self.workspace_add_btn.setToolTip(
+            "Click to add the loaded file to the workspace")
+        self.workspace_add_btn.setStatusTip(
+            "Click to add the loaded file to the workspace, to compare it with other files")
+        self.workspace_add_btn.setText("Add to workspace")
+        self.workspace_clear_btn.setToolTip("Click to clear the workspace")
+        self.workspace_clear_btn.setStatusTip(
+            "Click to remove all datasets from the workspace")
+        self.workspace_clear_btn.setText("Clear workspace")
+        self.anomaly_btn.setToolTip("Click to detect anomalies")
+        self.anomaly_btn.setStatusTip(
+            "Click to find spikes, jumps, stuck meters and baseload drift in the date range")
+        self.anomaly_btn.setText("Detect anomalies")
+        self.demandMenu.setItemText(0, "Monthly peak demand")
+        self.demandMenu.setItemText(1, "Load-duration curves")
+        self.demandMenu.setItemText(2, "Costs")
+        self.demandMenu.setToolTip("Select the demand analysis to show")
+        self.demandMenu.setStatusTip(
+            "This dropdown menu defines which demand analysis is shown")
+        self.demand_btn.setToolTip("Click to show demand analysis")
+        self.demand_btn.setStatusTip(
+            "Click to plot and print the peak demand or costs of the date range")
+        self.demand_btn.setText("Show demand")
         self.plotMenu.setItemText(0, "Each zone")
         self.plotMenu.setItemText(1, "All zones")
         self.display_box.setTitle("Display window")
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the cold start of the pandas and numpy backends: the time from
+starting a new process to having loaded a file, aggregated it per day and
+computed its statistics, and the peak memory (maximum resident set size)
+of that process.
+
+USAGE:
+    python benchmarks/bench_backends.py [rows]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(name, filename):
+    """
+    Loads, aggregates per day and computes statistics with a backend
+    """
+    from src.backend import get_backend
+
+    backend = get_backend(name)
+    tvec, data, _ = backend.load_measurements(filename, "forward fill")
+    tvec_a, data_a = backend.aggregate_measurements(tvec, data, "day")
+    backend.print_statistics(tvec_a, data_a)
+    return "pandas" in sys.modules
+
+
+def cold_start(name, filename):
+    """
+    Runs a backend in a new process
+
+    OUTPUT:
+        seconds: Float, wall time of the process
+        peak: Float, peak RSS in megabytes
+        pandas: Boolean, True if pandas was imported
+    """
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, __file__, "--run", name, filename],
+                         check=True, capture_output=True, text=True).stdout
+    seconds = time.perf_counter() - start
+    peak, pandas = out.split()
+    return seconds, float(peak), pandas == "True"
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        pandas = run(sys.argv[2], sys.argv[3])
+        # ru_maxrss is in kilobytes on Linux
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+              pandas)
+        sys.exit()
+
+    # Imports pandas, so only in this process
+    from bench_memory import write_csv
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.csv")
+        write_csv(filename, rows)
+        for name in ("pandas", "numpy"):
+            seconds, peak, pandas = cold_start(name, filename)
+            print("{:>6}: {:.2f} s, {:6.1f} MB peak RSS for {} rows{}".format(
+                name, seconds, peak, rows,
+                "" if pandas else " (pandas not imported)"))
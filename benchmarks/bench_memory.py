@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the peak memory (maximum resident set size) of loading, aggregating
+and preparing a plot of a synthetic dataset:
+    "frames": the tvec/data dataFrame path, with join, groupby and
+        pd.to_datetime on the time vectors
+    "dataset": load_dataset, LazyDataset and Dataset.datetimes
+
+Every path runs in its own process, so the peaks do not affect each other.
+The file is written in a process of its own too, since a process started
+from a fork keeps the peak of the process it was forked from.
+
+USAGE:
+    python benchmarks/bench_memory.py [rows]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NAMES = ["year", "month", "day", "hour", "minute", "second",
+         "zone1", "zone2", "zone3", "zone4"]
+
+
+def write_csv(filename, rows):
+    """
+    Writes rows minutes of random measurements from 2020-01-01, with a few
+    corrupted measurements
+    """
+    rng = np.random.default_rng(0)
+    times = pd.DatetimeIndex(np.datetime64("2020-01-01T00:00") +
+                             np.arange(rows).astype("timedelta64[m]"))
+    values = np.round(rng.random((rows, 4)) * 100, 3)
+    values[rng.random((rows, 4)) < 0.001] = -1
+    df = pd.DataFrame({"year": times.year, "month": times.month,
+                       "day": times.day, "hour": times.hour,
+                       "minute": times.minute, "second": 0})
+    df[NAMES[6:10]] = values
+    df.to_csv(filename, header=False, index=False)
+
+
+def run_frames(filename):
+    """
+    Load, aggregate per hour and per day, and build the plot frame with
+    tvec and data dataFrames
+    """
+    df = pd.read_csv(filename, header=None, names=NAMES)
+    df = df.replace(-1, np.nan).ffill()
+    tvec, data = df.iloc[:, 0:6].copy(), df.iloc[:, 6:10].copy()
+    for columns in (["year", "month", "day", "hour"],
+                    ["year", "month", "day"]):
+        df_a = tvec.join(data).groupby(columns).sum()
+        del df_a
+    pltData = data.copy()
+    pltData.index = pd.to_datetime(tvec)
+    return len(pltData)
+
+
+def run_dataset(filename):
+    """
+    Load, aggregate per hour and per day, and build the plot frame with
+    one shared Dataset
+    """
+    from src.load_measurements import load_dataset
+    from src.lazy_dataset import LazyDataset
+    from src.time_index import TimeIndex
+
+    dataset, _, _ = load_dataset(filename, "forward fill")
+    pipeline = LazyDataset(dataset, TimeIndex(minutes=dataset.minutes))
+    for period in ("hour", "day"):
+        result, _ = pipeline.aggregate(period).collect()
+        del result
+    pltData = pd.DataFrame(dataset.values, index=dataset.datetimes(),
+                           columns=dataset.zones, copy=False)
+    return len(pltData)
+
+
+def run(*args):
+    """
+    Runs this script with args in a new process and returns its output
+    """
+    return subprocess.run([sys.executable, __file__] + list(args),
+                          check=True, capture_output=True, text=True).stdout
+
+
+def peak_rss(path, filename):
+    """
+    Runs a path in a new process and returns its peak RSS in megabytes
+    """
+    return float(run("--run", path, filename))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--write"]:
+        write_csv(sys.argv[3], int(sys.argv[2]))
+        sys.exit()
+    if sys.argv[1:2] == ["--run"]:
+        {"frames": run_frames, "dataset": run_dataset}[sys.argv[2]](
+            sys.argv[3])
+        # ru_maxrss is in kilobytes on Linux
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        sys.exit()
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.csv")
+        run("--write", str(rows), filename)
+        for path in ("frames", "dataset"):
+            print("{:>8}: {:8.1f} MB peak RSS for {} rows".format(
+                path, peak_rss(path, filename), rows))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Speed-up of ParallelAggregator over the serial aggregate_dataset for every
+aggregation level, on a synthetic multi-year dataset of many zones. Every
+parallel result is checked against the serial one. One aggregator is kept
+for every number of workers, like the App keeps one for the loaded file, so
+the copy into shared memory and the start of the pool are timed once, on
+the first aggregation, and reported separately.
+
+USAGE:
+    python benchmarks/bench_parallel.py [rows] [zones]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.aggregate_measurements import aggregate_dataset  # noqa: E402
+from src.dataset import Dataset  # noqa: E402
+from src.parallel_aggregate import ParallelAggregator  # noqa: E402
+
+PERIODS = ["hour", "day", "month", "hour of the day"]
+WORKERS = [2, 4, 8, 16]
+
+
+def synthetic(rows, zones, seed=0):
+    """
+    Random measurements of every minute from 2000-01-01
+    """
+    rng = np.random.default_rng(seed)
+    minutes = np.datetime64("2000-01-01T00:00", "m").astype(np.int64) + \
+        np.arange(rows)
+    return Dataset(minutes, rng.random((rows, zones)) * 100,
+                   ["zone{}".format(z + 1) for z in range(zones)])
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    zones = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    dataset = synthetic(rows, zones)
+    print("{} rows x {} zones, {} CPUs".format(rows, zones, os.cpu_count()))
+
+    aggregators = {workers: ParallelAggregator(dataset, workers, min_rows=0)
+                   for workers in WORKERS}
+    try:
+        # The first aggregation copies the data and starts the pool
+        line = ["{:16}".format("start")]
+        for workers, aggregator in aggregators.items():
+            _, elapsed = timed(aggregator.aggregate, "month")
+            line.append("{}: {:.2f} s".format(workers, elapsed))
+        print(", ".join(line))
+
+        for period in PERIODS:
+            serial, elapsed = timed(aggregate_dataset, dataset, period)
+            line = ["{:16} serial {:.2f} s".format(period, elapsed)]
+            for workers, aggregator in aggregators.items():
+                result, parallel = timed(aggregator.aggregate, period)
+                same = np.array_equal(result.minutes, serial.minutes) and \
+                    np.allclose(result.values, serial.values, rtol=1e-12)
+                line.append("{}: {:.2f}x{}".format(
+                    workers, elapsed / parallel, "" if same else " DIFFERENT"))
+            print(", ".join(line))
+    finally:
+        for aggregator in aggregators.values():
+            aggregator.close()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Time to draw a range of a decade of minute data: every point of the range
+against the view of PlotLevels, which never has more than max_points
+buckets. The levels are aggregated on the first view that needs them,
+which is timed separately.
+
+USAGE:
+    python benchmarks/bench_plot_levels.py [years]
+"""
+import os
+import sys
+import time
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dataset import Dataset  # noqa: E402
+from src.plot_levels import PlotLevels  # noqa: E402
+from src.render_plot import render_plot  # noqa: E402
+
+# Length of the drawn ranges in days
+SPANS = [3650, 365, 30, 1]
+
+
+def draw(dataset):
+    figure = Figure(figsize=(8, 4.5))
+    FigureCanvasAgg(figure)
+    render_plot(figure.add_subplot(1, 1, 1), dataset, "Each zone",
+                bars=False)
+    figure.canvas.draw()
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    matplotlib.use("Agg")
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rows = years * 525600
+    rng = np.random.default_rng(0)
+    minutes = np.datetime64("2010-01-01T00:00", "m").astype(np.int64) + \
+        np.arange(rows)
+    dataset = Dataset(minutes, rng.random((rows, 4)))
+    levels = PlotLevels(dataset)
+    print("{} rows x 4 zones".format(rows))
+
+    for days in SPANS:
+        start = int(minutes[0])
+        end = start + days * 1440
+        view, first = timed(levels.view, start, end)
+        view, cached = timed(levels.view, start, end)
+        _, levelled = timed(draw, view)
+        _, full = timed(draw, dataset.take(0, min(days * 1440, rows)))
+        print("{:5} days: all points {:.2f} s, {} level {} points {:.2f} s "
+              "(view {:.3f} s first, {:.4f} s cached)".format(
+                  days, full, view.period, len(view), levelled, first,
+                  cached))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Time per chart of offscreen report rendering with render_plot: a new figure
+for every chart against one figure whose axes are cleared and reused, as in
+batch_report.
+
+USAGE:
+    python benchmarks/bench_reports.py [charts] [fmt]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+import matplotlib.style
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dataset import Dataset  # noqa: E402
+from src.render_plot import render_plot  # noqa: E402
+
+
+def monthly(seed):
+    """
+    Random daily consumption of one month of a tenant
+    """
+    rng = np.random.default_rng(seed)
+    minutes = np.datetime64("2020-01-01", "m").astype(np.int64) + \
+        1440 * np.arange(31)
+    return Dataset(minutes, rng.random((31, 4)) * 1000, period="day")
+
+
+def new_figures(datasets, directory, fmt):
+    for n, dataset in enumerate(datasets):
+        figure = Figure(figsize=(8, 4.5))
+        FigureCanvasAgg(figure)
+        render_plot(figure.add_subplot(1, 1, 1), dataset, "Each zone")
+        figure.tight_layout()
+        figure.savefig(os.path.join(directory, "new{}.{}".format(n, fmt)))
+
+
+def reused_axes(datasets, directory, fmt):
+    figure = Figure(figsize=(8, 4.5))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(1, 1, 1)
+    for n, dataset in enumerate(datasets):
+        ax.clear()
+        render_plot(ax, dataset, "Each zone")
+        figure.tight_layout()
+        figure.savefig(os.path.join(directory, "reused{}.{}".format(n, fmt)))
+
+
+if __name__ == "__main__":
+    charts = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    fmt = sys.argv[2] if len(sys.argv) > 2 else "png"
+    datasets = [monthly(seed) for seed in range(charts)]
+
+    with tempfile.TemporaryDirectory() as directory, \
+            matplotlib.style.context("ggplot"):
+        for func in (new_figures, reused_axes):
+            start = time.perf_counter()
+            func(datasets, directory, fmt)
+            elapsed = time.perf_counter() - start
+            print("{:12} {:.1f} ms per chart".format(
+                func.__name__, 1000 * elapsed / charts))
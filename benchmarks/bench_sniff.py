@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Time to reject a large file with a malformed last line: sniffing its first
+and last lines against parsing all of it with pandas, as load_measurements
+did before the sniffing stage. Also the time to sniff a well-formed file.
+
+USAGE:
+    python benchmarks/bench_sniff.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.repair_measurements import NAMES  # noqa: E402
+from src.sniff_measurements import sniff_measurements, SchemaError  # noqa: E402
+
+
+def write(filename, rows, last=""):
+    """
+    A file of rows minutes of measurements, and a last line
+    """
+    minutes = np.datetime64("2010-01-01T00:00", "m") + np.arange(rows)
+    times = pd.DatetimeIndex(minutes)
+    frame = pd.DataFrame({"year": times.year, "month": times.month,
+                          "day": times.day, "hour": times.hour,
+                          "minute": times.minute, "second": 0})
+    for zone in NAMES[6:10]:
+        frame[zone] = np.random.default_rng(0).integers(0, 200, rows)
+    frame.to_csv(filename, header=False, index=False)
+    with open(filename, "a") as f:
+        f.write(last)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+    except (SchemaError, ValueError):
+        pass
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    with tempfile.TemporaryDirectory() as folder:
+        good = os.path.join(folder, "good.csv")
+        bad = os.path.join(folder, "bad.csv")
+        write(good, rows)
+        write(bad, rows, "2013,10,20,0,0,0,12,x,3\n")
+        print("{} rows, {:.0f} MB".format(rows, os.path.getsize(bad) / 1e6))
+        print("sniff good file  {:.2f} ms".format(
+            1000 * timed(sniff_measurements, good)))
+        print("sniff bad file   {:.2f} ms".format(
+            1000 * timed(sniff_measurements, bad)))
+        print("parse bad file   {:.0f} ms".format(1000 * timed(
+            pd.read_csv, bad, header=None, names=NAMES, dtype=np.float64)))
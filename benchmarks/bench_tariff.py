@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Time to price years of minute data with a new tariff: TariffEngine, which
+finds the hourly energy and the time-of-use keys once and then prices the
+hours, against pricing the minutes with pandas every time the tariff
+changes. The engine is created once, which is timed separately.
+
+USAGE:
+    python benchmarks/bench_tariff.py [years]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dataset import Dataset  # noqa: E402
+from src.tariff_engine import TariffEngine  # noqa: E402
+
+TZ = "Europe/Copenhagen"
+
+
+def tariff(peak, spot):
+    """
+    A time-of-use tariff with a weekday peak price, spot prices and a
+    demand charge
+    """
+    return {"energy": 0.25, "demand": 40.0, "fixed": 25.0,
+            "periods": [{"price": peak, "days": [0, 1, 2, 3, 4],
+                         "hours": [17, 18, 19, 20]},
+                        {"price": 0.15, "months": [6, 7, 8]}],
+            "spot": spot}
+
+
+def pandas_costs(dataset, tariff):
+    """
+    Prices every minute with pandas datetime fields and groups the months
+    """
+    times = dataset.datetimes()
+    peak = times.weekday.isin([0, 1, 2, 3, 4]) & \
+        times.hour.isin([17, 18, 19, 20])
+    price = np.where(peak, tariff["periods"][0]["price"], tariff["energy"])
+    price = np.where(times.month.isin([6, 7, 8]), 0.15, price)
+    spot = pd.Series(tariff["spot"][1], index=tariff["spot"][0] // 60)
+    price = price + spot.reindex(dataset.minutes // 60).to_numpy()
+    energy = pd.DataFrame(dataset.values / 1000, columns=dataset.zones)
+    energy["All"] = energy.sum(axis=1)
+    month = times.year * 12 + times.month
+    cost = energy.mul(price, axis=0).groupby(month).sum()
+    hours = dataset.minutes // 60
+    demand = energy.groupby(hours).sum().groupby(
+        pd.Series(month).groupby(hours).first().to_numpy()).max()
+    return cost + demand * tariff["demand"]
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rows = years * 525600
+    rng = np.random.default_rng(0)
+    minutes = np.datetime64("2010-01-01T00:00", "m").astype(np.int64) + \
+        np.arange(rows)
+    dataset = Dataset(minutes, rng.random((rows, 4)) * 50, tz=TZ)
+    hours = np.unique(minutes // 60) * 60
+    spot = (hours, rng.random(len(hours)))
+    print("{} rows x 4 zones, {} hourly spot prices".format(rows, len(hours)))
+
+    engine, build = timed(TariffEngine, dataset)
+    print("TariffEngine created in {:.3f} s".format(build))
+    for peak in (0.45, 0.6, 0.75):
+        costs, priced = timed(engine.costs, tariff(peak, spot))
+        reference, slow = timed(pandas_costs, dataset,
+                                 tariff(peak, spot))
+        total = costs[costs.zone == "All"]["total"].sum() - \
+            25.0 * costs.period.nunique()
+        print("Peak price {:.2f}: engine {:.4f} s, pandas {:.3f} s "
+              "({:.0f}x), totals differ by {:.2e}".format(
+                  peak, priced, slow, slow / priced,
+                  abs(total - reference["All"].sum()) / total))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of time zone aware loading and aggregation: the local time stamps of a
+synthetic dataset are converted to UTC with localize_minutes and aggregated
+by local hour and day, compared with the naive path where the time stamps
+are used as they are.
+
+USAGE:
+    python benchmarks/bench_timezones.py [rows] [zones] [tz]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.aggregate_measurements import aggregate_dataset  # noqa: E402
+from src.dataset import Dataset  # noqa: E402
+from src.timezones import localize_minutes  # noqa: E402
+
+PERIODS = ["hour", "day", "month"]
+
+
+def synthetic(rows, zones, seed=0):
+    """
+    Random measurements of every local minute from 2000-01-01
+    """
+    rng = np.random.default_rng(seed)
+    minutes = np.datetime64("2000-01-01T00:00", "m").astype(np.int64) + \
+        np.arange(rows)
+    return minutes, rng.random((rows, zones)) * 100
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """
+    Result and the shortest time of repeat calls
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    zones = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tz = sys.argv[3] if len(sys.argv) > 3 else "Europe/Copenhagen"
+    local, values = synthetic(rows, zones)
+    names = ["zone{}".format(z + 1) for z in range(zones)]
+    print("{} rows x {} zones, {}".format(rows, zones, tz))
+
+    (utc, keep), elapsed = timed(localize_minutes, local, tz)
+    print("{:16} {:.2f} s".format("localize", elapsed))
+    order = np.argsort(utc, kind="stable")
+    naive = Dataset(local, values, names)
+    aware = Dataset(utc[order], values[order], names, tz=tz)
+
+    for period in PERIODS:
+        _, plain = timed(aggregate_dataset, naive, period, repeat=3)
+        _, zoned = timed(aggregate_dataset, aware, period, repeat=3)
+        print("{:16} naive {:.2f} s, {} {:.2f} s ({:.2f}x)".format(
+            period, plain, tz, zoned, zoned / plain))
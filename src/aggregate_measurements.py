@@ -1,5 +1,12 @@
 # -*- coding: utf-8 -*-
-def aggregate_measurements(tvec, data, period):
+import numpy as np
+
+from src.dataset import Dataset
+from src.load_profile import load_profile
+from src.timestamps import bucket_codes
+
+
+def aggregate_measurements(tvec, data, period, tz=None):
     """
     Aggregates data with respect to the time given by the user.
 
@@ -12,6 +19,10 @@ def aggregate_measurements(tvec, data, period):
             - "hour"
             - "hour of the day"
             - "minute"
+        tz: String, IANA time zone name of the local time in tvec. If
+            given, the buckets are the local hours, days and months with
+            daylight saving time handled, see bucket_codes. None for naive
+            time
 
         Attention! Both tvec and data have to be non-aggregated or filtered data
 
@@ -21,6 +32,7 @@ def aggregate_measurements(tvec, data, period):
 
     USAGE:
         tvec_a, data_a = aggregate_measurements(tvec,data,period)
+        tvec_a, data_a = aggregate_measurements(tvec,data,"day","Europe/Paris")
 
 
     @Author: Simon Moe Sørensen, moe.simon@gmail.com
@@ -35,38 +47,61 @@ def aggregate_measurements(tvec, data, period):
         tvec_a = tvec
         return tvec_a, data_a
 
-    # Join tvec and data
-    df = tvec.join(data)
+    # Aggregate the columnar dataset, which avoids joining tvec and data
+    dataset = aggregate_dataset(Dataset.from_frames(tvec, data, tz=tz),
+                                period)
 
-    # Define dictionary of periods
-    period_dict = {
-        "hour": ['year', 'month', 'day', 'hour'],
-        "day": ['year', 'month', 'day'],
-        "month": ['year', 'month'],
-        "hour of the day": ['hour']}
+    return dataset.tvec, dataset.data
 
-    # Group the data according to defined period
-    df_g = df.groupby(period_dict[period])
 
-    if period != "hour of the day":
-        # Define tvec by getting the first line of each group
-        # i.e when it is grouped by day, it will find the first
-        # line of the day, which can be 2008 12 1 0 0 0, 2008 12 2 0 0 0
-        # and so on. Also reset indexes
-        tvec_a = df_g.head(1).iloc[:, 0:5].reset_index(drop=True)
+def aggregate_dataset(dataset, period):
+    """
+    Aggregates a Dataset with respect to the period, same as
+    aggregate_measurements. The buckets are sums for "hour", "day" and
+    "month", and averages for "hour of the day".
+
+    Sorted data is reduced bucket by bucket with np.add.reduceat, so the
+    data is read once and nothing but the result is allocated.
 
-        # Get the dataFrame of aggregated data
-        df_g = df_g['zone1', 'zone2', 'zone3',
-                    'zone4'].sum()  # Sum the measurements
+    INPUT:
+        dataset: Dataset with non-aggregated data
+        period: String, see aggregate_measurements
 
-        data_a = df_g.reset_index(drop=True)  # Reset indexes
+    OUTPUT:
+        dataset_a: Dataset with the aggregated data. The minutes are the
+            first minute of every bucket
 
-    # Do the same as above, but configured for hour of the day
+    USAGE:
+        dataset_a = aggregate_dataset(dataset, "day")
+    """
+    period = period.lower()
+    if period == "minute":
+        return dataset
+
+    # Hour of the day is the average load profile over all days, which is
+    # computed in a single bincount pass on local time
+    if period == "hour of the day":
+        profile = load_profile(None, dataset.data,
+                               minutes=dataset.local())["all"]["All days"]
+        profile = profile.dropna()  # Hours without any measurements
+        return Dataset(profile.index.to_numpy(), profile.to_numpy(),
+                       dataset.zones, period)
+
+    minutes, values = dataset.minutes, dataset.values
+    codes = bucket_codes(minutes, period, dataset.tz)
+
+    # Buckets have to be runs of rows, so sort the rows if needed
+    if (np.diff(codes) < 0).any():
+        order = np.argsort(codes, kind="stable")
+        minutes, values, codes = minutes[order], values[order], codes[order]
+
+    # Start of every bucket
+    starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+    if len(starts):
+        values_a = np.add.reduceat(values, starts, axis=0)
     else:
-        tvec_a = df_g.head(1).iloc[:, 3].reset_index(
-            drop=True)  # Get only hours
-        df_g = df_g['zone1', 'zone2', 'zone3',
-                    'zone4'].mean()  # Define measurements as an average
-        data_a = df_g.reset_index(drop=True)  # Reset indexes
+        values_a = values[:0].copy()
+
+    return Dataset(minutes[starts], values_a, dataset.zones, period,
+                   dataset.tz)
 
-    return tvec_a, data_a
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import importlib
+import os
+from types import SimpleNamespace
+
+# Modules of every backend, they are only imported when selected
+BACKENDS = {
+    "pandas": {"load_measurements": "src.load_measurements",
+               "aggregate_measurements": "src.aggregate_measurements",
+               "print_statistics": "src.print_statistics"},
+    "numpy": {"load_measurements": "src.numpy_backend",
+              "aggregate_measurements": "src.numpy_backend",
+              "print_statistics": "src.numpy_backend"}}
+
+
+def get_backend(name=None):
+    """
+    The load_measurements, aggregate_measurements and print_statistics
+    functions of a backend:
+        "pandas": dataFrames, the backend of the App
+        "numpy": numpy arrays only, pandas is never imported, see
+            numpy_backend
+
+    INPUT:
+        name: String, one of BACKENDS. Default is the environment variable
+            ELECTRICITY_BACKEND, or "pandas" if it is not set
+
+    OUTPUT:
+        backend: namespace with the three functions and the name
+
+    USAGE:
+        backend = get_backend("numpy")
+        tvec, data, warning = backend.load_measurements(filename, fmode)
+        tvec_a, data_a = backend.aggregate_measurements(tvec, data, "day")
+        stat = backend.print_statistics(tvec_a, data_a)
+    """
+    if name is None:
+        name = os.environ.get("ELECTRICITY_BACKEND", "pandas")
+    name = name.lower()
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend: {}".format(name))
+
+    functions = {function: getattr(importlib.import_module(module), function)
+                 for function, module in BACKENDS[name].items()}
+    return SimpleNamespace(name=name, **functions)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.style
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from src.lazy_dataset import LazyDataset
+from src.load_measurements import load_dataset
+from src.render_plot import render_plot
+from src.time_index import TimeIndex
+from src.timestamps import bucket_codes
+
+# File formats of the charts
+FORMATS = ["png", "pdf", "svg"]
+
+# Style of the charts, the same as the App
+STYLE = "ggplot"
+
+# Figure and axes of this process, reused for every chart
+_AXES = {}
+
+
+def batch_report(filenames, directory, fmode, period="day",
+                 choice="All zones", fmt="png", workers=None, max_gap=None,
+                 tz=None, size=(8, 4.5), dpi=100):
+    """
+    Renders a chart of every month of every file, i.e. the monthly
+    consumption of every tenant. The files are split between worker
+    processes, which load, aggregate and render them without a screen on
+    the Agg canvas, see render_plot.
+
+    Every process creates one figure and axes and clears them between the
+    charts, so no figure is created or closed per chart. The charts are
+    written as <file name>_<YYYY-MM>.<fmt> to directory.
+
+    INPUT:
+        filenames: list of measurement files, see load_dataset
+        directory: String, folder of the charts, created if it is missing
+        fmode: String, how to handle missing measurements, see
+            load_measurements
+        period: String, aggregation of every chart, see
+            aggregate_measurements
+        choice: String, "All zones" or "Each zone", see render_plot
+        fmt: String, one of FORMATS
+        workers: Integer, number of processes. Default is the number of
+            CPUs, 1 renders in this process
+        max_gap, tz: see load_dataset
+        size: (width, height) of the charts in inches
+        dpi: Integer, dots per inch of png charts
+
+    OUTPUT:
+        paths: list of the written charts, in the order of filenames
+
+    USAGE:
+        paths = batch_report(glob.glob("tenants/*.csv"), "reports",
+                             "forward fill", fmt="pdf")
+    """
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise ValueError("Unknown chart format: {}".format(fmt))
+    os.makedirs(directory, exist_ok=True)
+    options = dict(directory=directory, fmode=fmode, period=period,
+                   choice=choice, fmt=fmt, max_gap=max_gap, tz=tz,
+                   size=tuple(size), dpi=dpi)
+
+    workers = min(workers or os.cpu_count() or 1, len(filenames))
+    if workers < 2:
+        chunks = [_render_file(filename, **options) for filename in filenames]
+    else:
+        count = len(filenames)
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_start_worker) as pool:
+            chunks = list(pool.map(_render_kwargs, filenames,
+                                   [options] * count))
+    return [path for chunk in chunks for path in chunk]
+
+
+def monthly_datasets(dataset):
+    """
+    Splits a Dataset sorted by time into its months, in the time zone of
+    the dataset
+
+    OUTPUT:
+        months: list of (month, Dataset) where month is "YYYY-MM"
+    """
+    if len(dataset) == 0:
+        return []
+    codes = bucket_codes(dataset.minutes, "month", dataset.tz)
+    starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+    ends = np.r_[starts[1:], len(codes)]
+    return [(str(codes[i].astype('datetime64[M]')), dataset.take(i, j))
+            for i, j in zip(starts, ends)]
+
+
+def _start_worker():
+    """
+    Worker processes have no screen, so they use the Agg backend
+    """
+    matplotlib.use("Agg")
+
+
+def _render_kwargs(filename, options):
+    return _render_file(filename, **options)
+
+
+def _render_file(filename, directory, fmode, period, choice, fmt, max_gap,
+                 tz, size, dpi):
+    """
+    Loads a file and renders the chart of every month of it
+    """
+    dataset, _, _ = load_dataset(filename, fmode, max_gap, tz=tz)
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if name.endswith((".csv", ".txt")):  # Compressed, i.e. data.csv.gz
+        name = os.path.splitext(name)[0]
+
+    paths = []
+    with matplotlib.style.context(STYLE):
+        ax = _axes(size, dpi)
+        for month, selected in monthly_datasets(dataset):
+            result, unit = LazyDataset(
+                selected, TimeIndex(minutes=selected.minutes)).aggregate(
+                period).auto_unit(5000).collect()
+            ax.clear()
+            render_plot(ax, result, choice, unit, title="{} {}: electricity "
+                        "consumption per {}".format(name, month, period))
+            ax.figure.tight_layout()
+            path = os.path.join(directory, "{}_{}.{}".format(name, month, fmt))
+            ax.figure.savefig(path, format=fmt, dpi=dpi)
+            paths.append(path)
+    return paths
+
+
+def _axes(size, dpi):
+    """
+    The axes of this process, created on the first chart
+    """
+    if "ax" not in _AXES:
+        figure = Figure(figsize=size, dpi=dpi)
+        FigureCanvasAgg(figure)
+        _AXES["ax"] = figure.add_subplot(1, 1, 1)
+    ax = _AXES["ax"]
+    ax.figure.set_size_inches(size)
+    ax.figure.set_dpi(dpi)
+    return ax
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Renders a chart of every month of measurement files")
+    parser.add_argument("filenames", nargs="+")
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--fmode", default="forward fill")
+    parser.add_argument("--period", default="day")
+    parser.add_argument("--choice", default="All zones")
+    parser.add_argument("--format", default="png", choices=FORMATS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tz", default=None)
+    args = parser.parse_args()
+    paths = batch_report(args.filenames, args.out, args.fmode, args.period,
+                         args.choice, args.format, args.workers, tz=args.tz)
+    print("Wrote {} charts to {}".format(len(paths), args.out))
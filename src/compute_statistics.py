@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# Default statistics, the ones shown in the App
+STATISTICS = ["min", "25%", "50%", "75%", "max"]
+
+# Statistics that can be asked for, besides percentiles such as "99.5%"
+NAMED = ["count", "sum", "mean", "std", "min", "max", "load factor"]
+
+# Statistics without a unit, they do not change with kWh or Wh
+UNITLESS = ["count", "load factor"]
+
+
+def compute_statistics(data, stats=STATISTICS):
+    """
+    Computes any list of statistics of every zone and of the total of all
+    zones:
+        "count": number of measurements
+        "sum", "mean", "min", "max"
+        "std": standard deviation (with N - 1, like pandas)
+        "load factor": mean divided by max
+        "P%": the P percentile, e.g. "25%" or "99.5%"
+
+    The total is the sum of all zones at every timestamp, so its statistics
+    are those of the total consumption. Timestamps where a zone is missing
+    are left out of the total.
+
+    Every statistic is computed for all columns at once. All percentiles
+    come from one np.percentile call, which selects them with a single
+    partition of every column, so nothing is sorted more than once.
+
+    INPUT:
+        data: N x Z matrix where each row is a set of measurements
+        stats: list of names of statistics, see above
+
+    OUTPUT:
+        table: (Z + 1) x S float array with the statistics of every zone
+            and the total in the last row, in the order of stats
+
+    USAGE:
+        table = compute_statistics(data, ["mean", "99%", "load factor"])
+    """
+    stats = parse_statistics(stats)
+    percents = {stat: _percent(stat) for stat in stats if stat not in NAMED}
+
+    values = np.asarray(data, dtype=np.float64)
+    values = np.column_stack([values, values.sum(axis=1)])
+    present = ~np.isnan(values)
+    ncols = values.shape[1]
+
+    results = {}
+    count = present.sum(axis=0)
+    results["count"] = count.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if {"sum", "mean", "std", "load factor"} & set(stats):
+            filled = np.where(present, values, 0)
+            results["sum"] = filled.sum(axis=0)
+            results["mean"] = results["sum"] / count
+        if "std" in stats:
+            centered = np.where(present, values - results["mean"], 0)
+            results["std"] = np.sqrt(
+                np.einsum("ij,ij->j", centered, centered) / (count - 1))
+
+        # Minimum and maximum are the 0 and 100 percentiles, so all order
+        # statistics come from the same partition
+        q = set(percents.values())
+        if "min" in stats:
+            q.add(0.0)
+        if "max" in stats or "load factor" in stats:
+            q.add(100.0)
+        q = sorted(q)
+        if q:
+            ranked = _percentiles(values, present, q)
+            for n, p in enumerate(q):
+                results[p] = ranked[n]
+            results["min"] = results.get(0.0)
+            results["max"] = results.get(100.0)
+        if "load factor" in stats:
+            results["load factor"] = results["mean"] / results["max"]
+
+    table = np.empty((ncols, len(stats)))
+    for n, stat in enumerate(stats):
+        table[:, n] = results[percents.get(stat, stat)]
+    return table
+
+
+def parse_statistics(stats):
+    """
+    Checks a list of statistic names, see compute_statistics
+
+    OUTPUT:
+        stats: list of the names in lower case without spaces around them
+
+    USAGE:
+        stats = parse_statistics("Mean, 99%".split(","))  # ["mean", "99%"]
+    """
+    stats = [stat.strip().lower() for stat in stats]
+    for stat in stats:
+        if stat not in NAMED:
+            _percent(stat)
+    return stats
+
+
+def scale_statistics(stats, factor):
+    """
+    Factors that rescale every statistic when the unit of the data changes,
+    i.e. 1 / 1000 from Wh to kWh. Statistics in UNITLESS are not scaled
+
+    OUTPUT:
+        factors: S x 1 float array
+    """
+    return np.array([1.0 if stat.strip().lower() in UNITLESS else factor
+                     for stat in stats])
+
+
+def _percent(stat):
+    """
+    The percentile of a statistic name like "25%"
+    """
+    try:
+        if not stat.endswith("%"):
+            raise ValueError
+        percent = float(stat[:-1])
+    except ValueError:
+        raise ValueError("Unknown statistic: {}".format(stat))
+    if not 0 <= percent <= 100:
+        raise ValueError("Percentiles must be between 0% and 100%")
+    return percent
+
+
+def _percentiles(values, present, q):
+    """
+    Percentiles q of every column, leaving missing measurements out. Columns
+    without missing measurements are done in one np.percentile call
+    """
+    ranked = np.full((len(q), values.shape[1]), np.nan)
+    complete = present.all(axis=0)
+    if complete.any() and len(values):
+        ranked[:, complete] = np.percentile(values[:, complete], q, axis=0)
+    for c in np.flatnonzero(~complete & present.any(axis=0)):
+        ranked[:, c] = np.percentile(values[present[:, c], c], q)
+    return ranked
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+def gap_runs(mask):
+    """
+    Finds the runs of True values in a boolean vector
+
+    INPUT:
+        mask: N x 1 boolean array
+
+    OUTPUT:
+        starts: positions where each run starts
+        lengths: length of each run
+
+    USAGE:
+        starts, lengths = gap_runs(np.isnan(values))
+    """
+    # Pad with False so every run has both a start and an end
+    padded = np.zeros(len(mask) + 2, dtype=np.int8)
+    padded[1:-1] = mask
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    return starts, lengths
+
+
+def data_quality(minutes, corrupt, zones):
+    """
+    Creates a data quality report from the corrupted measurement mask and
+    the timestamps found while loading. Only the mask and the timestamps
+    are used, so the measurements are not scanned again.
+
+    INPUT:
+        minutes: N x 1 array of minutes since 1970 for every row
+        corrupt: N x Z boolean array, True where a measurement is corrupted
+        zones: list of the Z zone names
+
+    OUTPUT:
+        report: dictionary with
+            'rows': number of rows in the file
+            'corrupt': dictionary of corrupted measurements per zone
+            'gaps': dictionary of (starts, lengths) of gap runs per zone
+            'duplicates': number of duplicate timestamps
+            'out_of_order': number of timestamps earlier than the row before
+            'missing_minutes': number of minutes missing in the time grid
+
+    USAGE:
+        report = data_quality(minutes, corrupt, zones)
+    """
+    report = {'rows': len(minutes), 'corrupt': {}, 'gaps': {}}
+
+    # Gap runs per zone
+    for z, zone in enumerate(zones):
+        report['corrupt'][zone] = int(corrupt[:, z].sum())
+        report['gaps'][zone] = gap_runs(corrupt[:, z])
+
+    # Check the time grid. If the rows are in order, neighbouring rows
+    # are enough, otherwise the unique timestamps have to be counted
+    step = np.diff(minutes)
+    report['out_of_order'] = int((step < 0).sum())
+    if len(minutes) == 0:
+        report['duplicates'] = 0
+        report['missing_minutes'] = 0
+    elif report['out_of_order'] == 0:
+        report['duplicates'] = int((step == 0).sum())
+        report['missing_minutes'] = int((step[step > 1] - 1).sum())
+    else:
+        unique = len(np.unique(minutes))
+        report['duplicates'] = len(minutes) - unique
+        report['missing_minutes'] = int(
+            minutes.max() - minutes.min() + 1 - unique)
+
+    return report
+
+
+def quality_summary(report):
+    """
+    Formats a data quality report as text for the user to see
+
+    INPUT:
+        report: dictionary from data_quality
+
+    OUTPUT:
+        text: String with the report
+    """
+    lines = ["Data quality report",
+             "Rows: {}".format(report['rows']),
+             "Duplicate timestamps: {}".format(report['duplicates']),
+             "Out-of-order timestamps: {}".format(report['out_of_order']),
+             "Missing minutes in time grid: {}".format(
+                 report['missing_minutes'])]
+
+    for zone, (starts, lengths) in report['gaps'].items():
+        if len(lengths) == 0:
+            lines.append("{}: no corrupted measurements".format(zone))
+        else:
+            lines.append("{}: {} corrupted in {} gaps (longest {} rows)".format(
+                zone, report['corrupt'][zone], len(lengths), lengths.max()))
+
+    if 'repaired' in report:
+        lines.append("Repaired measurements: {}".format(report['repaired']))
+    if 'dropped' in report:
+        lines.append("Dropped rows: {}".format(report['dropped']))
+
+    return "\n".join(lines)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from src.timestamps import tvec_to_minutes, minutes_to_tvec
+from src.timezones import localize_minutes, to_local
+
+TIME_COLUMNS = ["year", "month", "day", "hour", "minute", "second"]
+ZONES = ["zone1", "zone2", "zone3", "zone4"]
+
+
+class Dataset():
+    """
+    Columnar store of a set of measurements that is shared between loading,
+    aggregation, statistics and plotting. Time is kept as one int64 column
+    of minutes and the measurements as one float64 array, so the whole
+    dataset is a single copy of the data. tvec and data dataFrames are only
+    views or are built when asked for.
+
+    INPUT:
+        minutes: N x 1 int64 array of minutes since 1970-01-01 00:00. For
+            aggregated data this is the first minute of every bucket and for
+            "hour of the day" it is the minute of the day
+        values: N x Z float64 array where each row is a set of measurements
+        zones: list of the Z zone names
+        period: String, the aggregation period of the data, see
+            aggregate_measurements
+        tz: String, IANA time zone name. If given, the minutes are UTC and
+            tvec and datetimes are in local time of tz, see timezones.
+            None for naive local minutes
+
+    USAGE:
+        dataset = Dataset(minutes, values)
+        dataset.data  # N x 4 dataFrame view of the values
+        dataset.tvec  # N x 6 dataFrame built from the minutes
+    """
+
+    def __init__(self, minutes, values, zones=ZONES, period="minute",
+                 tz=None):
+        self.minutes = minutes
+        self.values = values
+        self.zones = list(zones)
+        self.period = period
+        self.tz = tz
+
+    @classmethod
+    def from_frames(cls, tvec, data, period="minute", tz=None):
+        """
+        Creates a Dataset from a tvec and data dataFrame. If tz is given,
+        tvec is local time of tz, see localize_minutes
+        """
+        values = np.asarray(data, dtype=np.float64)
+        zones = list(data.columns) if hasattr(data, "columns") else ZONES
+        minutes = tvec_to_minutes(tvec)
+        if tz is not None:
+            minutes, _ = localize_minutes(minutes, tz)
+        return cls(minutes, values, zones, period, tz)
+
+    @classmethod
+    def empty(cls, zones=ZONES, period="minute", tz=None):
+        """
+        Creates a Dataset without any rows
+        """
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, len(zones))),
+                   zones, period, tz)
+
+    @classmethod
+    def concat(cls, first, second):
+        """
+        Creates a Dataset of the rows of first followed by the rows of second
+        """
+        return cls(np.concatenate([first.minutes, second.minutes]),
+                   np.concatenate([first.values, second.values]),
+                   first.zones, first.period, first.tz)
+
+    def __len__(self):
+        return len(self.minutes)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the dataset in bytes
+        """
+        return self.minutes.nbytes + self.values.nbytes
+
+    def take(self, i, j):
+        """
+        Rows i to j-1 as a new Dataset. No data is copied
+        """
+        return Dataset(self.minutes[i:j], self.values[i:j], self.zones,
+                       self.period, self.tz)
+
+    @property
+    def data(self):
+        """
+        N x Z dataFrame view of the measurements
+        """
+        return pd.DataFrame(self.values, columns=self.zones, copy=False)
+
+    @property
+    def tvec(self):
+        """
+        Time vectors in the same layout as aggregate_measurements returns:
+        N x 6 for minutes, N x 5 for hour, day and month and a Series of
+        hours for hour of the day. It is built every time it is asked for,
+        so only use it for output. With a time zone they are in local time
+        """
+        if self.period == "hour of the day":
+            return pd.Series(self.minutes // 60, name="hour")
+        columns = 6 if self.period == "minute" else 5
+        return pd.DataFrame(minutes_to_tvec(self.local())[:, 0:columns],
+                            columns=TIME_COLUMNS[0:columns])
+
+    def local(self):
+        """
+        Local wall-clock minutes, the minutes themselves if there is no time
+        zone
+        """
+        if self.tz is None:
+            return self.minutes
+        return to_local(self.minutes, self.tz)
+
+    def datetimes(self):
+        """
+        The minutes as a DatetimeIndex, i.e. for plotting. No strings or
+        time vectors are parsed. With a time zone it is time zone aware
+        """
+        index = pd.DatetimeIndex(self.minutes.astype('datetime64[m]'))
+        if self.tz is None:
+            return index
+        return index.tz_localize("UTC").tz_convert(self.tz)
+
+    def frame(self, rows=None):
+        """
+        tvec and data joined as one dataFrame for displaying. If rows is
+        given, only the first and last rows/2 rows are joined
+
+        INPUT:
+            rows: Integer, the maximum number of rows to join
+        """
+        if rows is not None and len(self) > rows:
+            half = rows // 2
+            head, tail = self.take(0, half), self.take(len(self) - half,
+                                                      len(self))
+            frame = pd.concat([head.frame(), tail.frame()])
+            frame.index = np.r_[0:half, len(self) - half:len(self)]
+            return frame
+        tvec = self.tvec
+        if self.period == "hour of the day":
+            data = self.data
+            data.index = tvec
+            data.index.name = "Hour of the day"
+            return data
+        return pd.concat([tvec, self.data], axis=1)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+
+from src.dataset import Dataset
+
+# Default memory budget in bytes
+BUDGET = 512 * 1024 ** 2
+
+
+class DatasetManager(MutableMapping):
+    """
+    Datasets held within a memory budget, i.e. the aggregation levels of the
+    loaded file. It works as a dictionary, so it can be the cache of
+    LazyDataset and PlotLevels.
+
+    The size of every dataset is tracked. When the datasets in memory take
+    more than the budget, the least recently used ones are spilled: their
+    minutes and values are written to .npy files in a temporary folder and
+    replaced by read-only memory maps of the files. A spilled dataset works
+    like any other, its pages are read from disk when used and the
+    operating system can drop them again.
+
+    Pinned datasets, such as the non-aggregated data and the dataset that
+    is shown, count towards the budget but are never spilled. A dataset
+    that is both pinned and held is only counted once.
+
+    INPUT:
+        budget: Integer, memory budget in bytes
+        folder: String, where the spilled datasets are written. Default is a
+            new temporary folder, which is removed with the manager
+
+    USAGE:
+        datasets = DatasetManager(budget=256 * 1024 ** 2)
+        datasets.pin("source", dataset)
+        pipeline = LazyDataset(dataset, index, cache=datasets)
+        resident, spilled = datasets.usage()
+    """
+
+    def __init__(self, budget=BUDGET, folder=None):
+        self.budget = budget
+        self.folder = folder or tempfile.mkdtemp(prefix="electricity-")
+        self._datasets = OrderedDict()  # From least to most recently used
+        self._spilled = {}  # Files of every spilled key
+        self._pinned = {}
+        self._count = 0  # Number of spilled datasets, names the files
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.folder,
+                                         True)
+
+    def __getitem__(self, key):
+        dataset = self._datasets[key]
+        self._datasets.move_to_end(key)
+        return dataset
+
+    def __setitem__(self, key, dataset):
+        if key in self._datasets:
+            del self[key]
+        self._datasets[key] = dataset
+        self._enforce()
+
+    def __delitem__(self, key):
+        del self._datasets[key]
+        for path in self._spilled.pop(key, ()):
+            _remove(path)
+
+    def __contains__(self, key):
+        # Checking for a key does not count as using it
+        return key in self._datasets
+
+    def __iter__(self):
+        return iter(list(self._datasets))
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def pin(self, key, dataset):
+        """
+        Counts dataset towards the budget without ever spilling it, None
+        unpins key
+        """
+        if dataset is None:
+            self._pinned.pop(key, None)
+        else:
+            self._pinned[key] = dataset
+        self._enforce()
+
+    def clear(self):
+        """
+        Removes all datasets, also the pinned ones, and their files
+        """
+        for key in list(self._datasets):
+            del self[key]
+        self._pinned = {}
+
+    def set_budget(self, budget):
+        """
+        Changes the budget, spilling datasets if it is exceeded
+        """
+        self.budget = budget
+        self._enforce()
+
+    def usage(self):
+        """
+        Memory used by the datasets
+
+        OUTPUT:
+            resident: Integer, bytes of the datasets in memory, pinned
+                included
+            spilled: Integer, bytes of the spilled datasets on disk
+        """
+        spilled = sum(self._datasets[key].nbytes for key in self._spilled)
+        resident = [dataset for key, dataset in self._datasets.items()
+                    if key not in self._spilled]
+        resident += list(self._pinned.values())
+        unique = {id(dataset): dataset for dataset in resident}
+        return sum(dataset.nbytes for dataset in unique.values()), spilled
+
+    def close(self):
+        """
+        Removes all datasets and the folder of the spilled ones
+        """
+        self.clear()
+        self._cleanup()
+
+    def _enforce(self):
+        """
+        Spills the least recently used datasets until the budget is kept
+        """
+        resident, _ = self.usage()
+        for key in list(self._datasets):
+            if resident <= self.budget:
+                break
+            # A pinned dataset stays in memory even if it is spilled
+            dataset = self._datasets[key]
+            if key in self._spilled or any(
+                    dataset is pinned for pinned in self._pinned.values()):
+                continue
+            resident -= dataset.nbytes
+            self._spill(key)
+
+    def _spill(self, key):
+        """
+        Writes a dataset to disk and replaces it with memory maps of the
+        files. The order of use is kept
+        """
+        dataset = self._datasets[key]
+        self._count += 1
+        arrays = []
+        paths = []
+        for name, array in (("minutes", dataset.minutes),
+                            ("values", dataset.values)):
+            path = os.path.join(self.folder, "{}-{}.npy".format(
+                self._count, name))
+            np.save(path, np.ascontiguousarray(array))
+            arrays.append(np.load(path, mmap_mode="r"))
+            paths.append(path)
+        self._datasets[key] = Dataset(arrays[0], arrays[1], dataset.zones,
+                                      dataset.period, dataset.tz)
+        self._spilled[key] = paths
+
+
+def _remove(path):
+    """
+    Removes a spilled file. On Windows a file cannot be removed while it is
+    mapped, then it is left for the folder cleanup
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from src.data_quality import gap_runs
+from src.timestamps import tvec_to_minutes
+from src.timezones import to_local
+
+# Names and descriptions of the detectors
+DETECTORS = {
+    "spike": "Rolling z-score against the previous window of minutes",
+    "jump": "Minute-to-minute change far from the typical change (MAD)",
+    "baseline": "Far from the weekday/weekend hourly baseline (MAD)",
+    "stuck": "Meter reports the same value for a long time",
+    "drift": "Daily baseload far from the baseload of the previous days"}
+
+
+def detect_anomalies(tvec, data, window=60, threshold=6.0, stuck=120,
+                     days=30, minutes=None, block=1 << 15, tz=None):
+    """
+    Finds abnormal consumption in all zones at once with five detectors:
+        "spike": the z-score of every measurement against the mean and
+            standard deviation of the previous window measurements, from
+            running sums
+        "jump": the change from the previous measurement, scaled by the
+            median absolute deviation (MAD) of all changes
+        "baseline": the residual from the average of the same hour of the
+            day on weekdays or weekends, scaled by its MAD
+        "stuck": runs of at least stuck identical measurements
+        "drift": the baseload (daily minimum) against the median baseload
+            of the previous days, scaled by its MAD
+
+    The rows are processed in blocks of block rows, so the memory use does
+    not grow with the dataset. Medians are estimated from at most 100k evenly
+    spaced rows.
+
+    INPUT:
+        tvec: N x 6 matrix where each row is a time vector
+        data: N x Z matrix where each row is a set of measurements, sorted
+            by time
+        window: Integer, rows in the rolling window of "spike"
+        threshold: Float, scores above this are flagged
+        stuck: Integer, shortest run of identical measurements to flag
+        days: Integer, days in the reference baseload of "drift"
+        minutes: N x 1 array of minutes since 1970, i.e. Dataset.minutes.
+            If given, tvec is not used and can be None
+        block: Integer, rows processed at a time
+        tz: String, IANA time zone name of UTC minutes, i.e. Dataset.tz.
+            The baseline hours and drift days are then local, and start
+            and end are time zone aware
+
+    OUTPUT:
+        anomalies: dataFrame with one row for every flagged interval and
+            the columns detector, zone, start and end (first and last
+            flagged minute, as datetimes), rows (number of rows) and score
+            (the largest score in the interval), sorted by start
+
+    USAGE:
+        anomalies = detect_anomalies(tvec, data)
+        anomalies[anomalies.detector == "spike"]
+    """
+    values = np.asarray(data, dtype=np.float64)
+    zones = list(data.columns) if hasattr(data, "columns") else [
+        "zone{}".format(z + 1) for z in range(values.shape[1])]
+    if minutes is None:
+        minutes = tvec_to_minutes(tvec)
+    local = minutes if tz is None else to_local(minutes, tz)
+
+    found = {"spike": _spikes(values, window, threshold, block),
+             "jump": _jumps(values, threshold, block),
+             "baseline": _baseline(values, local, threshold, block),
+             "stuck": _stuck(values, stuck),
+             "drift": _drift(values, local, days, threshold)}
+
+    frames = []
+    for detector, (zone, start, end, score) in found.items():
+        frames.append(pd.DataFrame({
+            "detector": detector,
+            "zone": np.asarray(zones, dtype=object)[zone],
+            "start": _datetimes(minutes[start], tz),
+            "end": _datetimes(minutes[end - 1], tz),
+            "rows": end - start,
+            "score": score}))
+    anomalies = pd.concat(frames, ignore_index=True)
+    return anomalies.sort_values("start", kind="stable").reset_index(
+        drop=True)
+
+
+def _datetimes(minutes, tz):
+    """
+    Minutes as datetimes, time zone aware if tz is given
+    """
+    times = pd.DatetimeIndex(minutes.astype('datetime64[m]'))
+    return times if tz is None else times.tz_localize("UTC").tz_convert(tz)
+
+
+def _flagged(score, threshold, offset, rows, zones, scores):
+    """
+    Collects the cells of a block where the absolute score is above
+    threshold into the lists rows, zones and scores
+    """
+    r, z = np.nonzero(np.abs(score) > threshold)
+    rows.append(r + offset)
+    zones.append(z)
+    scores.append(np.abs(score[r, z]))
+
+
+def _runs(rows, zones, scores):
+    """
+    Joins flagged cells that follow each other in the same zone into
+    intervals
+
+    OUTPUT:
+        zone, start, end, score: zone, first row, row after the last row and
+            largest score of every interval
+    """
+    # No blocks were processed when there are fewer rows than the window
+    if not rows:
+        rows, zones, scores = [np.empty(0, int)], [np.empty(0, int)], \
+            [np.empty(0)]
+    rows, zones, scores = (np.concatenate(rows), np.concatenate(zones),
+                           np.concatenate(scores))
+    if len(rows) == 0:
+        return rows, rows, rows, scores
+    order = np.lexsort((rows, zones))
+    rows, zones, scores = rows[order], zones[order], scores[order]
+    first = np.flatnonzero(np.r_[True, (np.diff(rows) != 1) |
+                                 (np.diff(zones) != 0)])
+    last = np.r_[first[1:], len(rows)] - 1
+    return (zones[first], rows[first], rows[last] + 1,
+            np.maximum.reduceat(scores, first))
+
+
+def _robust_scale(sample):
+    """
+    Median and MAD based standard deviation of every column. If more than
+    half of a column is equal to the median the MAD is 0, and the mean
+    absolute deviation is used instead. Columns without any deviation get
+    an infinite scale, so nothing is flagged in them
+    """
+    median = np.nanmedian(sample, axis=0)
+    deviation = np.abs(sample - median)
+    scale = 1.4826 * np.nanmedian(deviation, axis=0)
+    scale = np.where(scale > 0, scale,
+                     1.2533 * np.nanmean(deviation, axis=0))
+    return median, np.where(scale > 0, scale, np.inf)
+
+
+def _sample(n, size=100000):
+    """
+    Evenly spaced rows used to estimate medians
+    """
+    return slice(0, n, max(n // size, 1))
+
+
+def _spikes(values, window, threshold, block):
+    """
+    Rolling z-score against the previous window rows
+    """
+    n = len(values)
+    rows, zones, scores = [], [], []
+    for a in range(window, n, block):
+        b = min(a + block, n)
+        x = values[a - window:b]
+
+        # Running sums of x and x^2 give every window sum in one subtraction
+        c1 = np.zeros((len(x) + 1, x.shape[1]))
+        c2 = np.zeros((len(x) + 1, x.shape[1]))
+        np.cumsum(x, axis=0, out=c1[1:])
+        np.cumsum(x * x, axis=0, out=c2[1:])
+        mean = (c1[window:-1] - c1[:-window - 1]) / window
+        var = (c2[window:-1] - c2[:-window - 1]) / window - mean * mean
+        std = np.sqrt(np.maximum(var, 0))
+
+        # A flat window has no spread, changes after it are found as jumps
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.where(std > 1e-9, (x[window:] - mean) / std, 0)
+        _flagged(z, threshold, a, rows, zones, scores)
+    return _runs(rows, zones, scores)
+
+
+def _jumps(values, threshold, block):
+    """
+    Robust z-score of the change from the previous row
+    """
+    n = len(values)
+    rows, zones, scores = [], [], []
+    if n < 2:
+        return _runs([np.empty(0, int)], [np.empty(0, int)], [np.empty(0)])
+    sample = _sample(n - 1)
+    median, scale = _robust_scale(values[1:][sample] - values[:-1][sample])
+    for a in range(1, n, block):
+        b = min(a + block, n)
+        z = (values[a:b] - values[a - 1:b - 1] - median) / scale
+        _flagged(z, threshold, a, rows, zones, scores)
+    return _runs(rows, zones, scores)
+
+
+def _baseline(values, minutes, threshold, block):
+    """
+    Robust z-score of the residual from the hourly weekday/weekend baseline
+    """
+    n, nzones = values.shape
+    if n == 0:
+        return _runs([], [], [])
+    days = minutes // 1440
+    codes = ((days + 3) % 7 >= 5) * 24 + (minutes % 1440) // 60  # Thursday
+
+    # Mean of every code and zone from one bincount
+    index = (codes[:, None] * nzones + np.arange(nzones)).ravel()
+    sums = np.bincount(index, weights=values.ravel(), minlength=48 * nzones)
+    counts = np.bincount(codes, minlength=48)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        baseline = sums.reshape(48, nzones) / counts[:, None]
+
+    sample = _sample(n)
+    median, scale = _robust_scale(values[sample] - baseline[codes[sample]])
+    rows, zones, scores = [], [], []
+    for a in range(0, n, block):
+        b = min(a + block, n)
+        z = (values[a:b] - baseline[codes[a:b]] - median) / scale
+        _flagged(z, threshold, a, rows, zones, scores)
+    return _runs(rows, zones, scores)
+
+
+def _stuck(values, stuck):
+    """
+    Runs of at least stuck identical measurements
+    """
+    n, nzones = values.shape
+    if n < 2:
+        return _runs([np.empty(0, int)], [np.empty(0, int)], [np.empty(0)])
+
+    # Rows equal to the previous row, all zones after each other with a
+    # False in between, so one gap_runs call finds the runs of all zones
+    same = np.zeros((nzones, n), dtype=bool)
+    same[:, 1:n] = (values[1:] == values[:-1]).T
+    starts, lengths = gap_runs(same.ravel())
+
+    # A run of k equal changes is k + 1 identical measurements
+    keep = lengths + 1 >= stuck
+    starts, lengths = starts[keep], lengths[keep]
+    zone, start = np.divmod(starts, n)
+    return zone, start - 1, start + lengths, (lengths + 1) / stuck
+
+
+def _drift(values, minutes, days, threshold):
+    """
+    Robust z-score of the daily baseload against the median baseload of the
+    previous days
+    """
+    n, nzones = values.shape
+    day = minutes // 1440
+    first = np.flatnonzero(np.diff(day, prepend=day[:1] - 1))
+    empty = [np.empty(0, int)], [np.empty(0, int)], [np.empty(0)]
+    if len(first) <= days:
+        return _runs(*empty)
+
+    baseload = np.minimum.reduceat(values, first, axis=0)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        baseload[:-1], days, axis=0)
+    residual = baseload[days:] - np.median(windows, axis=2)
+    median, scale = _robust_scale(residual)
+    z = (residual - median) / scale
+
+    # Flag all rows of the flagged days
+    d, zone = np.nonzero(np.abs(z) > threshold)
+    start = first[d + days]
+    end = np.r_[first, n][d + days + 1]
+    return _runs(*_expand(zone, start, end, np.abs(z[d, zone])))
+
+
+def _expand(zone, start, end, score):
+    """
+    Rows, zones and scores of every row in the intervals [start, end)
+    """
+    lengths = end - start
+    offsets = np.repeat(start - np.cumsum(lengths) + lengths, lengths)
+    rows = np.arange(lengths.sum()) + offsets
+    return ([rows], [np.repeat(zone, lengths)],
+            [np.repeat(score, lengths)])
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+
+def export_data(filename, tvec, data, chunksize=500000):
+    """
+    Exports aggregated data to a file. The format is chosen from the
+    file extension:
+        ".csv": comma separated text, written in chunks so only one chunk
+            is formatted in memory at a time
+        ".npz": binary columnar format with one numpy array per column,
+            which is far faster to write and read than text
+
+    INPUT:
+        filename: String, the name of the file to write
+        tvec: N x 6 dataFrame (or N x 1 Series for hour of the day)
+        data: N x 4 dataFrame where each row is a set of measurements
+        chunksize: Integer, number of rows formatted at a time for ".csv"
+
+    OUTPUT:
+        rows: Integer, number of rows written
+
+    USAGE:
+        rows = export_data("2008_daily.csv", tvec, data)
+    """
+    # Hour of the day only has a single time column
+    if isinstance(tvec, pd.Series):
+        tvec = tvec.to_frame(name=tvec.name or "hour")
+
+    if filename.lower().endswith(".npz"):
+        # One array per column, stored without compression
+        columns = {str(name): tvec[name].to_numpy() for name in tvec.columns}
+        columns.update({str(name): data[name].to_numpy()
+                        for name in data.columns})
+        np.savez(filename, **columns)
+
+    elif filename.lower().endswith(".csv"):
+        with open(filename, "w", newline="") as f:
+            for i in range(0, max(len(data), 1), chunksize):
+                # Only the current chunk is joined and formatted
+                chunk = pd.concat([tvec.iloc[i:i + chunksize].reset_index(drop=True),
+                                   data.iloc[i:i + chunksize].reset_index(drop=True)],
+                                  axis=1)
+                # No float_format, the shortest text that reads back as
+                # the same value is written
+                chunk.to_csv(f, header=(i == 0), index=False)
+
+    else:
+        raise ValueError("Can only export to .csv or .npz files")
+
+    return len(data)
+
+
+def export_statistics(filename, stat):
+    """
+    Exports the statistics table from print_statistics to a .csv file
+
+    INPUT:
+        filename: String, the name of the file to write
+        stat: dataFrame with statistics
+
+    USAGE:
+        export_statistics("statistics.csv", print_statistics(tvec, data))
+    """
+    if not filename.lower().endswith(".csv"):
+        raise ValueError("Can only export statistics to .csv files")
+    stat.to_csv(filename)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.data_quality import gap_runs
+
+
+def fill_gaps(values, fmode, x=None, max_gap=None):
+    """
+    Fills corrupted measurements (NaN) in every column independently.
+    Every gap is a run of NaN in a column, found with gap_runs, so the
+    previous and next valid row of all its values are the rows right before
+    and after the run. Only the columns with corrupted values are searched,
+    one at a time, and only the corrupted values get positions, so no
+    index array of the whole array is made.
+
+    Gaps longer than max_gap rows are not filled, and neither are gaps
+    that cannot be filled, i.e. a leading gap in forward fill. Rows that
+    still contain NaN are marked in keep so they can be dropped.
+
+    INPUT:
+        values: N x Z float array with NaN for corrupted measurements.
+            It is filled in place
+        fmode: String, specifying how to fill. Can be:
+            "forward fill"
+            "backward fill"
+            "linear interpolation"
+            "time interpolation"
+        x: N x 1 array of timestamps, e.g. minutes. Only needed for
+            "time interpolation"
+        max_gap: Integer, longest gap (in rows) that is filled. None for
+            no limit
+
+    OUTPUT:
+        values: the filled N x Z array
+        keep: N x 1 boolean array, True for rows without NaN
+
+    USAGE:
+        values, keep = fill_gaps(values, "linear interpolation", max_gap=60)
+        values = values[keep]
+    """
+    nan = np.isnan(values)
+    if not nan.any():
+        return values, np.ones(len(values), dtype=bool)
+    if fmode not in ("forward fill", "backward fill", "linear interpolation",
+                     "time interpolation"):
+        raise ValueError("Unknown fill mode: {}".format(fmode))
+
+    # Only the columns with corrupted values are searched
+    n = len(values)
+    for col in np.flatnonzero(nan.any(axis=0)):
+        # Every gap is a run of NaN, so the valid values around it are the
+        # rows right before and after the run. -1 and n mean that there is
+        # none
+        starts, lengths = gap_runs(nan[:, col])
+        if max_gap is not None:
+            starts, lengths = starts[lengths <= max_gap], \
+                lengths[lengths <= max_gap]
+        prev, nxt = starts - 1, starts + lengths
+        if fmode == "forward fill":
+            ok = prev >= 0
+        elif fmode == "backward fill":
+            ok = nxt < n
+        else:
+            ok = (prev >= 0) & (nxt < n)
+        starts, lengths, prev, nxt = starts[ok], lengths[ok], prev[ok], \
+            nxt[ok]
+
+        # Row, and valid rows around it, of every cell that is filled
+        p = np.repeat(prev, lengths)
+        q = np.repeat(nxt, lengths)
+        rows = p + 1 + np.arange(len(p)) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths)
+        column = values[:, col]
+
+        if fmode == "forward fill":
+            column[rows] = column[p]
+
+        elif fmode == "backward fill":
+            column[rows] = column[q]
+
+        else:
+            # Interpolate between the valid values on both sides
+            if fmode == "time interpolation":
+                xr, xp, xq = x[rows], x[p], x[q]
+            else:
+                xr, xp, xq = rows, p, q
+            span = (xq - xp).astype(np.float64)
+            weight = np.divide(xr - xp, span, out=np.zeros(len(span)),
+                               where=span > 0)
+            column[rows] = column[p] + weight * (column[q] - column[p])
+
+    keep = ~np.isnan(values).any(axis=1)
+    return values, keep
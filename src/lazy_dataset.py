@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.aggregate_measurements import aggregate_dataset
+from src.dataset import Dataset
+
+
+class LazyDataset():
+    """
+    Lazy version of the select -> aggregate -> rescale steps of the App.
+    Every method only records the operation and returns a new LazyDataset.
+    Nothing is computed before collect is called, which fuses all recorded
+    operations into one pass over the selected rows:
+        - select only narrows the row positions, no rows are copied
+        - aggregate reduces the selected rows directly into the result,
+          without joining tvec and data first
+        - scale and auto_unit are applied in place on the result
+
+    The data has to be sorted by time, see load_dataset
+
+    INPUT:
+        dataset: Dataset with non-aggregated data
+        index: TimeIndex of the dataset
+        cache: dictionary with an aggregated Dataset of all rows for some
+            periods, i.e. from ResultCache, or a DatasetManager. These are
+            used instead of aggregating when nothing is selected, and
+            aggregations of all rows are added
+        aggregator: ParallelAggregator of the dataset, which aggregates the
+            selected rows in a process pool. None to aggregate serially
+
+    USAGE:
+        pipeline = LazyDataset(dataset, index)
+        dataset_a, unit = pipeline.select(start, end).aggregate(
+            "day").auto_unit().collect()
+    """
+
+    def __init__(self, dataset, index, ops=(), cache=None, aggregator=None):
+        self.dataset = dataset
+        self.index = index
+        self.ops = ops
+        self.cache = {} if cache is None else cache
+        self.aggregator = aggregator
+
+    def extend(self, dataset, index):
+        """
+        LazyDataset of dataset, which is this dataset with rows added to
+        the end, i.e. in live mode. The cached aggregations of all rows are
+        updated from the first row of their last bucket, so only that
+        bucket and the new rows are aggregated. Other cached results, i.e.
+        of PlotLevels, are removed. The aggregator only holds the old rows,
+        so it is not kept
+
+        INPUT:
+            dataset: Dataset with the rows of this dataset and the new rows
+            index: TimeIndex of dataset
+        """
+        for key in list(self.cache):
+            level = self.cache[key]
+            if key not in ("hour", "day", "month"):
+                del self.cache[key]
+            elif len(level) == 0:
+                self.cache[key] = aggregate_dataset(dataset, key)
+            else:
+                i = index.positions(int(level.minutes[-1]))[0]
+                tail = aggregate_dataset(dataset.take(i, len(dataset)), key)
+                self.cache[key] = Dataset.concat(
+                    level.take(0, len(level) - 1), tail)
+        return LazyDataset(dataset, index, self.ops, self.cache)
+
+    def _then(self, *op):
+        return LazyDataset(self.dataset, self.index, self.ops + (op,),
+                           self.cache, self.aggregator)
+
+    def select(self, start=None, end=None):
+        """
+        Only use the rows in the range [start, end), see TimeIndex.query
+        """
+        return self._then("select", start, end)
+
+    def aggregate(self, period):
+        """
+        Aggregate with respect to period, see aggregate_measurements
+        """
+        return self._then("aggregate", period.lower())
+
+    def scale(self, factor, unit):
+        """
+        Multiply the measurements by factor, which gives the new unit
+        """
+        return self._then("scale", factor, unit)
+
+    def auto_unit(self, limit=5000):
+        """
+        Change to kilowatt-hour if any value is above limit
+        """
+        return self._then("auto_unit", limit)
+
+    def collect(self):
+        """
+        Computes the result of all recorded operations
+
+        OUTPUT:
+            dataset_a: Dataset with the result
+            unit: String, the unit of the result
+        """
+        # Combine the recorded operations into one plan
+        i, j = 0, len(self.dataset)
+        period = "minute"
+        factor, unit = 1.0, "Watt-hour"
+        limit = None
+        for op in self.ops:
+            if op[0] == "select":
+                if period != "minute":
+                    raise ValueError("Can only select before aggregating")
+                start, end = self.index.positions(op[1], op[2])
+                i, j = max(i, start), min(j, end)
+                j = max(i, j)
+            elif op[0] == "aggregate":
+                if period != "minute":
+                    raise ValueError("Data can only be aggregated once")
+                period = op[1]
+            elif op[0] == "scale":
+                factor, unit = factor * op[1], op[2]
+            elif op[0] == "auto_unit":
+                limit = op[1]
+
+        # Aggregate straight from a view of the selected rows. Only the
+        # result is allocated, except for minutes where it is the view.
+        # Results of all rows are shared with the cache, so they are not
+        # fresh
+        everything = (i, j) == (0, len(self.dataset))
+        if everything and period in self.cache:
+            result = self.cache[period]
+            fresh = False
+        elif everything and period != "minute":
+            result = self._aggregate(i, j, period)
+            self.cache[period] = result
+            fresh = False
+        else:
+            result = self._aggregate(i, j, period)
+            fresh = period != "minute"
+
+        # Rescale in place, only shared data has to be copied first
+        values = result.values
+        if limit is not None and (values > limit / factor).any():
+            factor, unit = factor / 1000, "Kilowatt-hour"
+        if factor != 1:
+            if fresh:
+                np.multiply(values, factor, out=values)
+            else:
+                result = Dataset(result.minutes, values * factor,
+                                 result.zones, result.period, result.tz)
+
+        return result, unit
+
+    def _aggregate(self, i, j, period):
+        """
+        Aggregates rows i to j-1, in the process pool if there is one
+        """
+        if self.aggregator is None:
+            return aggregate_dataset(self.dataset.take(i, j), period)
+        return self.aggregator.aggregate(period, i, j)
@@ -1,25 +1,39 @@
 # -*- coding: utf-8 -*-
+import os
 
 import pandas as pd
 import numpy as np
 
+from src.aggregate_measurements import aggregate_dataset
+from src.dataset import Dataset
+from src.open_measurements import open_measurements, FileExtensionError
+from src.repair_measurements import (repair_measurements, repair_columns,
+                                     NAMES)
+from src.sniff_measurements import sniff_measurements, SchemaError
+from src.timestamps import minutes_to_tvec, tvec_to_minutes
+from src.timezones import localize_minutes
 
-class FileExtensionError(Exception):
-    """
-    Custom exception that displays an error message 'msg' when called
-    """
-
-    def __init__(self, msg):
-        self.msg = msg
+# The errors are raised while loading, so they can be imported from here
+__all__ = ["load_measurements", "load_dataset", "parse_measurements",
+           "FileExtensionError", "SchemaError"]
 
 
-def load_measurements(filename, fmode):
+def load_measurements(filename, fmode, report=False, max_gap=None):
     """
-    Loads data from a .csv file and separates it into two variables
+    Loads data from a .csv file, or a .csv file compressed as .gz, .bz2,
+    .xz or .zip, and separates it into two variables
     tvec and data. Any corrupt data will be handled in the mode specified
     by the user (fmode). If a problem with either forward fill or backward fill
     is encountered, then print a warning and change to drop mode.
 
+    While the corrupted measurements are found, a data quality report is
+    made from the same mask, so no extra scan of the data is needed.
+
+    The layout of the file is found from its first and last lines before it
+    is parsed, so files with a header, ";" or tab delimiters, decimal commas
+    or time stamps instead of time vectors are also read, and malformed
+    files raise SchemaError at once, see sniff_measurements.
+
     INPUT:
         filename: String, the full name of the datafile
         fmode: String, specifying how to handle corrupted measurements.
@@ -27,72 +41,296 @@ def load_measurements(filename, fmode):
                 "forward fill"
                 "backward fill"
                 "drop"
+                "linear interpolation"
+                "time interpolation"
+            Every zone is filled independently
+        report: Boolean, if True the data quality report is also returned
+        max_gap: Integer, longest run of corrupted measurements (in rows)
+            that is filled. Rows in longer gaps are dropped. None for no limit
 
     OUTPUT:
         tvec: N x 6 dataFrame where each row is a time vector
         data: N x 4 dataFrame where each row is a set of measurements
         warning: String, warning message
+        quality: dictionary with the data quality report, see data_quality
+            (only if report is True)
 
     USAGE:
-        tvec,data = load_measurements(filename,fmode)
+        tvec,data,warning = load_measurements(filename,fmode)
+        tvec,data,warning,quality = load_measurements(filename,fmode,True)
+        tvec,data,warning = load_measurements(filename,fmode,max_gap=60)
 
     @Author: Simon Moe Sørensen, moe.simon@gmail.com
     """
-
-    # Initial variables
-    warning = False
-    fmodeStr = ["forward fill", "backward fill", "drop"]
-    fmode = fmode.lower()
-
-    # Load the datafile into DataFrame (variable name: df)
-    df = pd.read_csv(filename, header=None,
-                     names=["year", "month", "day", "hour", "minute", "second", "zone1", "zone2", "zone3", "zone4"])
-
-    # Check if csv file
-    if ".csv" not in filename:
-        raise FileExtensionError("Wrong file extension, please try again")
-
-    # Replace -1 with NaN values
-    df = df.replace(-1, np.NaN)
-
-    # Check if first or last row is corrupted and compare to errorhandling mode
-    # if special case is found, change to drop mode and print warning
-    if df.iloc[0, :].isnull().any() and fmode in fmodeStr[0]:
-        # Change to drop mode
-        fmodeold = fmode
-        fmode = "drop"
-        # Print warning
-        warning = True
-
-    elif df.iloc[len(df) - 1, :].isnull().any() and fmode in fmodeStr[1]:
-        # Change to drop mode
-        fmodeold = fmode
-        fmode = "drop"
-        # Print warning
-        warning = True
-
-    # Do errorhandling
-    if fmode == "forward fill":
-        # Use pandas forward fill
-        df = df.ffill()
-
-    elif fmode == "backward fill":
-        # Use pandas backfill
-        df = df.bfill()
-
-    elif fmode == "drop":
-        # Use pandas drop missing values
-        df = df.dropna()
-
-    # Print warning
-    if warning:
-        warning = ("""
-!WARNING!
-{} error
-dropping all corrupted rows""".format(fmodeold))
+    values, minutes, warning, quality = _read_measurements(
+        filename, fmode, max_gap)
 
     # Define data and tvec as a pandas dataFrame
+    df = pd.DataFrame(values, columns=NAMES, copy=False)
     data = df.iloc[:, 6:10]
-    tvec = df.iloc[:, 0:6]
+    tvec = df.iloc[:, 0:6].astype(np.int64)
 
+    if report:
+        return tvec, data, warning, quality
     return tvec, data, warning
+
+
+def load_dataset(filename, fmode, max_gap=None, progress=None, tz=None,
+                 ambiguous="infer", nonexistent="shift", schema=None):
+    """
+    Loads data from a .csv file into a Dataset, handling corrupted
+    measurements exactly like load_measurements. Only the minutes and the
+    measurements are kept, so the Dataset is a single compact copy of the
+    data. Every parsed chunk is split into the minutes and the measurements
+    straight away and the corrupted measurements are filled in place, so
+    the memory used while loading is close to the Dataset itself, see
+    repair_columns. The rows are sorted by time.
+
+    If progress is given, the file is parsed in chunks and progress is
+    called after every chunk with a preview of the daily sums so far.
+    Corrupted measurements are left out of the preview, since they can only
+    be handled when the whole file is parsed.
+
+    If tz is given, the time vectors in the file are local time of tz. They
+    are converted to UTC in the order they were logged, before sorting, so
+    the hour that is repeated when the clocks go back is resolved
+    correctly, see localize_minutes.
+
+    INPUT:
+        filename: String, the full name of the datafile
+        fmode: String, see load_measurements
+        max_gap: Integer, see load_measurements
+        progress: function called as progress(fraction, preview), where
+            fraction is the part of the file parsed so far and preview is a
+            Dataset with the daily sums of the parsed rows
+        tz: String, IANA time zone name such as "Europe/Copenhagen". None
+            for naive local time
+        ambiguous, nonexistent: String, see localize_minutes
+        schema: dictionary, the layout of the file if it has already been
+            found with sniff_measurements. None to find it
+
+    OUTPUT:
+        dataset: Dataset with the measurements
+        warning: String, warning message (False if there is none)
+        quality: dictionary with the data quality report, see data_quality
+
+    USAGE:
+        dataset, warning, quality = load_dataset(filename, fmode)
+        dataset, warning, quality = load_dataset(filename, fmode,
+                                                 tz="Europe/Copenhagen")
+    """
+    onChunk = None
+    if progress is not None:
+        preview = Dataset.empty(NAMES[6:10], "day")
+
+        def showPreview(fraction, chunk):
+            nonlocal preview
+            # Days can continue in the next chunk, so aggregate them again
+            preview = aggregate_dataset(
+                Dataset.concat(preview, _preview_days(chunk)), "day")
+            progress(fraction, preview)
+        onChunk = showPreview
+
+    minutes, values, bad, tvecs = _read_columns(filename, onChunk,
+                                                schema=schema)
+    minutes, values, warning, quality = repair_columns(
+        minutes, values, bad, tvecs, fmode, max_gap, tz, ambiguous,
+        nonexistent)
+
+    if tz is not None:
+        minutes, keep = localize_minutes(minutes, tz, ambiguous, nonexistent)
+        if not keep.all():
+            minutes, values = minutes[keep], values[keep]
+
+    # Make sure the rows are sorted by time
+    if (np.diff(minutes) < 0).any():
+        order = np.argsort(minutes, kind="stable")
+        minutes, values = minutes[order], values[order]
+
+    dataset = Dataset(minutes, values, NAMES[6:10], tz=tz)
+    return dataset, warning, quality
+
+
+def parse_measurements(stream, schema, chunksize=None, header=True):
+    """
+    Parses a measurement file laid out as schema into N x 10 float arrays
+    of time vectors and measurements, like a file without a header with ten
+    comma separated numbers. Time stamps that cannot be read get -1, so they
+    are handled as corrupted
+
+    INPUT:
+        stream: binary file object, see open_measurements
+        schema: dictionary, see sniff_measurements
+        chunksize: Integer, rows per array. None to parse everything at once
+        header: Boolean, False if stream starts after the header
+
+    OUTPUT:
+        values: N x 10 float array, or an iterator of arrays of chunksize
+            rows if chunksize is given
+
+    USAGE:
+        with open_measurements(filename) as (stream, raw):
+            values = parse_measurements(stream, sniff_measurements(filename))
+    """
+    layout = schema["layout"]
+    names = NAMES if layout == "vector" else (
+        ["time"] if layout == "timestamp" else ["date", "time"]) + NAMES[6:10]
+    dtype = {name: str if name in ("date", "time") else np.float64
+             for name in names}
+    reader = pd.read_csv(stream, sep=schema["delimiter"],
+                         decimal=schema["decimal"], header=None, names=names,
+                         skiprows=schema["header"] if header else 0,
+                         dtype=dtype, chunksize=chunksize)
+    if chunksize is None:
+        return _to_values(reader, schema)
+    return (_to_values(df, schema) for df in reader)
+
+
+def _read_measurements(filename, fmode, max_gap):
+    """
+    Reads the file and handles corrupted measurements, see load_measurements
+    and repair_measurements
+
+    OUTPUT:
+        values: N x 10 float array with the time vectors and measurements
+        minutes: N x 1 array with the minutes of every row
+        warning: String, warning message (False if there is none)
+        quality: dictionary with the data quality report
+    """
+    # Load the datafile into one array. The file type and layout are checked
+    # before anything is parsed
+    values = _read_values(filename)
+    return repair_measurements(values, fmode, max_gap)
+
+
+def _read_values(filename, chunksize=200000):
+    """
+    Parses the file into an N x 10 float array, chunksize rows at a time so
+    pandas never holds more than a chunk. Compressed files are decompressed
+    while they are parsed, see open_measurements. The header, delimiter,
+    decimal separator and time layout are found first from a sample of the
+    file, see sniff_measurements, so a malformed file fails before it is
+    parsed
+    """
+    schema = sniff_measurements(filename)
+    with open_measurements(filename) as (stream, raw):
+        chunks = list(parse_measurements(stream, schema, chunksize))
+
+    # Copy the chunks into one array and free every chunk as soon as it is
+    # copied. The pages of np.empty are only used when they are written, so
+    # the peak is one copy of the values and one chunk instead of two copies
+    values = np.empty((sum(len(chunk) for chunk in chunks), len(NAMES)))
+    i = 0
+    while chunks:
+        chunk = chunks.pop(0)
+        values[i:i + len(chunk)] = chunk
+        i += len(chunk)
+    return values
+
+
+def _read_columns(filename, onChunk=None, chunksize=100000, schema=None):
+    """
+    Parses the file like _read_values, but every chunk is split into the
+    minutes and the measurements as soon as it is parsed, so only a chunk
+    of the N x 10 array is held at a time. The arrays are allocated for
+    the number of rows estimated from the part of the file read so far,
+    with a margin, and grown geometrically if the estimate was too low.
+    Memory is only used for the rows that are written, and the arrays are
+    cut to the number of rows in place.
+
+    If onChunk is given, onChunk(fraction, chunk) is called for every
+    chunk, where fraction is the part of the file read. If schema is given,
+    the file has already been sniffed
+
+    OUTPUT:
+        minutes: N x 1 int64 array with the minutes of every row, not
+            meaningful for the rows in bad
+        values: N x 4 float array with the measurements, NaN for corrupted
+            ones
+        bad: sorted positions of the rows with a corrupted time vector
+        tvecs: len(bad) x 6 float array with their time vectors, NaN for
+            corrupted fields
+    """
+    if schema is None:
+        schema = sniff_measurements(filename)
+    minutes = np.empty(0, dtype=np.int64)
+    values = np.empty((0, 4))
+    bad, tvecs = [np.empty(0, dtype=np.int64)], [np.empty((0, 6))]
+    n = 0
+    with open_measurements(filename) as (stream, raw):
+        size = max(os.fstat(raw.fileno()).st_size, 1)
+        for chunk in parse_measurements(stream, schema, chunksize):
+            fraction = min(raw.tell() / size, 1.0)
+            if onChunk is not None:
+                onChunk(fraction, chunk)
+            m = len(chunk)
+            if n + m > len(minutes):
+                estimate = int((n + m) / max(fraction, 1e-3) * 1.25)
+                capacity = max(n + m, estimate, 2 * len(minutes))
+                minutes = _grow(minutes, n, capacity)
+                values = _grow(values, n, capacity)
+
+            corrupt = chunk == -1
+            corrupt |= np.isnan(chunk)
+            with np.errstate(invalid="ignore"):
+                minutes[n:n + m] = tvec_to_minutes(chunk[:, 0:6])
+            chunk[corrupt] = np.nan
+            values[n:n + m] = chunk[:, 6:10]
+            rows = np.flatnonzero(corrupt[:, 0:6].any(axis=1))
+            bad.append(rows + n)
+            tvecs.append(chunk[rows, 0:6])
+            n += m
+    # Cutting the arrays in place frees the rest without copying the rows.
+    # They do not have any views here
+    minutes.resize(n, refcheck=False)
+    values.resize((n, 4), refcheck=False)
+    return minutes, values, np.concatenate(bad), np.concatenate(tvecs)
+
+
+def _grow(array, n, rows):
+    """
+    Empty array with room for rows rows and the first n rows of array. The
+    pages of np.empty are only used when they are written, unlike those
+    added by ndarray.resize, which fills them with zeros
+    """
+    grown = np.empty((rows,) + array.shape[1:], dtype=array.dtype)
+    grown[:n] = array[:n]
+    return grown
+
+
+def _preview_days(chunk):
+    """
+    Daily sums of a parsed chunk where corrupted measurements count as 0 and
+    rows with a corrupted time are left out
+    """
+    corrupt = (chunk == -1) | np.isnan(chunk)
+    rows = ~corrupt[:, 0:6].any(axis=1)
+    values = np.where(corrupt[rows, 6:10], 0, chunk[rows, 6:10])
+    minutes = tvec_to_minutes(chunk[rows, 0:6])
+    return aggregate_dataset(Dataset(minutes, values, NAMES[6:10]), "day")
+
+
+def _to_values(df, schema):
+    """
+    N x 10 float array of a parsed dataFrame
+    """
+    if schema["layout"] == "vector":
+        values = df.to_numpy(dtype=np.float64)
+        if not values.flags.writeable:
+            # Copy-on-write pandas only gives a read-only view
+            values = values.copy()
+        return values
+
+    stamps = df["time"] if schema["layout"] == "timestamp" else \
+        df["date"] + " " + df["time"]
+    times = pd.to_datetime(stamps.str.strip(), format=schema["format"],
+                           errors="coerce")
+    valid = ~np.asarray(times.isna())
+    seconds = times.to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+    values = np.full((len(df), len(NAMES)), -1.0)
+    values[valid, 0:6] = minutes_to_tvec(seconds[valid] // 60)
+    values[valid, 5] = seconds[valid] % 60
+    values[:, 6:10] = df[NAMES[6:10]].to_numpy(dtype=np.float64)
+    return values
+
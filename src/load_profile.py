@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from src.timestamps import tvec_to_minutes
+
+# Names of the groups in every split
+SPLITS = {
+    "all": ["All days"],
+    "weekday": ["Weekday", "Weekend"],
+    "month": ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+              "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
+    "season": ["Winter", "Spring", "Summer", "Autumn"]}
+
+# Season of every month, winter is December to February
+SEASON_OF_MONTH = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+
+def load_profile(tvec, data, resolution=60, minutes=None):
+    """
+    Computes the average load profile over the day, i.e. the mean
+    consumption of every hour of the day, split in different ways:
+        "all": all days together
+        "weekday": weekdays and weekends
+        "month": every month of the year
+        "season": winter, spring, summer and autumn
+
+    Every row gets one bucket code combining month, weekday/weekend and
+    time of day. A single bincount over these codes gives sums and counts
+    of the finest buckets, and all splits are made by adding buckets
+    together, so the data is only passed through once.
+
+    INPUT:
+        tvec: N x 6 matrix where each row is a time vector
+        data: N x 4 matrix where each row is a set of measurements
+        resolution: Integer, minutes in every time of day slot. Use
+            60 for 24 hourly slots or 15 for 96 quarter-hourly slots
+        minutes: N x 1 array of minutes since 1970, i.e. Dataset.minutes.
+            If given, tvec is not used and can be None
+
+        Attention! Both tvec and data have to be non-aggregated data
+
+    OUTPUT:
+        profiles: dictionary with a dataFrame for every split. The index is
+            the time of day of each slot (minutes after midnight) and the
+            columns are (group, zone). Slots without data are NaN
+
+    USAGE:
+        profiles = load_profile(tvec, data, 15)
+        profiles["season"]["Winter"]
+    """
+    values = np.asarray(data, dtype=np.float64)
+    zones = list(data.columns) if hasattr(data, "columns") else [
+        "zone{}".format(z + 1) for z in range(values.shape[1])]
+    nzones = len(zones)
+    slots = 1440 // resolution
+
+    # Bucket code of every row: month, weekday/weekend, slot of the day
+    if minutes is None:
+        minutes = tvec_to_minutes(tvec)
+    days = minutes // 1440
+    month = days.astype('datetime64[D]').astype(
+        'datetime64[M]').astype(np.int64) % 12
+    weekend = (days + 3) % 7 >= 5  # 1970-01-01 was a Thursday
+    slot = (minutes % 1440) // resolution
+    codes = (month * 2 + weekend) * slots + slot
+
+    # One bincount for all zones, each zone gets its own set of buckets
+    nbuckets = 12 * 2 * slots
+    sums = np.bincount((codes[:, None] * nzones + np.arange(nzones)).ravel(),
+                       weights=values.ravel(), minlength=nbuckets * nzones)
+    sums = sums.reshape(12, 2, slots, nzones)
+    counts = np.bincount(codes, minlength=nbuckets).reshape(12, 2, slots, 1)
+
+    # Combine the fine buckets into every split (group x slot x zone)
+    split_sums = {
+        "all": sums.sum(axis=(0, 1))[None],
+        "weekday": sums.sum(axis=0),
+        "month": sums.sum(axis=1),
+        "season": np.stack([sums[SEASON_OF_MONTH == s].sum(axis=(0, 1))
+                            for s in range(4)])}
+    split_counts = {
+        "all": counts.sum(axis=(0, 1))[None],
+        "weekday": counts.sum(axis=0),
+        "month": counts.sum(axis=1),
+        "season": np.stack([counts[SEASON_OF_MONTH == s].sum(axis=(0, 1))
+                            for s in range(4)])}
+
+    profiles = {}
+    index = pd.Index(np.arange(slots) * resolution, name="Minute of the day")
+    for split, groups in SPLITS.items():
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = split_sums[split] / split_counts[split]
+        # group x slot x zone -> slot x (group, zone)
+        mean = mean.transpose(1, 0, 2).reshape(slots, len(groups) * nzones)
+        columns = pd.MultiIndex.from_product([groups, zones])
+        profiles[split] = pd.DataFrame(mean, index=index, columns=columns)
+
+    return profiles
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Local HTTP API with the same loading, aggregation and statistics as the
+App, so dashboards and scripts share one warm copy of every dataset.
+
+USAGE:
+    python -m src.measurement_server --port 8765
+
+    GET /load?file=data.csv&fmode=forward fill
+    GET /aggregate?file=data.csv&period=day&start=2008-01-01&end=2008-02-01
+    GET /aggregate?file=data.csv&period=hour&format=npz
+    GET /statistics?file=data.csv&period=day&stats=mean,std,99%,load factor
+    GET /datasets
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from src.compute_statistics import parse_statistics, STATISTICS
+from src.lazy_dataset import LazyDataset
+from src.load_measurements import load_dataset, FileExtensionError
+from src.print_statistics import print_statistics
+from src.time_index import TimeIndex
+
+PERIODS = ["minute", "hour", "day", "month", "hour of the day"]
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """
+    Custom exception that is answered with the HTTP status and message 'msg'
+    """
+
+    def __init__(self, status, msg):
+        self.status = status
+        self.msg = msg
+
+
+class MeasurementServer():
+    """
+    Keeps loaded datasets in memory and answers requests for aggregated
+    slices and statistics of them. The datasets are kept in a least recently
+    used cache of max_datasets entries. Clients that ask for a file that is
+    still loading wait for the same load, so a file is only parsed once no
+    matter how many clients ask for it.
+
+    Parsing, aggregation and statistics run in an executor, so the event
+    loop keeps serving other clients meanwhile. Aggregations of all rows are
+    kept with the dataset, so repeated requests are answered from memory.
+
+    INPUT:
+        max_datasets: Integer, the maximum number of datasets in memory
+        executor: concurrent.futures executor for the CPU heavy work.
+            Default is a thread pool
+
+    USAGE:
+        server = MeasurementServer()
+        asyncio.run(server.serve("127.0.0.1", 8765))
+    """
+
+    def __init__(self, max_datasets=4, executor=None):
+        self.max_datasets = max_datasets
+        self.executor = executor or ThreadPoolExecutor()
+        self.entries = OrderedDict()  # key -> loaded dataset
+        self.loading = {}  # key -> future of a load in progress
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Serves requests on host and port until cancelled
+        """
+        server = await asyncio.start_server(self._handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _run(self, func, *args):
+        """
+        Runs func in the executor
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def dataset(self, filename, fmode="forward fill", max_gap=None):
+        """
+        The loaded dataset of filename, loading it if it is not in memory
+
+        OUTPUT:
+            entry: dictionary with the "dataset", its "index", the
+                "warning" and "quality" of the load and the cached
+                "aggregates" of all rows
+        """
+        # A changed file is loaded again
+        key = (os.path.abspath(filename), os.stat(filename).st_mtime_ns,
+               fmode.lower(), max_gap)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if key not in self.loading:
+            self.loading[key] = asyncio.ensure_future(
+                self._load(key, filename, fmode, max_gap))
+        # Shielded, so a client that disconnects does not cancel the load
+        # for the others
+        return await asyncio.shield(self.loading[key])
+
+    async def _load(self, key, filename, fmode, max_gap):
+        try:
+            dataset, warning, quality = await self._run(
+                load_dataset, filename, fmode, max_gap)
+        finally:
+            del self.loading[key]
+        entry = {"dataset": dataset, "index": TimeIndex(
+            minutes=dataset.minutes), "warning": warning, "quality": quality,
+            "aggregates": {}}
+        self.entries[key] = entry
+        while len(self.entries) > self.max_datasets:
+            self.entries.popitem(last=False)
+        return entry
+
+    async def aggregate(self, entry, period, start=None, end=None):
+        """
+        The Dataset of the rows in [start, end) aggregated by period, see
+        LazyDataset
+        """
+        pipeline = LazyDataset(entry["dataset"], entry["index"],
+                               cache=entry["aggregates"])
+        result, _ = await self._run(
+            lambda: pipeline.select(start, end).aggregate(period).collect())
+        if start is None and end is None:
+            entry["aggregates"][period] = result
+        return result
+
+    async def _handle(self, reader, writer):
+        """
+        Answers one HTTP request
+        """
+        try:
+            try:
+                request = await reader.readline()
+                method, target, _ = request.decode("latin-1").split(" ", 2)
+                while (await reader.readline()).strip():
+                    pass  # Headers are not used
+            except ValueError:
+                raise RequestError(400, "Malformed request")
+            if method != "GET":
+                raise RequestError(405, "Only GET is supported")
+            url = urlsplit(target)
+            query = {name: values[-1]
+                     for name, values in parse_qs(url.query).items()}
+            status, kind, body = 200, *await self._route(url.path, query)
+        except RequestError as e:
+            status, kind, body = e.status, "application/json", _json(
+                {"error": e.msg})
+        except Exception as e:
+            status, kind, body = 500, "application/json", _json(
+                {"error": str(e)})
+
+        head = ("HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n"
+                "Connection: close\r\n\r\n").format(
+                    status, REASONS[status], kind, len(body))
+        try:
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass  # Client is gone
+        finally:
+            writer.close()
+
+    async def _route(self, path, query):
+        """
+        Content type and body of the answer to path with the query
+        parameters
+        """
+        if path == "/datasets":
+            return "application/json", _json([
+                {"file": key[0], "fmode": key[2], "max_gap": key[3],
+                 "rows": len(entry["dataset"])}
+                for key, entry in self.entries.items()])
+        if path not in ("/load", "/aggregate", "/statistics"):
+            raise RequestError(404, "Unknown path: {}".format(path))
+
+        if "file" not in query:
+            raise RequestError(400, "Missing parameter: file")
+        try:
+            max_gap = int(query["max_gap"]) if query.get("max_gap") else None
+        except ValueError:
+            raise RequestError(400, "max_gap must be an integer")
+        try:
+            entry = await self.dataset(
+                query["file"], query.get("fmode", "forward fill"), max_gap)
+        except (FileNotFoundError, IsADirectoryError):
+            raise RequestError(404, "No such file: {}".format(query["file"]))
+        except FileExtensionError as e:
+            raise RequestError(400, e.msg)
+
+        dataset = entry["dataset"]
+        if path == "/load":
+            return "application/json", _json({
+                "rows": len(dataset), "zones": dataset.zones,
+                "first": (_time(dataset.minutes[:1]) or [None])[0],
+                "last": (_time(dataset.minutes[-1:]) or [None])[0],
+                "warning": entry["warning"]})
+
+        period = query.get("period", "minute").lower()
+        if period not in PERIODS:
+            raise RequestError(400, "Unknown period: {}".format(period))
+        try:
+            start, end = [np.datetime64(query[name], "m") if query.get(name)
+                          else None for name in ("start", "end")]
+        except ValueError:
+            raise RequestError(400, "Dates must be ISO 8601")
+        result = await self.aggregate(entry, period, start, end)
+
+        if path == "/statistics":
+            if len(result) == 0:
+                raise RequestError(404, "No measurements in the range")
+            try:
+                stats = parse_statistics(query.get(
+                    "stats", ",".join(STATISTICS)).split(","))
+            except ValueError as e:
+                raise RequestError(400, str(e))
+            stat = await self._run(print_statistics, None, result.data,
+                                   stats)
+            return "application/json", _json({
+                "period": period, "columns": list(stat.columns),
+                "index": [str(zone) for zone in stat.index],
+                "values": _values(stat.to_numpy(dtype=np.float64))})
+
+        if query.get("format", "json") == "npz":
+            buffer = io.BytesIO()
+            np.savez(buffer, minutes=result.minutes, values=result.values,
+                     zones=np.array(result.zones))
+            return "application/octet-stream", buffer.getvalue()
+        return "application/json", _json({
+            "period": period, "zones": result.zones,
+            "time": _time(result.minutes, period == "hour of the day"),
+            "values": _values(result.values)})
+
+
+def _json(obj):
+    """
+    UTF-8 JSON of obj
+    """
+    return json.dumps(obj).encode()
+
+
+def _values(values):
+    """
+    Nested lists of a float array with NaN as None, which is null in JSON
+    """
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _time(minutes, of_day=False):
+    """
+    ISO 8601 strings of minutes since 1970, or minutes of the day as
+    "HH:MM"
+    """
+    if of_day:
+        return ["{:02d}:{:02d}".format(m // 60, m % 60) for m in
+                minutes.tolist()]
+    return np.datetime_as_string(minutes.astype("datetime64[m]")).tolist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serves loaded measurements over a local HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-datasets", type=int, default=4)
+    args = parser.parse_args()
+    print("Serving on http://{}:{}".format(args.host, args.port))
+    try:
+        asyncio.run(MeasurementServer(args.max_datasets).serve(
+            args.host, args.port))
+    except KeyboardInterrupt:
+        pass
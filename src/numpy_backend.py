@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Implementation of load_measurements, aggregate_measurements and
+print_statistics with numpy only. pandas is never imported, which makes the
+start-up faster and the memory use smaller, i.e. for scripts and kiosks.
+tvec and data are arrays instead of dataFrames and the statistics are a
+structured array. Select it with get_backend("numpy"), see backend.
+"""
+import io
+
+import numpy as np
+
+from src.compute_statistics import compute_statistics, STATISTICS
+from src.open_measurements import open_measurements
+from src.repair_measurements import repair_measurements, NAMES
+from src.sniff_measurements import sniff_measurements, SchemaError
+from src.timestamps import bucket_codes, minutes_to_tvec, tvec_to_minutes
+
+
+def load_measurements(filename, fmode, report=False, max_gap=None):
+    """
+    Same as load_measurements of the pandas backend, but the file is parsed
+    with np.loadtxt and tvec and data are arrays. Files with time stamps
+    instead of time vectors need the pandas backend
+
+    OUTPUT:
+        tvec: N x 6 int64 array where each row is a time vector
+        data: N x 4 float array where each row is a set of measurements
+        warning: String, warning message
+        quality: dictionary with the data quality report, see data_quality
+            (only if report is True)
+
+    USAGE:
+        tvec, data, warning = load_measurements(filename, fmode)
+    """
+    schema = sniff_measurements(filename)
+    if schema["layout"] != "vector":
+        raise SchemaError("Files with time stamps need the pandas backend")
+    converters = _decimal_comma if schema["decimal"] == "," else None
+
+    with open_measurements(filename) as (stream, raw):
+        text = io.TextIOWrapper(stream, encoding="latin-1")
+        values = np.loadtxt(text, delimiter=schema["delimiter"],
+                            skiprows=schema["header"], converters=converters,
+                            dtype=np.float64, ndmin=2)
+    values = values.reshape(-1, len(NAMES))
+
+    values, minutes, warning, quality = repair_measurements(
+        values, fmode, max_gap)
+    tvec = values[:, 0:6].astype(np.int64)
+    data = np.ascontiguousarray(values[:, 6:10])
+
+    if report:
+        return tvec, data, warning, quality
+    return tvec, data, warning
+
+
+def _decimal_comma(field):
+    """
+    A number with a decimal comma
+    """
+    return float(field.replace(",", "."))
+
+
+def aggregate_measurements(tvec, data, period):
+    """
+    Same as aggregate_measurements of the pandas backend, with arrays. Every
+    bucket is summed by one bincount over all zones
+
+    OUTPUT:
+        tvec_a: N x 5 int64 array with the first time vector of every
+            bucket, or N x 1 array of hours for "hour of the day"
+        data_a: N x Z float array with the sums of every bucket, or the
+            averages for "hour of the day"
+
+    USAGE:
+        tvec_a, data_a = aggregate_measurements(tvec, data, "day")
+    """
+    period = period.lower()
+    if period == "minute":
+        return tvec, data
+
+    minutes = tvec_to_minutes(tvec)
+    values = np.asarray(data, dtype=np.float64)
+    if period == "hour of the day":
+        codes = minutes % 1440 // 60
+    else:
+        codes = bucket_codes(minutes, period)
+    buckets, first, inverse = np.unique(codes, return_index=True,
+                                        return_inverse=True)
+
+    nzones = values.shape[1]
+    index = (inverse.ravel()[:, None] * nzones + np.arange(nzones)).ravel()
+    sums = np.bincount(index, weights=values.ravel(),
+                       minlength=len(buckets) * nzones).reshape(-1, nzones)
+
+    if period == "hour of the day":
+        counts = np.bincount(inverse.ravel(), minlength=len(buckets))
+        return buckets, sums / counts[:, None]
+    return minutes_to_tvec(minutes[first])[:, 0:5], sums
+
+
+def print_statistics(tvec, data, stats=STATISTICS):
+    """
+    Same as print_statistics of the pandas backend, see compute_statistics
+
+    OUTPUT:
+        stat: structured array with the fields "Zone" and stats, one row
+            for every zone and a row "All" for the sum of all zones
+
+    USAGE:
+        stat = print_statistics(tvec, data)
+        stat[stat["Zone"] == "All"]["max"]
+    """
+    table = compute_statistics(data, stats)
+
+    dtype = [("Zone", "U8")] + [(name, np.float64) for name in stats]
+    stat = np.zeros(len(table), dtype=dtype)
+    stat["Zone"] = [str(z + 1) for z in range(len(table) - 1)] + ["All"]
+    for n, name in enumerate(stats):
+        stat[name] = table[:, n]
+    return stat
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import bz2
+import contextlib
+import gzip
+import lzma
+import os
+import zipfile
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+# First bytes of every supported compressed format
+MAGIC = {"gzip": b"\x1f\x8b", "bz2": b"BZh", "xz": b"\xfd7zXZ\x00",
+         "zip": b"PK\x03\x04"}
+
+# Extension of every supported compressed format
+EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zip": "zip"}
+
+
+class FileExtensionError(Exception):
+    """
+    Custom exception that displays an error message 'msg' when called
+    """
+
+    def __init__(self, msg):
+        self.msg = msg
+
+
+def check_file(filename):
+    """
+    Checks that a file is a .csv file, possibly compressed, from its name and
+    first bytes only, so a wrong file fails before any parsing. The
+    compression is found from the magic bytes and has to agree with the
+    extension
+
+    INPUT:
+        filename: String, the full name of the datafile
+
+    OUTPUT:
+        compression: String, one of MAGIC, or None for a plain file
+
+    USAGE:
+        compression = check_file("data.csv.gz")  # "gzip"
+    """
+    with open(filename, "rb") as f:
+        head = f.read(6)
+    compression = None
+    for name, magic in MAGIC.items():
+        if head.startswith(magic):
+            compression = name
+
+    extension = EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+    if extension is not None and extension != compression:
+        raise FileExtensionError(
+            "The file is not a valid {} file".format(extension))
+    if compression != "zip" and ".csv" not in filename.lower():
+        raise FileExtensionError("Wrong file extension, please try again")
+    return compression
+
+
+@contextlib.contextmanager
+def open_measurements(filename):
+    """
+    Opens a .csv file for reading, decompressing .gz, .bz2, .xz and .zip
+    files while they are read. gzip is decompressed in a separate thread if
+    python-isal is installed. A .zip file must contain exactly one .csv file
+
+    INPUT:
+        filename: String, the full name of the datafile or a file:// URL
+
+    OUTPUT:
+        stream: binary file object with the .csv text
+        raw: the file object of the file on disk, raw.tell() is how much of
+            the file has been read
+
+    USAGE:
+        with open_measurements("data.csv.xz") as (stream, raw):
+            df = pd.read_csv(stream, header=None)
+    """
+    if filename.startswith("file:"):
+        filename = url2pathname(urlparse(filename).path)
+    compression = check_file(filename)
+
+    with open(filename, "rb") as raw:
+        if compression is None:
+            yield raw, raw
+            return
+
+        stream = _decompress(raw, compression)
+        try:
+            yield stream, raw
+        finally:
+            stream.close()
+
+
+def _decompress(raw, compression):
+    """
+    Streaming decompressor of raw
+    """
+    if compression == "gzip":
+        try:
+            # Optional, decompresses in a separate thread
+            from isal import igzip_threaded
+        except ImportError:
+            return gzip.GzipFile(fileobj=raw)
+        return igzip_threaded.open(raw, "rb")
+    if compression == "bz2":
+        return bz2.BZ2File(raw)
+    if compression == "xz":
+        return lzma.LZMAFile(raw)
+
+    archive = zipfile.ZipFile(raw)
+    members = [name for name in archive.namelist()
+               if name.lower().endswith(".csv")]
+    if len(members) != 1:
+        raise FileExtensionError(
+            "The .zip file must contain exactly one .csv file")
+    return archive.open(members[0])
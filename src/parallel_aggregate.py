@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.aggregate_measurements import aggregate_dataset
+from src.dataset import Dataset
+from src.timezones import localize_minutes, utc_offsets
+
+
+def parallel_aggregate(dataset, period, workers=None, min_rows=1000000):
+    """
+    Aggregates a Dataset in a process pool, same as aggregate_dataset, see
+    ParallelAggregator. The data is copied into shared memory and the pool
+    is started for this one aggregation, so a dataset that is aggregated
+    more than once should be kept in a ParallelAggregator instead
+
+    INPUT:
+        dataset: Dataset with non-aggregated data
+        period: String, see aggregate_measurements
+        workers: Integer, number of processes. Default is the number of
+            CPUs
+        min_rows: Integer, fewest rows aggregated in parallel
+
+    OUTPUT:
+        dataset_a: Dataset with the aggregated data, see aggregate_dataset
+
+    USAGE:
+        dataset_a = parallel_aggregate(dataset, "day", workers=8)
+    """
+    with ParallelAggregator(dataset, workers, min_rows) as aggregator:
+        return aggregator.aggregate(period)
+
+
+class ParallelAggregator():
+    """
+    Aggregates one Dataset in a process pool, same as aggregate_dataset.
+    The rows are split into one time shard per worker, cut at bucket
+    boundaries so no bucket is split, and every shard is aggregated in its
+    own process. The results are concatenated, so they are the same as the
+    serial ones. For "hour of the day" every shard returns the sums and
+    counts of every hour, which are added together before the averages are
+    taken.
+
+    The minutes and values are copied into shared memory once, the first
+    time the dataset is aggregated in parallel, and the pool is only
+    started then. Every later aggregation, of all rows or of a range of
+    them, reads the same shared memory, so the data is never copied or
+    pickled again. Only the aggregated shards are sent back. close() frees
+    the shared memory and stops the pool.
+
+    Datasets that are not sorted by time, ranges of less than min_rows
+    rows, and one worker are aggregated serially, without shared memory.
+
+    INPUT:
+        dataset: Dataset with non-aggregated data. It must not be changed
+            while the aggregator is open
+        workers: Integer, number of processes. Default is the number of
+            CPUs
+        min_rows: Integer, fewest rows aggregated in parallel
+
+    USAGE:
+        with ParallelAggregator(dataset, workers=8) as aggregator:
+            days = aggregator.aggregate("day")
+            hours = aggregator.aggregate("hour", i, j)
+    """
+
+    def __init__(self, dataset, workers=None, min_rows=1000000):
+        self.dataset = dataset
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = max(min_rows, 1)
+        self.sorted = not (np.diff(dataset.minutes) < 0).any()
+        self.blocks = []
+        self.arrays = None
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def aggregate(self, period, i=0, j=None):
+        """
+        Aggregates rows i to j-1 of the dataset, all rows by default
+
+        INPUT:
+            period: String, see aggregate_measurements
+            i, j: Integer, the range of rows
+
+        OUTPUT:
+            dataset_a: Dataset with the aggregated data, see
+                aggregate_dataset
+        """
+        period = period.lower()
+        dataset = self.dataset
+        j = len(dataset) if j is None else j
+        if (period == "minute" or self.workers < 2 or not self.sorted or
+                j - i < self.min_rows):
+            return aggregate_dataset(dataset.take(i, j), period)
+
+        if self.pool is None:
+            self._start()
+        bounds = [i + b for b in _shard_bounds(
+            dataset.minutes[i:j], period, self.workers, dataset.tz)]
+        count = len(bounds) - 1
+        shards = list(self.pool.map(
+            _aggregate_shard, [self.arrays] * count, bounds[:-1], bounds[1:],
+            [period] * count, [dataset.tz] * count))
+
+        if period == "hour of the day":
+            sums = sum(shard[0] for shard in shards)
+            counts = sum(shard[1] for shard in shards)
+            hours = np.flatnonzero(counts)  # Hours without any measurements
+            return Dataset(hours * 60, sums[hours] / counts[hours, None],
+                           dataset.zones, period)
+
+        return Dataset(np.concatenate([shard[0] for shard in shards]),
+                       np.concatenate([shard[1] for shard in shards]),
+                       dataset.zones, period, dataset.tz)
+
+    def close(self):
+        """
+        Stops the pool and frees the shared memory
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks, self.arrays = [], None
+
+    def _start(self):
+        """
+        Copies the minutes and values into shared memory and starts the pool
+        """
+        arrays = (self.dataset.minutes, self.dataset.values)
+        self.blocks = [_share(array) for array in arrays]
+        self.arrays = [(block.name, array.shape, array.dtype.str)
+                       for block, array in zip(self.blocks, arrays)]
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+
+def _shard_bounds(minutes, period, shards, tz=None):
+    """
+    Rows where the shards start, moved back to the first row of the bucket
+    they fall in, and the number of rows at the end
+    """
+    n = len(minutes)
+    targets = minutes[np.arange(1, shards) * n // shards]
+    if period == "hour of the day":
+        bounds = np.searchsorted(minutes, targets)
+    elif tz is None:
+        bounds = np.searchsorted(minutes, _bucket_start(targets, period))
+    elif period == "hour":
+        # Local hours start at the same minute past every UTC hour
+        shift = utc_offsets(targets, tz) % 60
+        bounds = np.searchsorted(
+            minutes, (targets + shift) // 60 * 60 - shift)
+    else:
+        # Local midnights are never in the repeated hour
+        local = _bucket_start(targets + utc_offsets(targets, tz), period)
+        bounds = np.searchsorted(
+            minutes, localize_minutes(local, tz, "dst")[0])
+    return np.unique(np.r_[0, bounds, n]).tolist()
+
+
+def _bucket_start(minutes, period):
+    """
+    First minute of the hour, day or month of every timestamp
+    """
+    if period == "hour":
+        return minutes // 60 * 60
+    if period == "day":
+        return minutes // 1440 * 1440
+    if period == "month":
+        return (minutes // 1440).astype('datetime64[D]').astype(
+            'datetime64[M]').astype('datetime64[m]').astype(np.int64)
+    raise ValueError("Unknown period: {}".format(period))
+
+
+def _share(array):
+    """
+    Copy of array in a new block of shared memory
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block
+
+
+def _aggregate_shard(arrays, i, j, period, tz):
+    """
+    Aggregates rows i to j-1 of the shared minutes and values in a worker
+    process
+    """
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in arrays]
+    views = [np.ndarray(shape, dtype, buffer=block.buf)[i:j]
+             for block, (_, shape, dtype) in zip(blocks, arrays)]
+    try:
+        return _reduce_shard(*views, period, tz)
+    finally:
+        # The views have to be gone before the shared memory is closed
+        del views
+        for block in blocks:
+            block.close()
+
+
+def _reduce_shard(minutes, values, period, tz):
+    """
+    Aggregated minutes and values of a shard, or the sums and counts of
+    every hour for "hour of the day"
+    """
+    if period == "hour of the day":
+        nzones = values.shape[1]
+        if tz is not None:
+            minutes = minutes + utc_offsets(minutes, tz)
+        hours = minutes % 1440 // 60
+        index = (hours[:, None] * nzones + np.arange(nzones)).ravel()
+        sums = np.bincount(index, weights=values.ravel(),
+                           minlength=24 * nzones).reshape(24, nzones)
+        return sums, np.bincount(hours, minlength=24)
+
+    # The shard holds whole buckets, so the serial reduction gives the same
+    # sums
+    result = aggregate_dataset(Dataset(minutes, values, tz=tz), period)
+    return result.minutes, result.values
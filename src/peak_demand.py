@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from src.range_index import with_total
+from src.timestamps import bucket_codes, tvec_to_minutes
+from src.timezones import to_local
+
+
+def peak_demand(tvec, data, top=3, minutes=None, tz=None):
+    """
+    Finds the top measurements of every month in every zone and in the sum
+    of all zones, i.e. the intervals that set the demand charge of a tariff.
+
+    All months are padded into one month x row x zone array, so a single
+    np.argpartition finds the top rows of all months and zones at once.
+    Only the top rows are sorted, never the whole month.
+
+    INPUT:
+        tvec: N x 6 matrix where each row is a time vector
+        data: N x Z matrix where each row is a set of measurements, sorted
+            by time
+        top: Integer, number of peaks of every month and zone
+        minutes: N x 1 array of minutes since 1970, i.e. Dataset.minutes.
+            If given, tvec is not used and can be None
+        tz: String, IANA time zone name of UTC minutes, i.e. Dataset.tz.
+            The months and times are then local, see bucket_codes
+
+    OUTPUT:
+        peaks: dataFrame with a row for every peak and the columns month,
+            zone ("All" for the sum of all zones), rank (1 is the largest),
+            time and demand, sorted by month, zone and rank
+
+    USAGE:
+        peaks = peak_demand(tvec, data, top=5)
+        peaks[peaks.zone == "All"]
+    """
+    values, zones = with_total(data), _zones(data)
+    if minutes is None:
+        minutes = tvec_to_minutes(tvec)
+    if len(values) == 0:
+        return pd.DataFrame(columns=["month", "zone", "rank", "time",
+                                     "demand"])
+
+    # Month and row within the month of every row
+    codes = bucket_codes(minutes, "month", tz)
+    starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+    lengths = np.diff(np.r_[starts, len(codes)])
+    month = np.repeat(np.arange(len(starts)), lengths)
+    offset = np.arange(len(codes)) - np.repeat(starts, lengths)
+
+    # Missing measurements and padding never make it to the top
+    longest = lengths.max()
+    padded = np.full((len(starts), longest, values.shape[1]), -np.inf)
+    padded[month, offset] = np.where(np.isnan(values), -np.inf, values)
+
+    k = min(top, longest)
+    rows = np.argpartition(padded, longest - k, axis=1)[:, longest - k:]
+    demand = np.take_along_axis(padded, rows, axis=1)
+    order = np.argsort(-demand, axis=1, kind="stable")
+    rows = np.take_along_axis(rows, order, axis=1)
+    demand = np.take_along_axis(demand, order, axis=1)
+
+    # One row of the result for every month, rank and zone
+    m, rank, zone = np.indices(demand.shape).reshape(3, -1)
+    demand, rows = demand.ravel(), rows.ravel()
+    found = demand > -np.inf
+    m, rank, zone = m[found], rank[found], zone[found]
+    time = minutes[starts[m] + rows[found]]
+    if tz is not None:
+        time = to_local(time, tz)
+    peaks = pd.DataFrame({
+        "month": codes[starts[m]].astype('datetime64[M]').astype(str),
+        "zone": np.asarray(zones, dtype=object)[zone],
+        "rank": rank + 1,
+        "time": time.astype('datetime64[m]'),
+        "demand": demand[found]})
+    return peaks.sort_values(["month", "zone", "rank"], kind="stable",
+                             key=_zone_order(zones)).reset_index(drop=True)
+
+
+def load_duration(tvec, data, bins=1000, points=101):
+    """
+    Computes the load-duration curve of every zone and of the sum of all
+    zones: the demand that is reached or exceeded for a given part of the
+    time. Instead of sorting the data, every zone is counted into bins
+    histogram bins with a single bincount for all zones. The curves are
+    interpolated between the bin edges, which for continuous measurements
+    is accurate to within one bin width, (max - min) / bins
+
+    INPUT:
+        tvec: N x 6 matrix where each row is a time vector (not used)
+        data: N x Z matrix where each row is a set of measurements
+        bins: Integer, number of histogram bins
+        points: Integer, number of points on the curves
+
+    OUTPUT:
+        curves: dataFrame indexed by the part of the time in percent from
+            0 to 100, with a column for every zone and "All". Missing
+            measurements are left out
+
+    USAGE:
+        curves = load_duration(tvec, data)
+        curves.plot()
+    """
+    values, zones = with_total(data), _zones(data)
+    ncols = values.shape[1]
+    present = ~np.isnan(values)
+    with np.errstate(invalid="ignore"):
+        low, high = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    width = np.where(high > low, (high - low) / bins, 1.0)
+
+    # Bin of every measurement, all zones in one bincount
+    with np.errstate(invalid="ignore"):
+        b = np.clip(((values - low) / width).astype(np.int64), 0, bins - 1)
+    index = (np.arange(ncols) * bins + b)[present]
+    counts = np.bincount(index, minlength=ncols * bins).reshape(ncols, bins)
+
+    # Part of the time at or above the lower edge of every bin
+    total = np.maximum(present.sum(axis=0), 1)[:, None]
+    exceeded = 100 * counts[:, ::-1].cumsum(axis=1)[:, ::-1] / total
+    edges = low[:, None] + width[:, None] * np.arange(bins)
+
+    percent = np.linspace(0, 100, points)
+    curves = np.full((points, ncols), np.nan)
+    for z in np.flatnonzero(present.any(axis=0)):
+        # Increasing x for np.interp, the maximum is exceeded 0% of the time
+        x = np.r_[0, exceeded[z, ::-1]]
+        y = np.r_[high[z], edges[z, ::-1]]
+        curves[:, z] = np.interp(percent, x, y)
+    return pd.DataFrame(curves, columns=zones, index=pd.Index(
+        percent, name="Time exceeded (%)"))
+
+
+def _zones(data):
+    """
+    Names of the columns of with_total(data)
+    """
+    zones = list(data.columns) if hasattr(data, "columns") else [
+        "zone{}".format(z + 1) for z in range(np.shape(data)[1])]
+    return zones + ["All"]
+
+
+def _zone_order(zones):
+    """
+    Sort key that keeps the zones in their original order
+    """
+    position = {zone: n for n, zone in enumerate(zones)}
+
+    def key(column):
+        if column.name == "zone":
+            return column.map(position)
+        return column
+    return key
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.aggregate_measurements import aggregate_dataset
+from src.dataset import Dataset
+from src.timestamps import bucket_codes
+
+# Levels from fine to coarse and the nominal minutes of their buckets
+LEVELS = ["minute", "hour", "day", "month"]
+LENGTHS = [1, 60, 1440, 43830]
+
+
+class PlotLevels():
+    """
+    Aggregation levels of a dataset for browsing it at any zoom. A view of a
+    time range is taken from the finest level that has at most max_points
+    buckets in the range, so a plot never gets more points than the screen
+    can show, whatever the length of the range.
+
+    Every level is aggregated once, when a view first needs it, and shared
+    with cache. Levels in cache, i.e. from ResultCache, are not aggregated
+    again. The averages are kept in cache too, under ("average", period),
+    so a DatasetManager can spill them. The views are the average
+    measurement per minute of every bucket, so they have the same scale on
+    every level and the plot does not jump when the level changes.
+
+    The data has to be sorted by time, see load_dataset
+
+    INPUT:
+        dataset: Dataset with non-aggregated data
+        cache: dictionary with an aggregated Dataset of all rows for some
+            periods, see LazyDataset, or a DatasetManager. Levels that are
+            aggregated are added
+        max_points: Integer, most buckets in a view
+
+    USAGE:
+        levels = PlotLevels(dataset, cache=pipeline.cache)
+        overview = levels.view(max_points=5000)
+        detail = levels.view(start, end)
+    """
+
+    def __init__(self, dataset, cache=None, max_points=2000):
+        self.dataset = dataset
+        self.cache = {} if cache is None else cache
+        self.max_points = max_points
+
+    def level(self, period):
+        """
+        Average measurement per minute of every bucket of a level, of all
+        rows
+        """
+        if period == "minute":
+            return self.dataset
+        key = ("average", period)
+        if key not in self.cache:
+            if period not in self.cache:
+                self.cache[period] = aggregate_dataset(self.dataset, period)
+            sums = self.cache[period]
+
+            # Number of minutes in every bucket, the buckets are sorted
+            codes = bucket_codes(self.dataset.minutes, period,
+                                 self.dataset.tz)
+            starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+            counts = np.diff(np.r_[starts, len(codes)])
+            self.cache[key] = Dataset(sums.minutes,
+                                      sums.values / counts[:, None],
+                                      sums.zones, period, sums.tz)
+        return self.cache[key]
+
+    def view(self, start=None, end=None, max_points=None):
+        """
+        The buckets of the range [start, end) from the finest level with at
+        most max_points of them. Coarser levels are estimated from the
+        length of their buckets, so they are only aggregated when used
+
+        INPUT:
+            start, end: Integer, UTC minutes since 1970, None for the first
+                or last measurement
+            max_points: Integer, default is self.max_points
+
+        OUTPUT:
+            dataset_v: Dataset with the average per minute of every bucket,
+                its period is the level
+        """
+        max_points = max_points or self.max_points
+        minutes = self.dataset.minutes
+        if len(minutes) == 0:
+            return self.dataset
+        start = minutes[0] if start is None else start
+        end = minutes[-1] + 1 if end is None else end
+
+        period = LEVELS[-1]
+        rows = np.searchsorted(minutes, [start, end])
+        if rows[1] - rows[0] <= max_points:
+            period = "minute"
+        else:
+            for name, length in zip(LEVELS[1:], LENGTHS[1:]):
+                if (end - start) / length <= max_points:
+                    period = name
+                    break
+
+        # Include the bucket that start falls in
+        level = self.level(period)
+        i = max(np.searchsorted(level.minutes, start, side="right") - 1, 0)
+        j = np.searchsorted(level.minutes, end)
+        return level.take(i, j)
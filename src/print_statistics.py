@@ -1,40 +1,39 @@
 # -*- coding: utf-8 -*-
-def print_statistics(tvec, data):
+import pandas as pd
+
+from src.compute_statistics import compute_statistics, STATISTICS
+
+
+def print_statistics(tvec, data, stats=STATISTICS):
     """
     ATTENTION: this function inputs 'tvec', because it is a criteria. Even though
         it is not actually being used...
 
     Displays some descriptive statistics and outputs them as a
-    table for the user to see
+    table for the user to see. The row 'All' has the statistics of the sum
+    of all zones, see compute_statistics
 
     INPUT:
         tvec: N x 6 matrix where each row is a time vector
         data: N x 4 matrix where each row is a set of measurements
+        stats: list of statistics, see compute_statistics. Default is the
+            minimum, quartiles and maximum
 
     OUTPUT:
         stat: dataFrame containing descriptive statistics of data matrix
 
     USAGE:
         stat = print_statistics(tvec,data)
+        stat = print_statistics(tvec,data,["mean","std","99%","load factor"])
 
     @Author: Simon Moe Sørensen, moe.simon@gmail.com
     """
-    # Define the relevant statistics
-    dStats = ['min', '25%', '50%', '75%', 'max']
-
-    # Get descriptive statistics of data, zone-wise
-    statzone = data.describe().T[dStats].rename(
-        index={'zone1': 1, 'zone2': 2, 'zone3': 3, 'zone4': 4})
-    # The line above computes the statistics, transposes it, while only selecting
-    # the relevant statistics. Then it renames the integers to zones
-
-    # Get descriptive statistics of all zones
-    statall = statzone.sum().describe().T[dStats].rename('All')
-    # The line above does practically the same, however it is a Series and
-    # has different renaming syntax than a dataFrame
-
-    # Add together in a table
-    stat = statzone.append(statall)
+    # Get descriptive statistics of every zone and of the sum of all zones
+    table = compute_statistics(data, stats)
+
+    # Zones are numbered from 1, the last row is the sum of all zones
+    zones = list(range(1, table.shape[0])) + ['All']
+    stat = pd.DataFrame(table, index=zones, columns=list(stats))
 
     # Assign index-column name
     stat.index.name = "Zone"
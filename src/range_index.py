@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+class RangeIndex():
+    """
+    Index over the measurements that answers range totals, means, minimums
+    and maximums without grouping the data. It is built once when the data
+    is loaded.
+
+    Sums and means use per-zone prefix sums, so they cost O(1).
+    Minimums and maximums use a segment tree over blocks of rows, so they
+    cost O(log N) plus at most two partial blocks. Using blocks as the
+    leaves keeps the tree small enough to build for tens of millions of rows.
+
+    The last column of every result is the sum of all zones ("All").
+
+    The index keeps a reference to the measurements instead of a copy, and
+    the prefix sums of "All" are the sum of the zone prefix sums. In live
+    mode the prefix sums grow in a buffer that doubles when full, and the
+    trees have room for a power of two of blocks, so adding rows only
+    computes the new rows and the tree nodes above them.
+
+    INPUT:
+        data: N x 4 matrix where each row is a set of measurements,
+            i.e. Dataset.values
+        block: Number of rows in each leaf of the segment tree
+
+    USAGE:
+        rindex = RangeIndex(data)
+        i, j = index.positions(start, end)  # from a TimeIndex
+        total = rindex.range_sum(i, j)
+    """
+
+    def __init__(self, data, block=256):
+        self.block = block
+        self.values = np.asarray(data, dtype=np.float64)
+
+        # Prefix sums with a leading row of zeros, so that the sum of
+        # rows i to j-1 is cumsum[j] - cumsum[i]
+        n, zones = self.values.shape
+        self._cumsum = np.zeros((n + 1, zones))
+        np.cumsum(self.values, axis=0, out=self._cumsum[1:])
+        self.cumsum = self._cumsum
+
+        self.capacity = 0  # Leaves the trees have room for
+        self.mintree = np.empty((0, zones + 1))
+        self.maxtree = np.empty((0, zones + 1))
+        self._build(0)
+
+    def extend(self, data):
+        """
+        Updates the index after rows have been added to the end of the
+        measurements, i.e. in live mode. Only the prefix sums, the leaves
+        and the tree nodes of the new rows are computed
+
+        INPUT:
+            data: (N + M) x 4 matrix with all measurements, where the last
+                M rows are new, i.e. from LiveBuffer
+        """
+        n = len(self.values)
+        self.values = np.asarray(data, dtype=np.float64)
+        m = len(self.values)
+        if m + 1 > len(self._cumsum):
+            grown = np.empty((max(2 * len(self._cumsum), m + 1),
+                              self._cumsum.shape[1]))
+            grown[:n + 1] = self._cumsum[:n + 1]
+            self._cumsum = grown
+        np.cumsum(self.values[n:], axis=0, out=self._cumsum[n + 1:m + 1])
+        self._cumsum[n + 1:m + 1] += self._cumsum[n]
+        self.cumsum = self._cumsum[:m + 1]
+        self._build(n // self.block)
+
+    def _build(self, first):
+        """
+        Computes the block leaves from block 'first' and up and updates the
+        minimum and maximum segment trees above them. The trees are only
+        built again when they are full
+        """
+        n = len(self.values)
+        block = self.block
+        self.nblocks = max(-(-n // block), 1)
+
+        # Block minimums and maximums are the leaves of the segment tree.
+        # Full blocks are reduced through a reshaped view, the last block
+        # can be partial
+        rows = self.values[first * block:]
+        full = len(rows) // block * block
+        blocks = rows[:full].reshape(-1, block, rows.shape[1])
+        totals = blocks.sum(axis=2)
+        mins = [np.column_stack([blocks.min(axis=1), totals.min(axis=1)])]
+        maxs = [np.column_stack([blocks.max(axis=1), totals.max(axis=1)])]
+        if full < len(rows) or len(self.values) == 0:
+            rest = with_total(rows[full:]) if full < len(rows) else np.zeros(
+                (1, rows.shape[1] + 1))
+            mins.append(rest.min(axis=0, keepdims=True))
+            maxs.append(rest.max(axis=0, keepdims=True))
+
+        mins, maxs = np.concatenate(mins), np.concatenate(maxs)
+
+        # When the trees are full they get room for the next power of two
+        # of leaves, the leaves before first are kept and all nodes above
+        # them are built again
+        a = first
+        if self.nblocks > self.capacity:
+            capacity = 1 << (self.nblocks - 1).bit_length()
+            self.mintree = _grow_tree(self.mintree, self.capacity, capacity,
+                                      first, np.inf)
+            self.maxtree = _grow_tree(self.maxtree, self.capacity, capacity,
+                                      first, -np.inf)
+            self.capacity = capacity
+            a = 0
+        b = self.capacity + first
+        self.mintree[b:b + len(mins)] = mins
+        self.maxtree[b:b + len(maxs)] = maxs
+        _update_tree(self.mintree, self.capacity + a, b + len(mins),
+                     np.minimum)
+        _update_tree(self.maxtree, self.capacity + a, b + len(maxs),
+                     np.maximum)
+
+    def __len__(self):
+        return len(self.values)
+
+    def range_sum(self, i, j):
+        """
+        Total of every zone over the rows i to j-1
+        """
+        total = self.cumsum[j] - self.cumsum[i]
+        return np.append(total, total.sum())
+
+    def range_mean(self, i, j):
+        """
+        Mean of every zone over the rows i to j-1
+        """
+        if j <= i:
+            return np.full(self.values.shape[1] + 1, np.nan)
+        return self.range_sum(i, j) / (j - i)
+
+    def range_min(self, i, j):
+        """
+        Minimum of every zone over the rows i to j-1
+        """
+        return self._query(i, j, self.mintree, np.minimum, np.inf)
+
+    def range_max(self, i, j):
+        """
+        Maximum of every zone over the rows i to j-1
+        """
+        return self._query(i, j, self.maxtree, np.maximum, -np.inf)
+
+    def range_stats(self, i, j):
+        """
+        All range statistics of the rows i to j-1
+
+        OUTPUT:
+            stats: dictionary with the keys 'sum', 'mean', 'min' and 'max',
+                each an array with a value per zone and one for all zones
+        """
+        return {'sum': self.range_sum(i, j),
+                'mean': self.range_mean(i, j),
+                'min': self.range_min(i, j),
+                'max': self.range_max(i, j)}
+
+    def _query(self, i, j, tree, func, empty):
+        result = np.full(self.values.shape[1] + 1, empty)
+        if j <= i:
+            return result
+
+        # Whole blocks covered by the range
+        bi = -(-i // self.block)
+        bj = j // self.block
+        if bi >= bj:
+            # The range is inside one or two blocks, just look at the rows
+            return func.reduce(with_total(self.values[i:j]), axis=0)
+
+        # Partial blocks at the edges
+        result = func(result, func.reduce(
+            with_total(self.values[i:bi * self.block]), axis=0,
+            initial=empty))
+        result = func(result, func.reduce(
+            with_total(self.values[bj * self.block:j]), axis=0,
+            initial=empty))
+
+        # Walk the segment tree bottom-up over the whole blocks
+        lo, hi = bi + self.capacity, bj + self.capacity
+        while lo < hi:
+            if lo & 1:
+                result = func(result, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                result = func(result, tree[hi])
+            lo //= 2
+            hi //= 2
+        return result
+
+
+def with_total(data):
+    """
+    Measurements as float64 with the sum of all zones as an extra column
+
+    INPUT:
+        data: N x Z array or dataFrame with the measurements
+
+    OUTPUT:
+        values: N x (Z + 1) float64 array, the last column is the sum
+
+    USAGE:
+        values = with_total(dataset.values)
+    """
+    values = np.asarray(data, dtype=np.float64)
+    return np.column_stack([values, values.sum(axis=1)])
+
+
+def _grow_tree(tree, old, capacity, keep, empty):
+    """
+    A segment tree with room for capacity leaves, with the first keep leaves
+    of tree, which has room for old leaves. The other leaves are empty
+    """
+    grown = np.full((2 * capacity, tree.shape[1]), empty)
+    grown[capacity:capacity + keep] = tree[old:old + keep]
+    return grown
+
+
+def _update_tree(tree, a, b, func):
+    """
+    Computes the nodes above the nodes a to b-1 of a bottom-up segment tree,
+    where node k covers its children 2k and 2k+1. The number of leaves is a
+    power of two, so every level is computed as one vectorized operation
+    """
+    while a > 1:
+        a, b = a // 2, (b - 1) // 2 + 1
+        tree[a:b] = func(tree[2 * a:2 * b:2], tree[2 * a + 1:2 * b:2])
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import matplotlib.dates as mdates
+import numpy as np
+
+# Plotting choices of the App
+CHOICES = ["All zones", "Each zone"]
+
+
+def render_plot(ax, dataset, choice="All zones", unit="Watt-hour",
+                title=None, shade=None, bars=None):
+    """
+    Plots the measurements of a Dataset on a matplotlib axes. This is the
+    plot of the App, but it only uses the axes and its figure and never
+    pyplot, so it works on any canvas, i.e. Agg for reports without a
+    screen. Less than 25 rows are plotted as bars labelled by month or hour,
+    more as a line with date ticks that adapt to zooming.
+
+    INPUT:
+        ax: matplotlib axes, cleared by the caller
+        dataset: Dataset to plot, its period decides the labels
+        choice: String, one of CHOICES. "All zones" plots the sum of all
+            zones, "Each zone" a bar or line for every zone
+        unit: String, label of the y-axis
+        title: String, default is "Electricity consumption per <period>"
+        shade: function that is called with ax after a line is plotted, i.e.
+            to shade anomalies
+        bars: Boolean, plot bars instead of a line. Default is bars for
+            less than 25 rows
+
+    OUTPUT:
+        ax: the axes
+
+    USAGE:
+        figure = Figure(figsize=(8, 4.5))
+        FigureCanvasAgg(figure)
+        render_plot(figure.add_subplot(1, 1, 1), dataset_a, "Each zone")
+        figure.savefig("day.png")
+    """
+    if choice not in CHOICES:
+        raise ValueError("Unknown plotting choice: {}".format(choice))
+    hourly = dataset.period == "hour of the day"
+    xLabel = "Hour of the day" if hourly else "Date"
+    xAxis = dataset.datetimes()
+
+    if choice == "All zones":
+        values = dataset.values.sum(axis=1)[:, None]
+        legends = ["Sum of all zones"]
+    else:
+        values = dataset.values
+        legends = list(dataset.zones)
+
+    if bars is None:
+        bars = len(values) < 25
+    if bars:
+        # Bars side by side on integer positions, labelled by month or hour
+        positions = np.arange(len(values))
+        width = 0.5 / values.shape[1]
+        handles = [ax.bar(positions + (n - (values.shape[1] - 1) / 2) *
+                          width, values[:, n], width)
+                   for n in range(values.shape[1])]
+        ax.set_xticks(positions)
+        ax.set_xticklabels(xAxis.strftime("%H:00" if hourly else "%b %Y"))
+    else:
+        handles = ax.plot(xAxis, values)
+
+        # Date ticks that adapt to zooming, in the time zone of the data
+        locator = mdates.AutoDateLocator(tz=dataset.tz)
+        formatter = mdates.AutoDateFormatter(locator, tz=dataset.tz)
+        formatter.scaled[365] = '%b\n%Y'  # Years
+        formatter.scaled[30] = '%b\n%Y'  # Months
+        formatter.scaled[1.0] = '%d. %b\n%Y'  # Days
+        formatter.scaled[1. / 24.] = '%H:00\n%d. %b %y'  # Hours
+        formatter.scaled[1. / (60. * 24.)] = '%H:%M\n%d. %b'  # Minutes
+        formatter.scaled[1. / (60 * 60 * 24)] = '%H:%M:%S\n%d. %b'  # Sec
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator(tz=dataset.tz))
+        ax.xaxis.set_minor_locator(locator)
+        ax.xaxis.set_major_formatter(formatter)
+
+        if shade is not None:
+            shade(ax)
+
+    ax.figure.autofmt_xdate()  # Rotate the date labels
+    ax.legend(handles, legends, loc=0)
+    ax.grid(True)
+    ax.set_title(title or "Electricity consumption per {}".format(
+        dataset.period))
+    ax.set_xlabel(xLabel)
+    ax.set_ylabel(unit)
+    return ax
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.data_quality import data_quality
+from src.fill_gaps import fill_gaps
+from src.timestamps import minutes_to_tvec, tvec_to_minutes
+from src.timezones import localize_minutes
+
+
+NAMES = ["year", "month", "day", "hour", "minute", "second",
+         "zone1", "zone2", "zone3", "zone4"]
+
+
+def repair_measurements(values, fmode, max_gap=None, tz=None,
+                        ambiguous="infer", nonexistent="shift"):
+    """
+    Handles the corrupted measurements (-1) of a parsed datafile in the mode
+    fmode, see load_measurements. Only numpy is used, so every loader
+    shares it no matter how the file was parsed.
+
+    If tz is given, the time grid of the data quality report is checked in
+    UTC, so the hours that are skipped or repeated when the clocks change
+    are not reported as missing or duplicate minutes. The minutes that are
+    returned are still local time
+
+    INPUT:
+        values: N x 10 float array with the time vectors and measurements.
+            It is changed in place
+        fmode: String, see load_measurements
+        max_gap: Integer, see load_measurements
+        tz: String, IANA time zone name of the time vectors. None for naive
+            local time
+        ambiguous, nonexistent: String, see localize_minutes
+
+    OUTPUT:
+        values: N x 10 float array with the time vectors and measurements
+        minutes: N x 1 array with the minutes of every row
+        warning: String, warning message (False if there is none)
+        quality: dictionary with the data quality report
+
+    USAGE:
+        values, minutes, warning, quality = repair_measurements(
+            values, "forward fill")
+    """
+    # Initial variables
+    warning = False
+    fmodeStr = ["forward fill", "backward fill", "drop",
+                "linear interpolation", "time interpolation"]
+    fmode = fmode.lower()
+    names = NAMES
+
+    # Find corrupted values (-1, or empty fields which are parsed as NaN)
+    # once. The mask is used both to replace them with NaN and for the data
+    # quality report
+    corrupt = (values == -1) | np.isnan(values)
+    corruptRows = corrupt.any(axis=1)
+
+    # Data quality report, timestamps are only taken from valid time rows.
+    # The minutes of every row are found on the time vectors in place, so
+    # they do not have to be copied to leave the corrupted rows out. Those
+    # get meaningless minutes, which are dropped
+    validTime = ~corrupt[:, 0:6].any(axis=1)
+    with np.errstate(invalid="ignore"):
+        minutes = tvec_to_minutes(values[:, 0:6])
+    if not validTime.all():
+        minutes = minutes[validTime]
+    values[corrupt] = np.nan
+    grid = minutes
+    if tz is not None:
+        grid, valid = localize_minutes(minutes, tz, ambiguous, nonexistent)
+        grid = grid[valid]
+    quality = data_quality(grid, corrupt[:, 6:10], names[6:10])
+    quality['rows'] = len(minutes)
+
+    # Check if first or last row is corrupted and compare to errorhandling mode
+    # if special case is found, change to drop mode and print warning
+    if len(values) and corruptRows[0] and fmode in fmodeStr[0]:
+        # Change to drop mode
+        fmodeold = fmode
+        fmode = "drop"
+        # Print warning
+        warning = True
+
+    elif len(values) and corruptRows[-1] and fmode in fmodeStr[1]:
+        # Change to drop mode
+        fmodeold = fmode
+        fmode = "drop"
+        # Print warning
+        warning = True
+
+    # Do errorhandling
+    if fmode in ["forward fill", "backward fill"]:
+        # Fill every column, gaps longer than max_gap are dropped
+        values, keep = fill_gaps(values, fmode, max_gap=max_gap)
+
+    elif fmode in fmodeStr[3:5]:
+        # Interpolation needs valid timestamps, so drop rows with a
+        # corrupted time first
+        if not validTime.all():
+            values, corrupt = values[validTime], corrupt[validTime]
+        values[:, 6:10], keep = fill_gaps(values[:, 6:10], fmode,
+                                          x=minutes, max_gap=max_gap)
+
+    elif fmode == "drop":
+        # Drop all rows with missing values
+        keep = ~corruptRows
+
+    else:
+        # Unknown mode, leave the corrupted measurements as NaN
+        keep = np.ones(len(values), dtype=bool)
+
+    # Remove rows that could not be filled
+    quality['repaired'] = int(corrupt[keep].sum())
+    quality['dropped'] = int(len(corruptRows) - keep.sum())
+    if not keep.all():
+        values = values[keep]
+
+    # Timestamps of the remaining rows. They only have to be computed
+    # again if some time vectors were corrupted
+    if validTime.all():
+        minutes = minutes[keep]
+    else:
+        minutes = tvec_to_minutes(values[:, 0:6])
+
+    # Print warning
+    if warning:
+        warning = ("""
+!WARNING!
+{} error
+dropping all corrupted rows""".format(fmodeold))
+
+    return values, minutes, warning, quality
+
+
+def repair_columns(minutes, values, bad, tvecs, fmode, max_gap=None,
+                   tz=None, ambiguous="infer", nonexistent="shift"):
+    """
+    Same as repair_measurements, for a file that has been parsed into the
+    minutes and the measurements of every row, see load_dataset. Only the
+    time vectors of the rows with a corrupted time are kept, so the N x 10
+    array is never needed. Where their corrupted fields are filled from
+    other rows, the time vectors of those rows are found from the minutes.
+
+    The measurements are filled in place, and the rows that are dropped are
+    removed in place too, so no copy of the measurements is made. The
+    minutes and measurements that are returned are views of the start of
+    the arrays that are given
+
+    INPUT:
+        minutes: N x 1 int64 array with the minutes of every row, not used
+            for the rows in bad
+        values: N x Z float array with the measurements, NaN for corrupted
+            ones. It is changed in place, and so are the minutes
+        bad: sorted positions of the rows with a corrupted time vector
+        tvecs: len(bad) x 6 float array with their time vectors, NaN for
+            corrupted fields
+        fmode, max_gap, tz, ambiguous, nonexistent: see repair_measurements
+
+    OUTPUT:
+        minutes: M x 1 int64 array with the minutes of the remaining rows
+        values: M x Z float array with their measurements
+        warning: String, warning message (False if there is none)
+        quality: dictionary with the data quality report
+
+    USAGE:
+        minutes, values, warning, quality = repair_columns(
+            minutes, values, bad, tvecs, "forward fill")
+    """
+    # Initial variables
+    warning = False
+    fmodeStr = ["forward fill", "backward fill", "drop",
+                "linear interpolation", "time interpolation"]
+    fmode = fmode.lower()
+    n = len(minutes)
+
+    # Corrupted measurements and time vectors
+    corrupt = np.isnan(values)
+    validTime = np.ones(n, dtype=bool)
+    validTime[bad] = False
+    corruptRows = corrupt.any(axis=1) | ~validTime
+    corruptTime = np.isnan(tvecs)
+
+    # Data quality report, timestamps are only taken from valid time rows
+    valid = minutes if len(bad) == 0 else minutes[validTime]
+    grid = valid
+    if tz is not None:
+        grid, keep = localize_minutes(valid, tz, ambiguous, nonexistent)
+        grid = grid[keep]
+    quality = data_quality(grid, corrupt, NAMES[6:10])
+    quality['rows'] = len(valid)
+    del valid, grid
+
+    # Check if first or last row is corrupted and compare to errorhandling mode
+    # if special case is found, change to drop mode and print warning
+    if n and corruptRows[0] and fmode in fmodeStr[0]:
+        fmodeold = fmode
+        fmode = "drop"
+        warning = True
+
+    elif n and corruptRows[-1] and fmode in fmodeStr[1]:
+        fmodeold = fmode
+        fmode = "drop"
+        warning = True
+
+    # Do errorhandling. repaired counts the corrupted time fields of the
+    # rows that are kept
+    if fmode in ["forward fill", "backward fill"]:
+        # Fill every column, gaps longer than max_gap are dropped
+        values, keep = fill_gaps(values, fmode, max_gap=max_gap)
+        if len(bad):
+            tvecs, filled = _fill_times(minutes, bad, tvecs, fmode, max_gap)
+            keep[bad] &= filled
+            minutes[bad[filled]] = tvec_to_minutes(tvecs[filled])
+        repaired = corruptTime[keep[bad]].sum()
+
+    elif fmode in fmodeStr[3:5]:
+        # Interpolation needs valid timestamps, so drop rows with a
+        # corrupted time first
+        if len(bad):
+            minutes = _compact(minutes, validTime)
+            values = _compact(values, validTime)
+            corrupt = corrupt[validTime]
+        values, keep = fill_gaps(values, fmode, x=minutes, max_gap=max_gap)
+        repaired = 0
+
+    elif fmode == "drop":
+        # Drop all rows with missing values
+        keep = ~corruptRows
+        repaired = 0
+
+    else:
+        # Unknown mode, leave the corrupted measurements as NaN
+        keep = np.ones(n, dtype=bool)
+        repaired = corruptTime.sum()
+
+    # Remove rows that could not be filled
+    quality['repaired'] = int(corrupt[keep].sum() + repaired)
+    quality['dropped'] = int(n - keep.sum())
+    if not keep.all():
+        minutes = _compact(minutes, keep)
+        values = _compact(values, keep)
+
+    # Print warning
+    if warning:
+        warning = ("""
+!WARNING!
+{} error
+dropping all corrupted rows""".format(fmodeold))
+
+    return minutes, values, warning, quality
+
+
+def _compact(array, keep, block=1 << 16):
+    """
+    The rows of array where keep is True, moved to the start of array block
+    by block, so only a block is copied at a time. The result is a view of
+    the start of array
+    """
+    n = 0
+    for i in range(0, len(array), block):
+        rows = array[i:i + block][keep[i:i + block]]
+        array[n:n + len(rows)] = rows
+        n += len(rows)
+    return array[:n]
+
+
+def _fill_times(minutes, bad, tvecs, fmode, max_gap):
+    """
+    The time vectors of the rows bad, filled like fill_gaps fills the N x 6
+    time vectors of all rows, and which of them could be filled. Every
+    other row has a valid time vector, so only the rows bad and the rows
+    right before and after them are needed. The seconds of those are not
+    known, but the minutes do not depend on them
+    """
+    near = np.union1d(bad, np.r_[bad - 1, bad + 1])
+    near = near[(near >= 0) & (near < len(minutes))]
+    rows = np.searchsorted(near, bad)
+    other = np.ones(len(near), dtype=bool)
+    other[rows] = False
+
+    times = np.zeros((len(near), 6))
+    times[other] = minutes_to_tvec(minutes[near[other]])
+    times[rows] = tvecs
+    times, keep = fill_gaps(times, fmode, max_gap=max_gap)
+    return times[rows], keep[rows]
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.aggregate_measurements import aggregate_dataset
+from src.dataset import Dataset
+from src.print_statistics import print_statistics
+
+# Aggregation levels that are cached, minute data is always loaded
+PERIODS = ["hour", "day", "month", "hour of the day"]
+
+# Change when the cached results are computed differently
+CACHE_VERSION = 4
+
+
+def file_key(filename, fmode, max_gap=None, chunksize=1 << 20, tz=None):
+    """
+    Cache key of a datafile loaded with fmode and max_gap. The key is a hash
+    of the content of the file, so a renamed or copied file gets the same
+    key and a changed file gets a new key
+
+    INPUT:
+        filename: String, the full name of the datafile
+        fmode: String, the fmode used by load_measurements
+        max_gap: Integer, the max_gap used by load_measurements
+        chunksize: Integer, bytes read at a time
+        tz: String, the time zone used by load_dataset
+
+    OUTPUT:
+        key: String, hexadecimal hash
+
+    USAGE:
+        key = file_key(filename, "forward fill")
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunksize), b""):
+            digest.update(chunk)
+    digest.update(repr((CACHE_VERSION, fmode.lower(), max_gap, tz)).encode())
+    return digest.hexdigest()
+
+
+def quick_key(filename, fmode, max_gap=None, size=1 << 20, tz=None):
+    """
+    Cache key of a datafile from its length and its first and last size
+    bytes only, so the cache can be looked up before the file is read.
+    A renamed or copied file gets the same key. A file that is changed
+    between its first and last bytes without changing its length keeps the
+    key, so the file_key of the entry has to be checked once the file has
+    been read
+
+    INPUT:
+        filename: String, the full name of the datafile
+        fmode, max_gap, tz: see file_key
+        size: Integer, bytes read at the start and the end
+
+    OUTPUT:
+        key: String, hexadecimal hash
+
+    USAGE:
+        key = quick_key(filename, "forward fill")
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as f:
+        length = os.fstat(f.fileno()).st_size
+        digest.update(f.read(size))
+        if length > size:
+            f.seek(max(length - size, size))
+            digest.update(f.read(size))
+    digest.update(repr((CACHE_VERSION, length, fmode.lower(), max_gap,
+                        tz)).encode())
+    return digest.hexdigest()
+
+
+def cache_results(dataset, warning=False, summary=""):
+    """
+    Computes the results that are cached for a loaded dataset: every
+    aggregation level of PERIODS and the statistics of the minute data and
+    of every level, all in Watt-hour
+
+    INPUT:
+        dataset: Dataset with non-aggregated data, see load_dataset
+        warning: String, the warning given when loading (False if none)
+        summary: String, the data quality summary, see quality_summary
+
+    OUTPUT:
+        results: dictionary with
+            "periods": dictionary with a Dataset for every period
+            "stats": dictionary with a statistics dataFrame for every
+                period and "minute", see print_statistics
+            "rows", "first", "last": number of rows and first and last
+                minute of the dataset
+            "zones", "warning", "summary", "tz"
+            "content": file_key of the file, None until it is set by the
+                caller
+    """
+    periods = {period: aggregate_dataset(dataset, period)
+               for period in PERIODS}
+    stats = {period: print_statistics(None, periods[period].data)
+             for period in PERIODS}
+    stats["minute"] = print_statistics(None, dataset.data)
+
+    return {"periods": periods, "stats": stats, "rows": len(dataset),
+            "first": int(dataset.minutes[0]), "last": int(dataset.minutes[-1]),
+            "zones": dataset.zones, "warning": warning, "summary": summary,
+            "tz": dataset.tz, "content": None}
+
+
+class ResultCache():
+    """
+    On-disk cache of the results from cache_results, so a file that has
+    been analyzed before shows its aggregations and statistics right away.
+    Every entry is one .npz file named by its key, i.e. the quick_key of
+    the file, and holds the file_key of the file that was analyzed. The
+    oldest entries are removed when there are more than max_entries
+
+    INPUT:
+        folder: String, the cache folder. Default is
+            ~/.cache/electricity-analysis
+        max_entries: Integer, the maximum number of cached files
+
+    USAGE:
+        cache = ResultCache()
+        key = quick_key(filename, fmode)
+        results = cache.get(key)  # None if not cached
+        content = file_key(filename, fmode)
+        if results is None or results["content"] != content:
+            results = dict(cache_results(dataset), content=content)
+            cache.put(key, results)
+    """
+
+    def __init__(self, folder=None, max_entries=20):
+        if folder is None:
+            folder = os.path.join(os.path.expanduser("~"), ".cache",
+                                  "electricity-analysis")
+        self.folder = folder
+        self.max_entries = max_entries
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + ".npz")
+
+    def get(self, key):
+        """
+        The cached results of key, or None if there are none or they cannot
+        be read
+
+        OUTPUT:
+            results: dictionary, see cache_results
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                meta = json.loads(str(npz["meta"]))
+                periods = {}
+                stats = {}
+                for n, period in enumerate(PERIODS):
+                    periods[period] = Dataset(
+                        npz["minutes{}".format(n)], npz["values{}".format(n)],
+                        meta["zones"], period,
+                        None if period == "hour of the day" else meta["tz"])
+                for n, period in enumerate(PERIODS + ["minute"]):
+                    stat = pd.DataFrame(npz["stat{}".format(n)],
+                                        index=meta["statIndex"],
+                                        columns=meta["statColumns"])
+                    stat.index.name = "Zone"
+                    stats[period] = stat
+        except (OSError, KeyError, ValueError):
+            # Damaged or old entry, it is replaced on the next put
+            return None
+
+        # Mark as recently used
+        os.utime(path)
+        return {"periods": periods, "stats": stats, "rows": meta["rows"],
+                "first": meta["first"], "last": meta["last"],
+                "zones": meta["zones"], "warning": meta["warning"],
+                "summary": meta["summary"], "tz": meta["tz"],
+                "content": meta.get("content")}
+
+    def put(self, key, results):
+        """
+        Stores results under key
+
+        INPUT:
+            key: String, see quick_key
+            results: dictionary, see cache_results
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        stat = results["stats"]["minute"]
+        meta = {"rows": results["rows"], "first": results["first"],
+                "last": results["last"], "zones": results["zones"],
+                "warning": results["warning"], "summary": results["summary"],
+                "tz": results["tz"], "content": results["content"],
+                "statIndex": [str(i) for i in stat.index],
+                "statColumns": list(stat.columns)}
+
+        arrays = {"meta": np.array(json.dumps(meta))}
+        for n, period in enumerate(PERIODS):
+            arrays["minutes{}".format(n)] = results["periods"][period].minutes
+            arrays["values{}".format(n)] = results["periods"][period].values
+        for n, period in enumerate(PERIODS + ["minute"]):
+            arrays["stat{}".format(n)] = results["stats"][period].to_numpy(
+                dtype=np.float64)
+
+        # Write to a temporary file first, so a half written entry is never
+        # read by another session
+        path = self._path(key)
+        temp = path + ".tmp.npz"
+        np.savez(temp, **arrays)
+        os.replace(temp, path)
+        self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used entries above max_entries
+        """
+        entries = [os.path.join(self.folder, name)
+                   for name in os.listdir(self.folder)
+                   if name.endswith(".npz") and ".tmp" not in name]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[self.max_entries:]:
+            os.remove(path)
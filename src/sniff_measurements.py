@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import math
+import os
+from datetime import datetime
+
+from src.open_measurements import open_measurements, FileExtensionError
+
+# Delimiter and decimal separator pairs, in the order they are tried
+DIALECTS = [(",", "."), (";", ","), (";", "."), ("\t", "."), ("\t", ","),
+            ("|", "."), ("|", ",")]
+
+# Layouts of the time: a time vector in six columns, or a time stamp in one
+# column or as a date and a time column
+LAYOUTS = {10: "vector", 5: "timestamp", 6: "date and time"}
+
+# Time stamp formats, in the order they are tried. Day first is tried
+# before month first
+FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S",
+           "%Y-%m-%dT%H:%M", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M",
+           "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d-%m-%Y %H:%M:%S",
+           "%d-%m-%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M",
+           "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M"]
+
+# Valid range of every column of a time vector
+RANGES = [(1900, 2200), (1, 12), (1, 31), (0, 23), (0, 59), (0, 60)]
+
+# Most header lines before the measurements
+MAX_HEADER = 5
+
+
+class SchemaError(FileExtensionError):
+    """
+    The file is not a measurement file that can be parsed, see
+    sniff_measurements
+    """
+
+
+def sniff_measurements(filename, size=4096):
+    """
+    Finds how a measurement file is laid out from its first and last size
+    bytes only, so a malformed file is rejected in milliseconds instead of
+    after parsing all of it. Compressed files are only sampled at the start.
+    Found are:
+        header: number of lines before the measurements, i.e. column names
+        delimiter: ",", ";", tab or "|"
+        decimal: "." or ","
+        layout: "vector" for the year, month, day, hour, minute and second
+            in six columns, "timestamp" for one time stamp column or
+            "date and time" for a date column and a time column, followed by
+            the four zones
+        format: strftime format of the time stamps, None for "vector"
+
+    Every sampled line after the header has to have the same number of
+    columns, numbers in the zones and valid times, otherwise SchemaError
+    is raised with the first line that is wrong.
+
+    INPUT:
+        filename: String, the full name of the datafile
+        size: Integer, bytes sampled at the start and the end
+
+    OUTPUT:
+        schema: dictionary with the header, delimiter, decimal, layout and
+            format, see load_measurements.parse_measurements
+
+    USAGE:
+        schema = sniff_measurements("meter.csv")
+        schema["delimiter"]  # ";"
+    """
+    head, tail = _sample(filename, size)
+    if b"\x00" in head or b"\x00" in tail:
+        raise SchemaError("The file is not a text file")
+    head = [line.strip() for line in head.decode("latin-1").splitlines()]
+    tail = [line.strip() for line in tail.decode("latin-1").splitlines()]
+    head, tail = [line for line in head if line], [line for line in tail
+                                                   if line]
+    if not head:
+        raise SchemaError("The file is empty")
+
+    # The first dialect where every line after a short header is valid
+    errors = []
+    for delimiter, decimal in DIALECTS:
+        schema, error = _match(head, tail, delimiter, decimal)
+        if schema is not None:
+            return schema
+        errors.append(error)
+
+    # Report the dialect that got furthest into the file, the first one if
+    # none did
+    raise SchemaError(max(errors, key=lambda error: error[0])[1])
+
+
+def _sample(filename, size):
+    """
+    The first and last size bytes of the file, cut at whole lines. The end
+    is only sampled in plain files, where it can be found without reading
+    the rest
+    """
+    with open_measurements(filename) as (stream, raw):
+        head = stream.read(size)
+        complete = len(head) < size or not stream.read(1)
+        if not complete:
+            head = head[:head.rfind(b"\n") + 1]
+        tail = b""
+        if not complete and stream is raw:
+            length = os.fstat(raw.fileno()).st_size
+            raw.seek(max(length - size, len(head)))
+            tail = raw.read(size)
+            tail = tail[tail.find(b"\n") + 1:]
+    return head, tail
+
+
+def _match(head, tail, delimiter, decimal):
+    """
+    The schema if every line after a header of at most MAX_HEADER lines is
+    valid in the dialect, otherwise None and (valid lines, error message)
+    """
+    header, error = 0, None
+    while header <= min(MAX_HEADER, len(head) - 1):
+        lines = head[header:] + tail
+        columns = len(lines[0].split(delimiter))
+        layout = LAYOUTS.get(columns)
+        if layout is None:
+            error = error or (0, "Line {}: expected 10, 5 or 6 columns, "
+                              "found {}".format(header + 1, columns))
+            header += 1
+            continue
+        rows = [line.split(delimiter) for line in lines]
+        fmt = None
+        if layout != "vector":
+            fmt = _format([row[0:columns - 4] for row in rows])
+            if fmt is None:
+                error = error or (0, "Line {}: unknown time stamp {}".format(
+                    header + 1, " ".join(rows[0][0:columns - 4])))
+                header += 1
+                continue
+
+        for n, row in enumerate(rows):
+            wrong = _check(row, columns, layout, decimal)
+            if wrong:
+                where = "Line {}".format(header + n + 1) if \
+                    n < len(head) - header else "Near the end"
+                if error is None or n > error[0]:
+                    error = (n, "{}: {}".format(where, wrong))
+                # Only a header that includes the wrong line can help
+                header += n + 1
+                break
+        else:
+            return {"header": header, "delimiter": delimiter,
+                    "decimal": decimal, "layout": layout, "format": fmt}, None
+    return None, error
+
+
+def _check(row, columns, layout, decimal):
+    """
+    What is wrong with a split line, or None. Empty fields and -1 are
+    corrupted measurements, which are valid
+    """
+    if len(row) != columns:
+        return "expected {} columns, found {}".format(columns, len(row))
+    numbers = []
+    for field in (row if layout == "vector" else row[columns - 4:]):
+        text = field.strip()
+        # A decimal point is not read with decimal comma, so "1.5" must not
+        # pass as a number when "," is tried first
+        if decimal == "," and "." in text:
+            return "{} does not have a decimal comma".format(text)
+        try:
+            numbers.append(float((text.replace(",", ".") if decimal == ","
+                                  else text) or "nan"))
+        except ValueError:
+            return "{} is not a number".format(text)
+    if layout == "vector":
+        for value, (low, high) in zip(numbers[0:6], RANGES):
+            if value != -1 and not math.isnan(value) and \
+                    not low <= value <= high:
+                return "{} is not a valid time vector".format(
+                    ",".join(row[0:6]))
+    return None
+
+
+def _format(stamps):
+    """
+    The first of FORMATS that reads all time stamps, given as the list of
+    their time columns. Corrupted ones, with an empty or -1 column, are left
+    out
+    """
+    stamps = [" ".join(field.strip() for field in stamp) for stamp in stamps
+              if all(field.strip() not in ("", "-1") for field in stamp)]
+    for fmt in FORMATS:
+        try:
+            for stamp in stamps:
+                datetime.strptime(stamp, fmt)
+        except ValueError:
+            continue
+        return fmt
+    return None
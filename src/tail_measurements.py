@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import Dataset
+from src.fill_gaps import fill_gaps
+from src.load_measurements import parse_measurements
+from src.repair_measurements import NAMES
+from src.sniff_measurements import sniff_measurements
+from src.timestamps import tvec_to_minutes
+
+
+class TailReader():
+    """
+    Follows a .csv file that a data logger keeps appending to. Every call to
+    read parses only the bytes appended since the last call and handles
+    corrupted measurements with the same fmode rules as load_measurements.
+
+    Rows that cannot be filled yet, i.e. a corrupted measurement at the end
+    of the file in backward fill, are held back until the next valid
+    measurement arrives.
+
+    INPUT:
+        filename: String, the full name of the datafile
+        fmode: String, the fmode used by load_measurements
+        tvec: N x 6 dataFrame that has already been loaded
+        data: N x 4 dataFrame that has already been loaded
+        offset: Integer, number of bytes that have already been loaded.
+            None to start at the current end of the file
+        max_gap: Integer, same as in load_measurements
+        schema: dictionary, the layout of the file found when it was
+            loaded, see sniff_measurements. None to find it, but the end of
+            a file that is being written can be a half written line
+
+    USAGE:
+        reader = TailReader(filename, fmode, tvec, data)
+        new = reader.read()  # None if nothing new
+        if new is not None:
+            tvec_new, data_new = new
+    """
+
+    def __init__(self, filename, fmode, tvec, data, offset=None,
+                 max_gap=None, schema=None):
+        self.filename = filename
+        self.fmode = fmode.lower()
+        self.max_gap = max_gap
+        self.offset = os.path.getsize(filename) if offset is None else offset
+        self.schema = sniff_measurements(filename) if schema is None \
+            else schema
+
+        # The last loaded row is used as context when filling new rows, and
+        # rows up to its timestamp have already been loaded
+        self.last = np.concatenate([np.asarray(tvec.iloc[-1], dtype=np.float64),
+                                    np.asarray(data.iloc[-1], dtype=np.float64)])
+        self.lastMinute = tvec_to_minutes(self.last[None, 0:6])[0]
+        self.pending = np.empty((0, len(NAMES)))
+
+    def read(self):
+        """
+        Reads the rows appended since the last call
+
+        OUTPUT:
+            None if there are no new rows, otherwise
+            tvec: M x 6 dataFrame with the new time vectors
+            data: M x 4 dataFrame with the new measurements
+        """
+        size = os.path.getsize(self.filename)
+        if size < self.offset:
+            raise OSError("The file has been truncated")
+        if size == self.offset:
+            return None
+
+        with open(self.filename, "rb") as f:
+            # Start on a new line if the offset is in the middle of one
+            if self.offset > 0:
+                f.seek(self.offset - 1)
+                if f.read(1) != b"\n":
+                    f.readline()
+            start = f.tell()
+            chunk = f.read(size - start)
+
+        # Only parse complete lines, the rest is read next time
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return None
+        self.offset = start + end
+
+        raw = parse_measurements(io.BytesIO(chunk[:end]), self.schema,
+                                 header=start == 0)
+        raw[raw == -1] = np.nan
+
+        # Skip rows that have already been loaded
+        validTime = ~np.isnan(raw[:, 0:6]).any(axis=1)
+        old = np.zeros(len(raw), dtype=bool)
+        old[validTime] = tvec_to_minutes(
+            raw[validTime, 0:6]) <= self.lastMinute
+        values = np.concatenate([self.pending, raw[~old]])
+
+        values = self._fill(values)
+        if len(values) == 0:
+            return None
+
+        self.last = values[-1]
+        self.lastMinute = tvec_to_minutes(self.last[None, 0:6])[0]
+        tvec = pd.DataFrame(values[:, 0:6].astype(np.int64), columns=NAMES[0:6])
+        data = pd.DataFrame(values[:, 6:10], columns=NAMES[6:10])
+        return tvec, data
+
+    def _fill(self, values):
+        """
+        Handles the corrupted measurements of the new rows and keeps rows
+        that have to wait for a later measurement in self.pending
+        """
+        corrupt = np.isnan(values)
+
+        if self.fmode == "drop":
+            self.pending = values[:0]
+            return values[~corrupt.any(axis=1)]
+
+        # Rows after the last valid measurement of a zone have to wait,
+        # unless the gap is already too long to ever be filled. Forward fill
+        # only has to wait to know if a gap becomes longer than max_gap
+        n = len(values)
+        cut = n
+        if n and (self.fmode != "forward fill" or self.max_gap is not None):
+            valid = ~corrupt
+            lastValid = np.where(valid.any(axis=0),
+                                 n - 1 - valid[::-1].argmax(axis=0), -1)
+            waiting = lastValid + 1
+            if self.max_gap is not None:
+                waiting = waiting[n - waiting <= self.max_gap]
+            cut = int(waiting.min()) if len(waiting) else n
+        self.pending = values[cut:]
+
+        # Prepend the last row as context, it is always valid
+        values = np.concatenate([self.last[None], values[:cut]])
+
+        if self.fmode in ["linear interpolation", "time interpolation"]:
+            values = values[~np.isnan(values[:, 0:6]).any(axis=1)]
+            minutes = tvec_to_minutes(values[:, 0:6])
+            values[:, 6:10], keep = fill_gaps(values[:, 6:10], self.fmode,
+                                              x=minutes, max_gap=self.max_gap)
+        else:
+            values, keep = fill_gaps(values, self.fmode, max_gap=self.max_gap)
+
+        return values[1:][keep[1:]]
+
+
+class LiveBuffer():
+    """
+    Growable storage of a Dataset for live mode. The arrays double in size
+    when full, so appending a few rows does not copy the whole dataset
+
+    INPUT:
+        dataset: Dataset with the rows that have already been loaded
+
+    USAGE:
+        buffer = LiveBuffer(dataset)
+        buffer.append(Dataset.from_frames(tvec_new, data_new))
+        dataset = buffer.dataset()
+    """
+
+    def __init__(self, dataset):
+        self.n = len(dataset)
+        self.zones = dataset.zones
+        capacity = max(2 * self.n, 1024)
+        self.minutes = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty((capacity, dataset.values.shape[1]))
+        self.minutes[:self.n] = dataset.minutes
+        self.values[:self.n] = dataset.values
+
+    def append(self, dataset):
+        """
+        Appends the rows of dataset, growing the arrays if needed
+        """
+        m = len(dataset)
+        if self.n + m > len(self.values):
+            capacity = max(2 * len(self.values), self.n + m)
+            self.minutes = np.concatenate(
+                [self.minutes[:self.n], np.empty(capacity - self.n, np.int64)])
+            self.values = np.concatenate(
+                [self.values[:self.n],
+                 np.empty((capacity - self.n, self.values.shape[1]))])
+        self.minutes[self.n:self.n + m] = dataset.minutes
+        self.values[self.n:self.n + m] = dataset.values
+        self.n += m
+
+    def dataset(self):
+        """
+        The rows as a Dataset on top of the buffers, without copying
+        """
+        return Dataset(self.minutes[:self.n], self.values[:self.n], self.zones)
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.aggregate_measurements import aggregate_dataset
+from src.timestamps import bucket_codes
+
+# Billing periods, see bucket_codes
+BILLING = ["day", "month"]
+
+# Columns of the costs
+COLUMNS = ["period", "zone", "energy", "energy cost", "demand",
+           "demand cost", "fixed", "total"]
+
+
+class TariffEngine():
+    """
+    Prices the consumption of a dataset with a tariff, per zone and per
+    billing period, so the same data can be priced again and again when the
+    tariff is changed.
+
+    The data is priced hour by hour. The hourly energy of every zone, the
+    time-of-use key of every hour (month, weekday and local hour) and the
+    billing period of every hour are found once, when the engine is
+    created. Pricing then only looks up the price of every key in a table
+    of the tariff, joins the spot prices on the UTC hour and sums the
+    billing periods with np.add.reduceat, so years of data are priced in
+    milliseconds.
+
+    The measurements are Wh per minute. Energy is in kWh and demand is the
+    kWh of an hour, i.e. the average kW of the hour. Missing measurements
+    are not charged. Costs are in the currency of the prices.
+
+    INPUT:
+        dataset: Dataset with non-aggregated or hourly data, sorted by time
+        cache: dictionary with an aggregated Dataset of all rows for some
+            periods, see LazyDataset, or a DatasetManager. The hourly data
+            is taken from it, or added to it
+        billing: String, one of BILLING
+
+    USAGE:
+        engine = TariffEngine(dataset, cache=pipeline.cache)
+        costs = engine.costs(load_tariff("tariff.json"))
+        costs[costs.zone == "All"]
+    """
+
+    def __init__(self, dataset, cache=None, billing="month"):
+        if billing not in BILLING:
+            raise ValueError("Unknown billing period: {}".format(billing))
+        cache = {} if cache is None else cache
+        if dataset.period == "hour":
+            hourly = dataset
+        else:
+            if "hour" not in cache:
+                cache["hour"] = aggregate_dataset(dataset, "hour")
+            hourly = cache["hour"]
+
+        self.zones = hourly.zones + ["All"]
+        self.minutes = np.asarray(hourly.minutes)
+        self.billing = billing
+
+        # Energy of every hour in kWh, with the sum of all zones
+        values = np.asarray(hourly.values) / 1000
+        present = ~np.isnan(values)
+        total = np.where(present.any(axis=1), np.nansum(values, axis=1),
+                         np.nan)
+        values = np.column_stack([values, total])
+        self.energy = np.where(np.isnan(values), 0.0, values)
+        self.demand = np.where(np.isnan(values), -np.inf, values)
+
+        # Time-of-use key of every hour, see _price_table. 1970-01-01 was a
+        # Thursday, weekday 3
+        local = hourly.local()
+        days = local // 1440
+        months = days.astype('datetime64[D]').astype(
+            'datetime64[M]').astype(np.int64) % 12
+        self.keys = (months * 7 + (days + 3) % 7) * 24 + local % 1440 // 60
+        self.codes = bucket_codes(self.minutes, billing, hourly.tz)
+
+    def __len__(self):
+        return len(self.minutes)
+
+    def costs(self, tariff, start=None, end=None):
+        """
+        The costs of the hours that start in the range [start, end)
+
+        INPUT:
+            tariff: dictionary, see check_tariff
+            start, end: Integer, minutes since 1970 as in the dataset, None
+                for the first or last hour
+
+        OUTPUT:
+            costs: dataFrame with a row for every billing period and zone
+                ("All" for the sum of all zones) and the columns COLUMNS:
+                    period: "YYYY-MM" or "YYYY-MM-DD"
+                    energy: kWh
+                    energy cost: energy priced hour by hour, NaN if an hour
+                        has no spot price
+                    demand: highest kWh of an hour, i.e. kW
+                    demand cost: demand times the demand price
+                    fixed: fixed price of the period, on "All" only
+                    total: sum of the costs
+        """
+        tariff = check_tariff(tariff)
+        i, j = 0, len(self.minutes)
+        if start is not None:
+            i = int(np.searchsorted(self.minutes, start))
+        if end is not None:
+            j = max(i, int(np.searchsorted(self.minutes, end)))
+        if i == j:
+            return pd.DataFrame(columns=COLUMNS)
+
+        # Price of every hour
+        price = _price_table(tariff)[self.keys[i:j]]
+        if tariff["spot"] is not None:
+            price = price + _spot_prices(self.minutes[i:j], *tariff["spot"])
+
+        # Sum the billing periods
+        codes = self.codes[i:j]
+        starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+        energy = np.add.reduceat(self.energy[i:j], starts)
+        cost = np.add.reduceat(self.energy[i:j] * price[:, None], starts)
+        demand = np.maximum.reduceat(self.demand[i:j], starts)
+        demand = np.where(np.isinf(demand), 0.0, demand)
+        fixed = np.zeros_like(energy)
+        fixed[:, -1] = tariff["fixed"]
+
+        # One row for every period and zone
+        nzones = len(self.zones)
+        unit = "M" if self.billing == "month" else "D"
+        periods = codes[starts].astype('datetime64[{}]'.format(unit))
+        costs = pd.DataFrame({
+            "period": np.repeat(periods.astype(str), nzones),
+            "zone": np.tile(np.asarray(self.zones, dtype=object),
+                            len(starts)),
+            "energy": energy.ravel(),
+            "energy cost": cost.ravel(),
+            "demand": demand.ravel(),
+            "demand cost": demand.ravel() * tariff["demand"],
+            "fixed": fixed.ravel()})
+        costs["total"] = costs[["energy cost", "demand cost",
+                                "fixed"]].sum(axis=1, skipna=False)
+        return costs
+
+
+def check_tariff(tariff):
+    """
+    Checks a tariff and fills in the keys that are left out. A tariff is a
+    dictionary of:
+        energy: price per kWh of the hours outside the periods, default 0
+        periods: list of time-of-use periods, each a dictionary of:
+            price: price per kWh of the hours of the period
+            months: months of the period, 1 to 12, default all
+            days: weekdays of the period, 0 (Monday) to 6, default all
+            hours: local hours of the period, 0 to 23, default all
+            name: String, not used
+            A later period replaces an earlier one where they overlap
+        spot: (minutes, prices) of the spot price per kWh of every hour,
+            where minutes are the start of the hours in the time of the
+            dataset minutes, i.e. UTC if it has a time zone. The spot
+            price is added to the price of the periods, so these are the
+            grid and retail charges on top of it. Default None
+        demand: price per kW of the highest demand of every billing
+            period, default 0
+        fixed: price of every billing period, default 0
+        currency: String, shown with the costs, default ""
+
+    OUTPUT:
+        tariff: dictionary with all the keys
+
+    USAGE:
+        tariff = check_tariff({"energy": 0.3, "periods": [
+            {"price": 0.5, "days": [0, 1, 2, 3, 4], "hours": [17, 18, 19]}]})
+    """
+    unknown = set(tariff) - {"energy", "periods", "spot", "demand", "fixed",
+                             "currency"}
+    if unknown:
+        raise ValueError("Unknown tariff keys: {}".format(
+            ", ".join(sorted(unknown))))
+    checked = {"energy": float(tariff.get("energy", 0)),
+               "demand": float(tariff.get("demand", 0)),
+               "fixed": float(tariff.get("fixed", 0)),
+               "currency": str(tariff.get("currency", "")),
+               "spot": None, "periods": []}
+
+    limits = {"months": (1, 12), "days": (0, 6), "hours": (0, 23)}
+    for n, period in enumerate(tariff.get("periods", [])):
+        if "price" not in period:
+            raise ValueError("Tariff period {} has no price".format(n + 1))
+        period = dict(period, price=float(period["price"]))
+        for key, (low, high) in limits.items():
+            values = [int(v) for v in period.get(key, range(low, high + 1))]
+            if any(not low <= v <= high for v in values):
+                raise ValueError("Tariff period {}: {} must be {} to {}"
+                                 .format(n + 1, key, low, high))
+            period[key] = values
+        checked["periods"].append(period)
+
+    if tariff.get("spot") is not None:
+        minutes, prices = tariff["spot"]
+        minutes = np.asarray(minutes, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if minutes.shape != prices.shape or minutes.ndim != 1:
+            raise ValueError("The spot prices must be one price per hour")
+        checked["spot"] = (minutes, prices)
+    return checked
+
+
+def load_tariff(filename):
+    """
+    Reads a tariff from a .json file with the keys of check_tariff. The spot
+    prices are the name of a .csv file, relative to the tariff, with a time
+    and a price column. Times without a UTC offset are UTC
+
+    INPUT:
+        filename: String, the full name of the tariff
+
+    OUTPUT:
+        tariff: dictionary, see check_tariff
+
+    USAGE:
+        tariff = load_tariff("tariff.json")
+    """
+    with open(filename, encoding="utf-8") as f:
+        try:
+            tariff = json.load(f)
+        except ValueError as e:
+            raise ValueError("The tariff is not valid JSON: {}".format(e))
+    if not isinstance(tariff, dict):
+        raise ValueError("The tariff must be a JSON object")
+
+    spot = tariff.get("spot")
+    if isinstance(spot, str):
+        path = os.path.join(os.path.dirname(os.path.abspath(filename)), spot)
+        frame = pd.read_csv(path)
+        if frame.shape[1] < 2:
+            raise ValueError("The spot prices must have a time and a price "
+                             "column")
+        times = pd.to_datetime(frame.iloc[:, 0], utc=True)
+        minutes = times.dt.tz_localize(None).to_numpy(
+            dtype='datetime64[m]').astype(np.int64)
+        tariff["spot"] = (minutes, frame.iloc[:, 1].to_numpy(np.float64))
+    return check_tariff(tariff)
+
+
+def _price_table(tariff):
+    """
+    Price per kWh of every time-of-use key, (month * 7 + weekday) * 24 +
+    hour with months from 0
+    """
+    table = np.full((12, 7, 24), tariff["energy"])
+    for period in tariff["periods"]:
+        months = np.asarray(period["months"]) - 1
+        table[np.ix_(months, period["days"], period["hours"])] = \
+            period["price"]
+    return table.ravel()
+
+
+def _spot_prices(minutes, spot_minutes, prices):
+    """
+    Spot price of the hour of every minute, joined on the hour. NaN for the
+    hours without a price
+    """
+    hours = spot_minutes // 60
+    order = np.argsort(hours, kind="stable")
+    hours, prices = hours[order], prices[order]
+    if len(hours) == 0:
+        return np.full(len(minutes), np.nan)
+    wanted = minutes // 60
+    i = np.minimum(np.searchsorted(hours, wanted), len(hours) - 1)
+    return np.where(hours[i] == wanted, prices[i], np.nan)
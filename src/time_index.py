@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.timestamps import tvec_to_minutes, datetime_to_minutes
+
+
+class TimeIndex():
+    """
+    Sorted timestamp index of a loaded dataset. It is built once when the
+    data is loaded and answers date range queries with a binary search, so
+    slicing out a week of a ten year file only costs the size of that week.
+
+    INPUT:
+        tvec: N x 6 matrix where each row is a time vector
+        minutes: N x 1 array of minutes since 1970, i.e. Dataset.minutes.
+            If given, it is used instead of tvec without copying it
+
+    USAGE:
+        index = TimeIndex(tvec)
+        tvec_r, data_r = index.query(tvec, data, start, end)
+        index = TimeIndex(minutes=dataset.minutes)
+        i, j = index.positions(start, end)
+    """
+
+    def __init__(self, tvec=None, minutes=None):
+        self.minutes = tvec_to_minutes(tvec) if minutes is None else minutes
+
+        # Loggers write in order, so only sort if the file is not.
+        # order is None whenever the rows are already sorted
+        self.order = None
+        if (np.diff(self.minutes) < 0).any():
+            self.order = np.argsort(self.minutes, kind='stable')
+            self.minutes = self.minutes[self.order]
+
+    def __len__(self):
+        return len(self.minutes)
+
+    def first(self):
+        """
+        First timestamp of the dataset in minutes
+        """
+        return int(self.minutes[0])
+
+    def last(self):
+        """
+        Last timestamp of the dataset in minutes
+        """
+        return int(self.minutes[-1])
+
+    def positions(self, start=None, end=None):
+        """
+        Finds the row positions of the range [start, end) by binary search
+
+        INPUT:
+            start: datetime or minutes, first timestamp included (None = all)
+            end: datetime or minutes, first timestamp excluded (None = all)
+
+        OUTPUT:
+            i, j: row positions such that rows i to j-1 are in the range
+        """
+        i, j = 0, len(self.minutes)
+        if start is not None:
+            i = int(np.searchsorted(self.minutes, _to_minutes(start), 'left'))
+        if end is not None:
+            j = int(np.searchsorted(self.minutes, _to_minutes(end), 'left'))
+        return i, max(i, j)
+
+    def extend(self, tvec=None, minutes=None):
+        """
+        Adds new time vectors to the end of the index, i.e. in live mode.
+        The new rows must come after the rows already in the index
+
+        INPUT:
+            tvec: M x 6 matrix with the new time vectors
+            minutes: (N + M) x 1 array of all minutes, where the last M are
+                new, i.e. from LiveBuffer. If given, it is used instead of
+                tvec without copying it or sorting it again
+        """
+        if minutes is None:
+            self.minutes = np.concatenate([self.minutes,
+                                           tvec_to_minutes(tvec)])
+        else:
+            self.minutes = minutes
+
+    def sort(self, tvec, data):
+        """
+        Sorts tvec and data by time, so every later query is a slice
+        instead of a copy. Only copies anything if the file was unsorted
+
+        OUTPUT:
+            tvec: the sorted N x 6 dataFrame
+            data: the sorted N x 4 dataFrame
+        """
+        if self.order is not None:
+            tvec = tvec.iloc[self.order].reset_index(drop=True)
+            data = data.iloc[self.order].reset_index(drop=True)
+            self.order = None
+        return tvec, data
+
+    def query(self, tvec, data, start=None, end=None):
+        """
+        Returns the rows of tvec and data inside the range [start, end).
+        If the data was sorted when loaded, the result is a slice of
+        the original dataFrames and no data is copied
+
+        INPUT:
+            tvec: N x 6 dataFrame the index was built from
+            data: N x 4 dataFrame belonging to tvec
+            start: datetime or minutes, first timestamp included (None = all)
+            end: datetime or minutes, first timestamp excluded (None = all)
+
+        OUTPUT:
+            tvec_r: dataFrame with the time vectors inside the range
+            data_r: dataFrame with the measurements inside the range
+        """
+        i, j = self.positions(start, end)
+        if self.order is None:
+            return tvec.iloc[i:j], data.iloc[i:j]
+
+        # Unsorted file, pick the rows through the sort order
+        rows = self.order[i:j]
+        return tvec.iloc[rows], data.iloc[rows]
+
+
+def _to_minutes(value):
+    """
+    Accept both minutes and datetimes when querying
+    """
+    if isinstance(value, (int, np.integer)):
+        return value
+    return datetime_to_minutes(value)
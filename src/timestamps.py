@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from src.timezones import to_local
+
+
+def tvec_to_minutes(tvec):
+    """
+    Converts a time vector matrix into minutes since 1970-01-01 00:00.
+    Everything is done with numpy datetime arithmetic, so no rows are
+    parsed one by one. Seconds are ignored since the measurements are
+    minutely.
+
+    INPUT:
+        tvec: N x 6 matrix where each row is a time vector
+
+    OUTPUT:
+        minutes: N x 1 int64 array of minutes since 1970-01-01 00:00
+
+    USAGE:
+        minutes = tvec_to_minutes(tvec)
+    """
+    # The columns are converted one at a time, so a float matrix is never
+    # copied as a whole
+    t = np.asarray(tvec)
+
+    def column(k):
+        return t[:, k].astype(np.int64)
+
+    # Count months since 1970, let numpy find the first day of each month
+    # and then add the remaining days, hours and minutes
+    months = (column(0) - 1970) * 12 + (column(1) - 1)
+    days = months.astype('datetime64[M]').astype(
+        'datetime64[D]').astype(np.int64) + (column(2) - 1)
+
+    minutes = days * 24
+    minutes += column(3)
+    minutes *= 60
+    minutes += column(4)
+    return minutes
+
+
+def minutes_to_tvec(minutes):
+    """
+    Converts minutes since 1970-01-01 00:00 back into a time vector matrix.
+    This is the inverse of tvec_to_minutes
+
+    INPUT:
+        minutes: N x 1 array of minutes since 1970-01-01 00:00
+
+    OUTPUT:
+        tvec: N x 6 int64 array where each row is a time vector
+
+    USAGE:
+        tvec = minutes_to_tvec(minutes)
+    """
+    m = np.asarray(minutes, dtype=np.int64)
+
+    # Split into calendar units using numpy datetimes
+    days = (m // 1440).astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]').astype(np.int64)
+
+    tvec = np.zeros((len(m), 6), dtype=np.int64)
+    tvec[:, 0] = years + 1970
+    tvec[:, 1] = months.astype(np.int64) - years * 12 + 1
+    tvec[:, 2] = (days - months.astype('datetime64[D]')).astype(np.int64) + 1
+    tvec[:, 3] = (m % 1440) // 60
+    tvec[:, 4] = m % 60
+
+    return tvec
+
+
+def datetime_to_minutes(dt):
+    """
+    Converts a datetime (or numpy datetime64) into minutes since
+    1970-01-01 00:00
+    """
+    return int(np.datetime64(dt, 'm').astype(np.int64))
+
+
+def minutes_to_datetime(minutes):
+    """
+    Converts minutes since 1970-01-01 00:00 into a datetime
+    """
+    return np.datetime64(int(minutes), 'm').astype(object)
+
+
+def bucket_codes(minutes, period, tz=None):
+    """
+    Integer code of the hour, day or month every timestamp belongs to
+
+    With a time zone, the minutes are UTC and the buckets are the local
+    hours, days and months. Local days and months are found from the local
+    time. Hours are counted on UTC, shifted to the local hour boundaries,
+    so the hour that is repeated when the clocks go back is two buckets
+
+    INPUT:
+        minutes: N x 1 array of minutes since 1970-01-01 00:00
+        period: String, "hour", "day" or "month"
+        tz: String, IANA time zone name of UTC minutes, see timezones
+
+    OUTPUT:
+        codes: N x 1 int64 array, equal for timestamps in the same bucket
+    """
+    length = {"hour": 60, "day": 1440, "month": 1440}.get(period)
+    if length is None:
+        raise ValueError("Unknown period: {}".format(period))
+    if tz is None:
+        codes = minutes // length
+    else:
+        codes = to_local(minutes, tz, 60 if period == "hour" else None,
+                         length)
+    if period == "month":
+        return codes.astype('datetime64[D]').astype(
+            'datetime64[M]').astype(np.int64)
+    return codes
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+# Ways to resolve local times that occur twice when the clocks go back
+AMBIGUOUS = ["infer", "dst", "standard"]
+
+# Ways to handle local times that do not exist when the clocks go forward
+NONEXISTENT = ["shift", "drop"]
+
+
+def check_zone(tz):
+    """
+    Checks that tz is a known IANA time zone name
+
+    OUTPUT:
+        tz: String, the name
+
+    USAGE:
+        tz = check_zone("Europe/Copenhagen")
+    """
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError("Unknown time zone: {}".format(tz))
+    return tz
+
+
+def localize_minutes(local, tz, ambiguous="infer", nonexistent="shift"):
+    """
+    Converts local wall-clock minutes of the time zone tz into UTC minutes.
+    The offsets of tz are looked up in a table of its transitions, so every
+    row is converted with a few vectorized operations.
+
+    Around a transition to daylight saving time, the local times in the gap
+    do not exist, and around a transition back, the local times in the
+    overlap occur twice. These are resolved by:
+        ambiguous:
+            "infer": the rows are in the order they were logged, so a local
+                time that is not later than an earlier one of the overlap is
+                the second (standard time) occurrence
+            "dst": daylight saving time
+            "standard": standard time
+        nonexistent:
+            "shift": moved forward by the length of the gap, like a clock
+                that was not changed
+            "drop": left out, see keep
+
+    INPUT:
+        local: N x 1 int64 array of local minutes since 1970-01-01 00:00,
+            i.e. from tvec_to_minutes
+        tz: String, IANA time zone name such as "Europe/Copenhagen"
+        ambiguous: String, one of AMBIGUOUS
+        nonexistent: String, one of NONEXISTENT
+
+    OUTPUT:
+        utc: N x 1 int64 array of UTC minutes since 1970-01-01 00:00
+        keep: N x 1 boolean array, False for rows that are dropped
+
+    USAGE:
+        utc, keep = localize_minutes(tvec_to_minutes(tvec), "Europe/Berlin")
+    """
+    if ambiguous not in AMBIGUOUS:
+        raise ValueError("Unknown ambiguous mode: {}".format(ambiguous))
+    if nonexistent not in NONEXISTENT:
+        raise ValueError("Unknown nonexistent mode: {}".format(nonexistent))
+    local = np.asarray(local, dtype=np.int64)
+    keep = np.ones(len(local), dtype=bool)
+    if len(local) == 0:
+        return local.copy(), keep
+
+    moments, offsets = _table(tz, *_years(local))
+    before, after = offsets[:-1], offsets[1:]
+
+    # Every transition has a window of local times that are in the gap or
+    # in the overlap. j is the number of windows a row is past, so the row
+    # is in the window of transition j or before it
+    start = moments + np.minimum(before, after)
+    end = moments + np.maximum(before, after)
+    j = np.searchsorted(end, local, side="right")
+    offset = offsets[j]
+    utc = local - offset
+
+    inside = np.flatnonzero(local >= np.r_[start, np.iinfo(np.int64).max][j])
+    if len(inside):
+        jj = j[inside]
+        gap = after[jj] > before[jj]
+
+        # Overlap, offset is the daylight saving (earlier) offset so far
+        rows, k = inside[~gap], jj[~gap]
+        if ambiguous == "standard":
+            second = np.ones(len(rows), dtype=bool)
+        elif ambiguous == "dst":
+            second = np.zeros(len(rows), dtype=bool)
+        else:
+            earlier = np.maximum.accumulate(local[rows])
+            second = np.r_[False, local[rows][1:] <= earlier[:-1]]
+        utc[rows[second]] = local[rows[second]] - after[k[second]]
+
+        # Gap, local - offset before the transition is already shifted
+        if nonexistent == "drop":
+            keep[inside[gap]] = False
+    return utc, keep
+
+
+def utc_offsets(utc, tz):
+    """
+    Offsets from UTC in minutes of tz at every UTC minute
+
+    INPUT:
+        utc: N x 1 int64 array of UTC minutes since 1970-01-01 00:00
+        tz: String, IANA time zone name
+
+    OUTPUT:
+        offsets: N x 1 int64 array, local = utc + offsets
+    """
+    utc = np.asarray(utc, dtype=np.int64)
+    if len(utc) == 0:
+        return np.zeros(0, dtype=np.int64)
+    moments, offsets, bounds = _segments(utc, tz)
+    if bounds is None:
+        return offsets[np.searchsorted(moments, utc, side="right")]
+    return np.repeat(offsets, np.diff(bounds))
+
+
+def to_local(utc, tz, modulo=None, length=1):
+    """
+    Local wall-clock minutes of UTC minutes, the inverse of localize_minutes.
+    The offset is the same between two transitions, so sorted minutes are
+    shifted and divided a run of rows at a time, without looking up the
+    offset of every row
+
+    INPUT:
+        utc: N x 1 int64 array of UTC minutes since 1970-01-01 00:00
+        tz: String, IANA time zone name
+        modulo: Integer, only the offsets modulo this are added, i.e. 60
+            shifts UTC to the local hour boundaries. None for local time
+        length: Integer, the local minutes are floor divided by it, i.e.
+            1440 gives local days
+
+    OUTPUT:
+        local: N x 1 int64 array, a new array
+    """
+    utc = np.asarray(utc, dtype=np.int64)
+    if len(utc) == 0:
+        return utc.copy()
+    moments, offsets, bounds = _segments(utc, tz)
+    if modulo is not None:
+        offsets = offsets % modulo
+    if bounds is None:
+        return (utc + offsets[np.searchsorted(moments, utc, side="right")]
+                ) // length
+    local = np.empty_like(utc)
+    for offset, i, j in zip(offsets, bounds[:-1], bounds[1:]):
+        if offset:
+            np.add(utc[i:j], offset, out=local[i:j])
+            np.floor_divide(local[i:j], length, out=local[i:j])
+        else:
+            np.floor_divide(utc[i:j], length, out=local[i:j])
+    return local
+
+
+def _segments(utc, tz):
+    """
+    Transitions of tz around utc, see _table, and if utc is sorted the rows
+    where every offset starts and ends, otherwise None
+
+    OUTPUT:
+        moments, offsets: see _table
+        bounds: (T + 2) x 1 int64 array, rows bounds[k] to bounds[k + 1] - 1
+            have offsets[k]
+    """
+    if (utc[1:] >= utc[:-1]).all():
+        moments, offsets = _table(tz, *_years(utc[[0, -1]]))
+        bounds = np.r_[0, np.searchsorted(utc, moments), len(utc)]
+        return moments, offsets, bounds
+    moments, offsets = _table(tz, *_years(utc))
+    return moments, offsets, None
+
+
+def _years(minutes):
+    """
+    First and last year of minutes, with a year of margin
+    """
+    years = np.array([minutes.min(), minutes.max()]).astype(
+        'datetime64[m]').astype('datetime64[Y]').astype(np.int64) + 1970
+    return int(years[0]) - 1, int(years[1]) + 1
+
+
+@lru_cache(maxsize=32)
+def _table(tz, first, last):
+    """
+    Transitions of tz in the years first to last
+
+    OUTPUT:
+        moments: T x 1 int64 array of the UTC minutes of every transition
+        offsets: (T + 1) x 1 int64 array of the offset in minutes before the
+            first transition and after every transition
+    """
+    zone = ZoneInfo(tz)
+
+    def offset(minute):
+        moment = datetime.fromtimestamp(int(minute) * 60, timezone.utc)
+        return int(moment.astimezone(zone).utcoffset().total_seconds()) // 60
+
+    # Offset at every UTC midnight, a transition is between two midnights
+    # with different offsets, found to the minute by bisection
+    days = np.arange(np.datetime64("{}-01-01".format(first), "D"),
+                     np.datetime64("{}-01-01".format(last + 1), "D"))
+    midnights = days.astype(np.int64) * 1440
+    daily = np.array([offset(m) for m in midnights])
+    moments = []
+    for d in np.flatnonzero(np.diff(daily)):
+        low, high = int(midnights[d]), int(midnights[d + 1])
+        while high - low > 1:
+            middle = (low + high) // 2
+            if offset(middle) == daily[d]:
+                low = middle
+            else:
+                high = middle
+        moments.append(high)
+    offsets = np.r_[daily[0], daily[1:][np.diff(daily) != 0]]
+    return np.array(moments, dtype=np.int64), offsets.astype(np.int64)
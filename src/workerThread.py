@@ -0,0 +1,32 @@
+from PyQt5 import QtCore
+
+
+class WorkerThread(QtCore.QThread):
+    """
+    Runs a function in a background thread so the UI does not freeze.
+    Emits done with the result of the function when it has finished, or
+    failed with the error message and error with the exception itself if it
+    raised an exception
+
+    If progress is True, func is called with a progress keyword argument,
+    a function that emits the progress signal, i.e. progress(fraction, obj)
+    """
+    done = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    error = QtCore.pyqtSignal(object)
+    progress = QtCore.pyqtSignal(float, object)
+
+    def __init__(self, func, *args, parent=None, progress=False):
+        super(WorkerThread, self).__init__(parent)
+        self.func = func
+        self.args = args
+        self.kwargs = {"progress": self.progress.emit} if progress else {}
+
+    def run(self):
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.failed.emit(str(e))
+            self.error.emit(e)
+        else:
+            self.done.emit(result)
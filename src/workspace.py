@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from src.aggregate_measurements import bucket_codes
+from src.dataset import Dataset
+from src.timezones import to_local
+
+# Minutes in 52 weeks, shifting by this keeps the weekdays aligned
+WEEKS_52 = 364 * 1440
+
+
+class Workspace():
+    """
+    Several loaded datasets that are compared side by side, i.e. buildings,
+    years or before and after a retrofit. The datasets are aligned on one
+    common time grid, so all of them are aggregated together in a single
+    pass. Alignments and aggregations are kept until a dataset is added or
+    removed, so comparing again does not recompute anything.
+
+    If week alignment is on, every dataset is shifted by whole 52-week
+    periods onto the time of the first dataset, so years can be compared
+    with the weekdays lined up.
+
+    All datasets have the same time zone, and the buckets are in its local
+    time, see bucket_codes.
+
+    USAGE:
+        workspace = Workspace()
+        workspace.add("2008", dataset2008)
+        workspace.add("2009", dataset2009)
+        workspace.set_week_alignment(True)
+        results = workspace.aggregate("day")  # Dataset of every name
+        change = workspace.difference("day", "2008", "2009")
+        stat = workspace.statistics("day")
+    """
+
+    def __init__(self):
+        self.names = []
+        self.datasets = []
+        self.align_weeks = False
+        self._reset()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _reset(self):
+        self._grid = None
+        self._results = {}
+
+    def add(self, name, dataset):
+        """
+        Adds a non-aggregated Dataset, replacing any dataset called name
+        """
+        if self.datasets and dataset.values.shape[1] != len(
+                self.datasets[0].zones):
+            raise ValueError("All datasets must have the same zones")
+        if self.datasets and dataset.tz != self.datasets[0].tz:
+            raise ValueError("All datasets must have the same time zone")
+        if name in self.names:
+            self.datasets[self.names.index(name)] = dataset
+        else:
+            self.names.append(name)
+            self.datasets.append(dataset)
+        self._reset()
+
+    def remove(self, name):
+        """
+        Removes the dataset called name
+        """
+        i = self.names.index(name)
+        del self.names[i], self.datasets[i]
+        self._reset()
+
+    def clear(self):
+        """
+        Removes all datasets
+        """
+        self.names, self.datasets = [], []
+        self._reset()
+
+    def set_week_alignment(self, on):
+        """
+        Turns alignment of the datasets by whole 52-week periods on or off
+        """
+        if on != self.align_weeks:
+            self.align_weeks = on
+            self._reset()
+
+    def shifts(self):
+        """
+        Minutes every dataset is shifted by on the common grid
+        """
+        if not self.align_weeks or not self.datasets:
+            return [0] * len(self.datasets)
+        first = self.datasets[0].minutes[0]
+        return [int(np.round((first - dataset.minutes[0]) / WEEKS_52)) *
+                WEEKS_52 for dataset in self.datasets]
+
+    def align(self):
+        """
+        All datasets on a common time grid, which is every minute that is in
+        any dataset
+
+        OUTPUT:
+            grid: G x 1 array of minutes
+            values: G x D x Z array with the measurements of all D datasets,
+                NaN where a dataset has no measurement
+        """
+        if self._grid is None:
+            shifted = [dataset.minutes + shift for dataset, shift in
+                       zip(self.datasets, self.shifts())]
+            grid = np.unique(np.concatenate(shifted))
+            values = np.full((len(grid), len(self.datasets),
+                              len(self.datasets[0].zones)), np.nan)
+            for d, minutes in enumerate(shifted):
+                values[np.searchsorted(grid, minutes), d] = \
+                    self.datasets[d].values
+            self._grid = (grid, values)
+        return self._grid
+
+    def aggregate(self, period):
+        """
+        Aggregates all datasets in one pass, see aggregate_measurements.
+        Buckets without any measurements of a dataset are NaN
+
+        OUTPUT:
+            results: dictionary with an aggregated Dataset of every name.
+                They all have the same minutes
+        """
+        period = period.lower()
+        if period not in self._results:
+            self._results[period] = self._aggregate(period)
+        minutes, values = self._results[period]
+        tz = None if period == "hour of the day" else self.datasets[0].tz
+        return {name: Dataset(minutes, values[:, d], self.datasets[d].zones,
+                              period, tz)
+                for d, name in enumerate(self.names)}
+
+    def _aggregate(self, period):
+        grid, values = self.align()
+        if period == "minute":
+            return grid, values
+
+        tz = self.datasets[0].tz
+        if period == "hour of the day":
+            local = grid if tz is None else to_local(grid, tz)
+            codes = local % 1440 // 60
+        else:
+            codes = bucket_codes(grid, period, tz)
+        buckets, first, inverse = np.unique(codes, return_index=True,
+                                            return_inverse=True)
+
+        # One bincount of sums and one of counts for every dataset and zone
+        present = ~np.isnan(values)
+        flat = np.where(present, values, 0).reshape(len(grid), -1)
+        ncols = flat.shape[1]
+        index = (inverse.ravel()[:, None] * ncols + np.arange(ncols)).ravel()
+        size = len(buckets) * ncols
+        shape = (len(buckets),) + values.shape[1:]
+        sums = np.bincount(index, weights=flat.ravel(),
+                           minlength=size).reshape(shape)
+        counts = np.bincount(index, weights=present.reshape(-1),
+                             minlength=size).reshape(shape)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if period == "hour of the day":
+                return buckets * 60, sums / counts
+            return grid[first], np.where(counts > 0, sums, np.nan)
+
+    def difference(self, period, first, second):
+        """
+        Measurements of the dataset second minus those of the dataset first
+
+        OUTPUT:
+            dataset: Dataset with the difference
+        """
+        results = self.aggregate(period)
+        a, b = results[first], results[second]
+        return Dataset(a.minutes, b.values - a.values, a.zones, a.period,
+                       a.tz)
+
+    def statistics(self, period):
+        """
+        Comparative statistics of the sum of all zones of every dataset
+
+        OUTPUT:
+            stat: dataFrame with a row for every dataset with the total,
+                mean, minimum and maximum, the part of the buckets with
+                measurements and the change of the total from the first
+                dataset
+        """
+        results = self.aggregate(period)
+        total = np.stack([result.values.sum(axis=1)
+                          for result in results.values()], axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sums = np.nansum(total, axis=0)
+            stat = pd.DataFrame({
+                "Total (kWh)": sums / 1000,
+                "Mean (Wh)": np.nanmean(total, axis=0),
+                "Min (Wh)": np.nanmin(total, axis=0),
+                "Max (Wh)": np.nanmax(total, axis=0),
+                "Coverage (%)": 100 * (~np.isnan(total)).mean(axis=0),
+                "Change (%)": 100 * (sums / sums[0] - 1)},
+                index=pd.Index(self.names, name="Dataset"))
+        return stat